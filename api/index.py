@@ -15,4 +15,7 @@ sys.path.insert(0, server_dir)
 # Set VERCEL env flag so main.py can conditionally skip heavy imports
 os.environ["VERCEL"] = "1"
 
+# Serverless-safe DB pool: one short-lived, pre-pinged connection per instance
+os.environ.setdefault("DB_POOL_MODE", "serverless")
+
 from main import app
@@ -0,0 +1,201 @@
+"""
+Benchmark del parseo de PDFs de clasificaciones AEP: secuencial (página a
+página en el propio proceso) vs por tramos de páginas en un pool de procesos.
+
+Comprueba además que ambas rutas generan exactamente el mismo DataFrame.
+No escribe en Supabase.
+
+Uso:
+    py benchmark_aep_pdf_parsing.py [pdf_o_url ...] [--workers N] [--repeat N]
+
+Sin argumentos se usan los PDFs de la caché del scraper (AEP_PDF_CACHE_DIR) y,
+si está vacía, se genera un PDF sintético de un campeonato nacional (varias
+categorías por página, categorías que continúan en la página siguiente,
+intentos nulos y DSQ).
+"""
+
+import argparse
+import glob
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+_spec = importlib.util.spec_from_file_location(
+    "powerlifting_spain_scraper",
+    os.path.join(
+        os.path.dirname(__file__),
+        "src",
+        "infrastructure",
+        "scrapers",
+        "powerlifting_spain_scraper.py",
+    ),
+)
+_mod = importlib.util.module_from_spec(_spec)
+sys.modules[_spec.name] = _mod
+_spec.loader.exec_module(_mod)
+PowerliftingSpainScraper = _mod.PowerliftingSpainScraper
+
+AEP_PDF_CACHE_DIR = os.getenv(
+    "AEP_PDF_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache", "aep_pdfs")
+)
+
+LINES_PER_PAGE = 48
+WEIGHT_CLASSES = ["-59kg", "-66kg", "-74kg", "-83kg", "-93kg", "-105kg", "-120kg"]
+CLUBS = ["MAD", "BCN", "VAL", "SEV", "BIL", "ZGZ", "GAL"]
+
+
+def _pdf_document(pages: list[list[str]]) -> bytes:
+    """PDF mínimo de texto (Helvetica, una línea por Tj)."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # /Pages, cuando se conozcan los hijos
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+        b"/Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for lines in pages:
+        stream = ["BT /F1 8 Tf 10 TL 30 800 Td"]
+        for line in lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            stream.append(f"({escaped}) Tj T*")
+        stream.append("ET")
+        content = "\n".join(stream).encode("cp1252")
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids),
+        len(kids),
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return bytes(out)
+
+
+def make_synthetic_pdf(path: str, n_athletes: int = 2000, seed: int = 0):
+    rng = random.Random(seed)
+
+    def attempt(kg: float) -> str:
+        return "X" if rng.random() < 0.15 else f"{kg:.1f}".replace(".", ",")
+
+    lines = []
+    position = 0
+    for i in range(n_athletes):
+        if i % 150 == 0:
+            sex = "HOMBRES" if (i // 150) % 2 == 0 else "MUJERES"
+            lines.append(f"{sex} CLASSIC OPEN")
+        if i % 25 == 0:
+            lines.append(WEIGHT_CLASSES[(i // 25) % len(WEIGHT_CLASSES)])
+            lines.append("LEVANTADOR AÑO CLUB PESO COEF ORD SQ BP DL TOTAL IPFGL")
+            position = 0
+        if rng.random() < 0.03:
+            lines.append(f"— Atleta Descalificado{i} 1990 MAD DSQ")
+            continue
+        position += 1
+        squat, bench, dead = (rng.uniform(80, 300) for _ in range(3))
+        total = squat + bench + dead
+        points = f" {rng.randint(1, 12)}" if rng.random() < 0.5 else ""
+        lines.append(
+            f"{position} Nombre{i} Apellido{i % 97} {rng.randint(1960, 2008)} "
+            f"{rng.choice(CLUBS)} {rng.uniform(55, 140):.2f} {rng.uniform(0.5, 1):.4f} "
+            f"{rng.randint(1, 60)} {attempt(squat - 10)} {attempt(squat - 5)} "
+            f"{attempt(squat)} {position} {attempt(bench - 5)} {attempt(bench - 2.5)} "
+            f"{attempt(bench)} {position} {attempt(dead - 10)} {attempt(dead - 5)} "
+            f"{attempt(dead)} {position} {total:.1f} {rng.uniform(40, 110):.2f}"
+            f"{points}"
+        )
+
+    pages = []
+    for start in range(0, len(lines), LINES_PER_PAGE):
+        page = ["AEP-2025 CLASIFICACIÓN Campeonato de España Absoluto"]
+        page += lines[start : start + LINES_PER_PAGE]
+        page.append(f"Página {len(pages) + 1}")
+        pages.append(page)
+
+    with open(path, "wb") as f:
+        f.write(_pdf_document(pages))
+
+
+def load_pdf(source: str) -> bytes:
+    if source.startswith("http"):
+        return PowerliftingSpainScraper().download_pdf(source)
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def timed(scraper, pdf_bytes: bytes, source: str, repeat: int):
+    best, df = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = scraper.parse_clasificacion_bytes(pdf_bytes, source)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sources = args.pdfs or sorted(glob.glob(os.path.join(AEP_PDF_CACHE_DIR, "*.pdf")))
+    if not sources:
+        path = os.path.join(tempfile.gettempdir(), "aep_synthetic_clasificacion.pdf")
+        print(f"Generando PDF sintético en {path}...")
+        make_synthetic_pdf(path)
+        sources = [path]
+
+    sequential = PowerliftingSpainScraper()
+    with ProcessPoolExecutor(args.workers) as pool:
+        parallel = PowerliftingSpainScraper(
+            pdf_executor=pool, pdf_workers=args.workers
+        )
+        # Arrancar los procesos fuera de la medición
+        list(pool.map(abs, range(args.workers)))
+
+        total_seq = total_par = 0.0
+        for source in sources:
+            pdf_bytes = load_pdf(source)
+            t_seq, df_seq = timed(sequential, pdf_bytes, source, args.repeat)
+            t_par, df_par = timed(parallel, pdf_bytes, source, args.repeat)
+            assert df_seq.equals(df_par), f"Los DataFrames no coinciden: {source}"
+            total_seq += t_seq
+            total_par += t_par
+            print(
+                f"{os.path.basename(source)}: {len(df_seq)} filas | "
+                f"secuencial {t_seq:.2f}s | {args.workers} procesos {t_par:.2f}s "
+                f"(x{t_seq / t_par:.1f})"
+            )
+
+    print(
+        f"\nTotal ({len(sources)} PDFs): secuencial {total_seq:.2f}s | "
+        f"paralelo {total_par:.2f}s (x{total_seq / total_par:.1f}) | "
+        "DataFrames idénticos ✅"
+    )
+
+
+if __name__ == "__main__":
+    main()
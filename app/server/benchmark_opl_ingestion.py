@@ -0,0 +1,120 @@
+"""
+Benchmark de la transformación del CSV de OpenPowerlifting: ruta original
+por filas (iterrows + _process_row + to_dict) vs ruta columnar
+(build_documents).
+
+Comprueba además que ambas rutas generan exactamente los mismos documentos
+(mismo BSON: también los tipos, p.ej. 23.0 y no 23).
+No escribe en MongoDB.
+
+Uso:
+    py benchmark_opl_ingestion.py [ruta_csv] [max_filas]
+
+Sin CSV se genera uno sintético con las columnas del dump de OPL (incluyendo
+vacíos, fechas rotas, pesos "120+" y nombres con acentos).
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from bson import encode
+
+from src.infrastructure.opl_parquet import read_opl_csv
+from src.use_cases.ingest_openpowerlifting import IngestOpenPowerlifting
+
+CHUNK_SIZE = 10000
+
+
+def make_synthetic_csv(path: str, n_rows: int = 50000, seed: int = 0):
+    rng = random.Random(seed)
+    names = ["Jesús Olivares", "María García", "Ana Fernández (2)", "John Doe #1"]
+    meets = ["Campeonato de España", "Nationals", "Copa Andalucía 2ª Fase"]
+
+    def maybe(value, p_empty=0.1):
+        return "" if rng.random() < p_empty else value
+
+    rows = []
+    for i in range(n_rows):
+        year = rng.randint(1980, 2026)
+        squat = round(rng.uniform(60, 350), 1)
+        bench = round(rng.uniform(40, 250), 1)
+        deadlift = round(rng.uniform(80, 400), 1)
+        rows.append(
+            {
+                "Name": maybe(f"{rng.choice(names)} {i % 5000}", 0.01),
+                "Sex": rng.choice(["M", "F", "Mx"]),
+                "Event": rng.choice(["SBD", "B", "D"]),
+                "Equipment": rng.choice(["Raw", "Single-ply", "Wraps"]),
+                "Age": maybe(rng.choice([23, 23.5, 41])),
+                "AgeClass": maybe("24-34"),
+                "BirthYearClass": maybe("24-39"),
+                "Division": maybe(rng.choice(["Open", "Juniors", "M1"])),
+                "BodyweightKg": maybe(round(rng.uniform(45, 160), 2)),
+                "WeightClassKg": maybe(rng.choice(["93", "120+", "57", "84+"])),
+                "Best3SquatKg": maybe(squat),
+                "Best3BenchKg": maybe(bench),
+                "Best3DeadliftKg": maybe(deadlift),
+                "TotalKg": maybe(squat + bench + deadlift),
+                "Place": rng.choice(["1", "2", "DQ", "G"]),
+                "Dots": maybe(round(rng.uniform(200, 600), 2)),
+                "Wilks": maybe(round(rng.uniform(200, 600), 2)),
+                "Glossbrenner": maybe(round(rng.uniform(200, 600), 2)),
+                "Goodlift": maybe(round(rng.uniform(40, 120), 2)),
+                "Tested": maybe("Yes", 0.5),
+                "Country": maybe(rng.choice(["Spain", "USA", "Russia"]), 0.3),
+                "Federation": rng.choice(["AEP", "IPF", "USAPL"]),
+                "Date": rng.choice([f"{year}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+                                    f"{year}-13-40"]),
+                "MeetCountry": rng.choice(["Spain", "USA"]),
+                "MeetState": maybe("AN", 0.6),
+                "MeetTown": maybe("Sevilla", 0.5),
+                "MeetName": rng.choice(meets),
+            }
+        )
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def run(csv_path: str, max_rows: int | None = None):
+    loader = IngestOpenPowerlifting(csv_path)
+    timings = {"rows": 0.0, "columnar": 0.0}
+    n_rows = 0
+
+    # Mismo lector tipado que la ingesta
+    for chunk in read_opl_csv(csv_path, CHUNK_SIZE, nrows=max_rows):
+        n_rows += len(chunk)
+        docs = {}
+        for mode in timings:
+            start = time.perf_counter()
+            docs[mode] = loader._transform_chunk(chunk, mode)
+            timings[mode] += time.perf_counter() - start
+
+        # Comparamos el BSON: con == 23 y 23.0 son iguales, en Mongo no
+        encoded = {mode: [encode(doc) for doc in docs[mode]] for mode in docs}
+        if encoded["rows"] != encoded["columnar"]:
+            for row_doc, col_doc in zip(docs["rows"], docs["columnar"]):
+                if encode(row_doc) != encode(col_doc):
+                    print("❌ Documentos distintos:")
+                    print(f"  rows:     {row_doc}")
+                    print(f"  columnar: {col_doc}")
+                    break
+            sys.exit(1)
+
+    print(f"Filas: {n_rows} (documentos idénticos en ambas rutas)\n")
+    for mode, seconds in timings.items():
+        print(f"[{mode}] {seconds:.2f}s -> {n_rows / seconds:,.0f} filas/s")
+    print(f"\nSpeedup: {timings['rows'] / timings['columnar']:.1f}x")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        max_rows = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        run(sys.argv[1], max_rows)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "opl_synthetic.csv")
+            make_synthetic_csv(path)
+            run(path)
@@ -0,0 +1,17 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from src.infrastructure.repositories.aep_crawl_state_repository import (
+    AepCrawlStateRepository,
+)
+
+if __name__ == "__main__":
+    try:
+        # Estado por competición del crawler de la AEP (ingest_aep_2023.py)
+        AepCrawlStateRepository().create_table()
+    except KeyboardInterrupt:
+        print("\nProcess stopped by user.")
+    except Exception as e:
+        print(f"\nAn unexpected error occurred: {e}")
@@ -0,0 +1,26 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from src.infrastructure.repositories.athlete_best_lifts_repository import (
+    AthleteBestLiftsRepository,
+)
+from src.infrastructure.repositories.athlete_repository import AthleteRepository
+
+if __name__ == "__main__":
+    try:
+        # 1. Índices del listado + tabla, índices y función de refresco
+        AthleteRepository().create_indexes()
+        repo = AthleteBestLiftsRepository()
+        repo.create_table()
+
+        # 2. Carga completa inicial (los ETL la mantienen después de forma incremental)
+        print("Building athlete best lifts...")
+        n = repo.refresh()
+        print(f"✅ {n} atletas materializados en athlete_best_lifts")
+
+    except KeyboardInterrupt:
+        print("\nProcess stopped by user.")
+    except Exception as e:
+        print(f"\nAn unexpected error occurred: {e}")
@@ -0,0 +1,26 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from src.infrastructure.opl_parquet import OplParquetStore
+
+if __name__ == "__main__":
+    # 1. PATHS
+    CSV_FILE_PATH = "E:/RackAI/data/openpowerlifting-2026-03-07.csv"
+    PARQUET_DIR = os.getenv("OPL_PARQUET_DIR", "E:/RackAI/data/opl_parquet")
+
+    if not os.path.exists(CSV_FILE_PATH):
+        print(f"ERROR: CSV file not found at: {CSV_FILE_PATH}")
+        exit()
+
+    # 2. CONVERT (una vez por snapshot): Parquet tipado y particionado por
+    # Federation / Year. Después ingest_data.py lee de aquí (OPL_PARQUET_DIR).
+    try:
+        store = OplParquetStore(PARQUET_DIR)
+        store.convert(CSV_FILE_PATH)
+        print(f"Parquet size: {store.size_bytes() / 1e6:.1f} MB")
+    except KeyboardInterrupt:
+        print("\nProcess stopped by user.")
+    except Exception as e:
+        print(f"\nAn unexpected error occurred: {e}")
@@ -1,23 +1,37 @@
 """
-Ingesta de competiciones AEP 2023 en Supabase.
+Ingesta de competiciones AEP en Supabase (todas las temporadas).
 
 Flujo:
-1. Scrapea todas las competiciones de powerliftingspain.es/campeonatos-ano-2023
+1. Descubre las temporadas (powerliftingspain.es/campeonatos-ano-YYYY) y
+   scrapea los enlaces de competiciones de cada una
 2. Inserta cada competición en dim_competition
 3. Parsea los PDFs de clasificaciones
 4. UPSERT atletas en dim_athlete
-5. Inserta resultados en fact_results
+5. UPSERT resultados en fact_results
+
+Las competiciones de todas las temporadas se descargan y parsean en paralelo
+(AEP_WORKERS hilos, peticiones limitadas por host con un token bucket
+compartido) y se cargan en Supabase una a una, confirmando cada competición
+por separado. Los PDFs grandes se parsean además por tramos de páginas en un
+pool de AEP_PDF_WORKERS procesos.
+
+El estado de cada competición se guarda en aep_crawl_state (crear con
+build_aep_crawl_state.py): solo se procesan las nuevas o las que han
+cambiado (página o PDFs) desde su última carga.
 
 Uso:
     py ingest_aep_2023.py
+    AEP_SEASONS=2023,2024 py ingest_aep_2023.py   # solo esas temporadas
 """
 
+import hashlib
 import os
 import re
+import sys
 import unicodedata
-import time
 import traceback
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 from supabase import create_client, Client
 
 # Importar el scraper directamente, evitando __init__.py que importa MongoDB/sqlalchemy
@@ -34,8 +48,13 @@ _spec = importlib.util.spec_from_file_location(
     ),
 )
 _mod = importlib.util.module_from_spec(_spec)
+# Registrado con su nombre para que el pool de procesos pueda resolver sus funciones
+sys.modules[_spec.name] = _mod
 _spec.loader.exec_module(_mod)
 PowerliftingSpainScraper = _mod.PowerliftingSpainScraper
+HostRateLimiter = _mod.HostRateLimiter
+PdfCache = _mod.PdfCache
+PageCache = _mod.PageCache
 
 # ========================================================================
 # Configuración Supabase
@@ -48,6 +67,25 @@ SUPABASE_KEY = os.getenv(
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Temporadas a ingerir ("2023,2024"); vacío = todas las que enlaza la web
+AEP_SEASONS = os.getenv("AEP_SEASONS", "")
+# Reprocesar también las competiciones ya cargadas y sin cambios
+AEP_FORCE = os.getenv("AEP_FORCE", "0") == "1"
+# Scraping concurrente: competiciones en vuelo y peticiones/s por host
+AEP_WORKERS = int(os.getenv("AEP_WORKERS", 4))
+AEP_RATE_PER_SECOND = float(os.getenv("AEP_RATE_PER_SECOND", 1.0))
+AEP_BURST = float(os.getenv("AEP_BURST", 2))
+# Procesos para parsear por tramos de páginas los PDFs grandes (0 = sin pool)
+AEP_PDF_WORKERS = int(os.getenv("AEP_PDF_WORKERS", os.cpu_count() or 1))
+# PDFs de clasificaciones: caché en disco compartida entre ejecuciones
+AEP_PDF_CACHE_DIR = os.getenv(
+    "AEP_PDF_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache", "aep_pdfs")
+)
+# Páginas HTML: revalidación condicional, navegador solo si hace falta
+AEP_PAGE_CACHE_DIR = os.getenv(
+    "AEP_PAGE_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache", "aep_pages")
+)
+
 
 # ========================================================================
 # Helpers
@@ -264,7 +302,7 @@ def upsert_competition(comp_data: dict) -> dict:
 
     # Parsear fechas y ubicación del header del PDF
     header = comp_data.get("pdf_header", "")
-    start_date, end_date = parse_dates_from_header(header)
+    start_date, end_date = parse_dates_from_header(header, comp_data["season"])
     town, state = extract_town_state_from_header(header)
 
     record = {
@@ -350,8 +388,12 @@ def upsert_athlete(nombre: str, sex: str) -> str:
     return athlete_id
 
 
+# Clave única de fact_results: recargar una competición actualiza sus filas
+RESULT_CONFLICT = "athlete_id,competition_id,event_type,equipment"
+
+
 def insert_results_batch(results: list[dict]) -> int:
-    """Inserta resultados en fact_results en mini-batches resilientes.
+    """Inserta (UPSERT) resultados en fact_results en mini-batches resilientes.
     Si un batch falla, intenta insertar uno por uno para no perder el resto.
     Retorna el numero de resultados insertados.
     """
@@ -364,14 +406,18 @@ def insert_results_batch(results: list[dict]) -> int:
     for i in range(0, len(results), batch_size):
         batch = results[i : i + batch_size]
         try:
-            supabase.table("fact_results").insert(batch).execute()
+            supabase.table("fact_results").upsert(
+                batch, on_conflict=RESULT_CONFLICT
+            ).execute()
             inserted += len(batch)
         except Exception as e:
             # Si falla el batch, insertar uno por uno
             print(f"    WARN: Batch falló ({e}), insertando uno a uno...")
             for record in batch:
                 try:
-                    supabase.table("fact_results").insert(record).execute()
+                    supabase.table("fact_results").upsert(
+                        record, on_conflict=RESULT_CONFLICT
+                    ).execute()
                     inserted += 1
                 except Exception as e2:
                     print(f"    ERR resultado individual: {e2}")
@@ -379,190 +425,437 @@ def insert_results_batch(results: list[dict]) -> int:
     return inserted
 
 
+def refresh_best_lifts(athlete_ids: set[str], batch_size: int = 1000) -> int:
+    """Refresca athlete_best_lifts (vía RPC) solo para los atletas tocados."""
+    ids = list(athlete_ids)
+    refreshed = 0
+    for i in range(0, len(ids), batch_size):
+        result = supabase.rpc(
+            "refresh_athlete_best_lifts", {"p_athlete_ids": ids[i : i + batch_size]}
+        ).execute()
+        refreshed += result.data or 0
+    return refreshed
+
+
 # ========================================================================
-# Flujo Principal
+# Estado del crawler
 # ========================================================================
-def run_ingestion():
-    scraper = PowerliftingSpainScraper()
-
-    print("=" * 70)
-    print("INGESTA AEP 2023 -> SUPABASE")
-    print("=" * 70)
+class CrawlState:
+    """
+    Estado por competición en aep_crawl_state:
+    discovered -> fetched -> parsed -> loaded (o failed).
 
-    # 1. Obtener todos los enlaces de competiciones
-    print("\n[1/4] Scrapeando enlaces de competiciones 2023...")
-    comp_links = scraper.get_all_competition_links()
-    print(f"      Encontradas {len(comp_links)} competiciones")
+    Si la tabla no existe se avisa y la ingesta sigue sin estado
+    (procesando todas las competiciones).
+    """
 
-    total_results = 0
-    failed_comps = []
+    TABLE = "aep_crawl_state"
+    PAGE_SIZE = 1000
 
-    for idx, link in enumerate(comp_links, 1):
-        print(f"\n[2/4] Competicion {idx}/{len(comp_links)}: {link}")
+    def __init__(self, client: Client):
+        self.client = client
+        self.enabled = True
 
+    def load(self, seasons: list[int]) -> dict[str, dict]:
+        rows = []
         try:
-            # 2. Scrapear detalle de la competición
-            comp_data = scraper.scrape_competition_detail(link)
-            print(f"      Titulo: {comp_data['titulo']}")
-            print(f"      Poster: {'SI' if comp_data.get('poster_url') else 'NO'}")
-            print(f"      PDFs clasificacion: {len(comp_data['clasificaciones'])}")
-
-            # 2b. Extraer header del primer PDF de clasificación para fechas/ubicación
-            if comp_data["clasificaciones"]:
-                try:
-                    import pdfplumber
-                    import io
-                    import requests as req
-
-                    first_pdf_url = comp_data["clasificaciones"][0]
-                    resp = req.get(first_pdf_url, timeout=30)
-                    resp.raise_for_status()
-                    with pdfplumber.open(io.BytesIO(resp.content)) as pdf:
-                        first_page_text = pdf.pages[0].extract_text() or ""
-                        # El header suele estar en las primeras 5 líneas
-                        header_lines = first_page_text.split("\n")[:5]
-                        comp_data["pdf_header"] = " ".join(header_lines)
-                        print(f"      Header PDF: {comp_data['pdf_header'][:100]}...")
-                except Exception as e:
-                    print(f"      WARN: No se pudo extraer header del PDF: {e}")
-                    comp_data["pdf_header"] = ""
-            else:
-                comp_data["pdf_header"] = ""
-
-            # 3. Insertar competición en dim_competition
-            comp_result = upsert_competition(comp_data)
-            competition_id = comp_result["id"]
-            comp_end_date = comp_result["end_date"]
-            comp_start_date = comp_result["start_date"]
-            # competition_date para fact_results: end_date si existe, sino start_date
-            comp_date_for_results = comp_end_date or comp_start_date
-
-            slug = extract_slug_from_url(link)
-            level = extract_level_from_slug(slug)
-            print(f"      -> ID: {competition_id}, Level: {level}")
-            if comp_start_date:
-                print(
-                    f"      -> Fechas: {comp_start_date.date()} - {comp_end_date.date() if comp_end_date else '?'}"
+            while True:
+                page = (
+                    self.client.table(self.TABLE)
+                    .select("url,season,status,fingerprint")
+                    .in_("season", seasons)
+                    .order("url")
+                    .range(len(rows), len(rows) + self.PAGE_SIZE - 1)
+                    .execute()
+                    .data
                 )
+                rows.extend(page)
+                if len(page) < self.PAGE_SIZE:
+                    break
+        except Exception as e:
+            print(f"      WARN: Sin estado del crawler ({e}).")
+            print("      Ejecuta build_aep_crawl_state.py para crear aep_crawl_state.")
+            self.enabled = False
+            return {}
+        return {row["url"]: row for row in rows}
+
+    def _upsert(self, records: list[dict]):
+        if not self.enabled or not records:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        for record in records:
+            record["updated_at"] = now
+        try:
+            self.client.table(self.TABLE).upsert(records, on_conflict="url").execute()
+        except Exception as e:
+            print(f"      WARN: No se pudo guardar el estado del crawler: {e}")
+
+    def mark_discovered(self, links: list[tuple[int, str]], known: dict):
+        self._upsert(
+            [
+                {"url": link, "season": season, "status": "discovered"}
+                for season, link in links
+                if link not in known
+            ]
+        )
+
+    def mark(self, url: str, season: int, status: str, **fields):
+        self._upsert([{"url": url, "season": season, "status": status, **fields}])
+
+
+# ========================================================================
+# Flujo Principal
+# ========================================================================
+def competition_fingerprint(comp_data: dict, pdfs: dict[str, bytes]) -> str:
+    """Huella de lo que se carga de una competición: página + PDFs."""
+    digest = hashlib.sha256()
+    for part in (
+        comp_data["titulo"],
+        comp_data.get("poster_url") or "",
+        *comp_data["documentos"],
+    ):
+        digest.update(part.encode("utf-8") + b"\0")
+    for pdf_url in comp_data["clasificaciones"]:
+        digest.update(hashlib.sha256(pdfs.get(pdf_url, b"")).digest())
+    return digest.hexdigest()
+
+
+def fetch_competition(
+    scraper: PowerliftingSpainScraper,
+    link: str,
+    loaded_fingerprint: str | None = None,
+) -> dict:
+    """
+    Parte de red + CPU de una competición (se ejecuta en los workers):
+    detalle HTML, PDFs (vía las cachés), cabecera del primer PDF y parseo de
+    las clasificaciones. No escribe nada en Supabase.
+
+    Si la huella coincide con `loaded_fingerprint` (última carga completa)
+    no se parsea nada y se devuelve con "unchanged" = True.
+    """
+    comp_data = scraper.scrape_competition_detail(link)
+    comp_data["season"] = scraper.season
+
+    pdfs, pdf_errors = {}, {}
+    for pdf_url in comp_data["clasificaciones"]:
+        try:
+            pdfs[pdf_url] = scraper.download_pdf(pdf_url)
+        except Exception as e:
+            pdf_errors[pdf_url] = str(e)
+
+    comp_data["fingerprint"] = competition_fingerprint(comp_data, pdfs)
+    comp_data["unchanged"] = (
+        not pdf_errors and comp_data["fingerprint"] == loaded_fingerprint
+    )
+    if comp_data["unchanged"]:
+        return comp_data
+
+    # Extraer header del primer PDF de clasificación para fechas/ubicación
+    comp_data["pdf_header"] = ""
+    comp_data["header_error"] = None
+    if comp_data["clasificaciones"]:
+        first_url = comp_data["clasificaciones"][0]
+        try:
+            if first_url in pdf_errors:
+                raise RuntimeError(pdf_errors[first_url])
+            comp_data["pdf_header"] = scraper.read_pdf_header(pdfs[first_url])
+        except Exception as e:
+            comp_data["header_error"] = str(e)
+
+    # (pdf_url, DataFrame | None, error | None) por cada PDF de clasificación
+    comp_data["parsed"] = []
+    for pdf_url in comp_data["clasificaciones"]:
+        if pdf_url in pdf_errors:
+            comp_data["parsed"].append((pdf_url, None, pdf_errors[pdf_url]))
+            continue
+        try:
+            df = scraper.parse_clasificacion_pdf(pdf_url)
+            comp_data["parsed"].append((pdf_url, df, None))
+        except Exception as e:
+            comp_data["parsed"].append((pdf_url, None, str(e)))
+    return comp_data
+
+
+def load_competition(comp_data: dict) -> tuple[str, int, set[str]]:
+    """
+    Carga en Supabase una competición ya descargada y parseada (hilo
+    principal). Devuelve (competition_id, resultados insertados, atletas
+    tocados).
+    """
+    link = comp_data["url"]
+    print(f"      Titulo: {comp_data['titulo']}")
+    print(f"      Poster: {'SI' if comp_data.get('poster_url') else 'NO'}")
+    print(f"      PDFs clasificacion: {len(comp_data['clasificaciones'])}")
+    if comp_data["pdf_header"]:
+        print(f"      Header PDF: {comp_data['pdf_header'][:100]}...")
+    elif comp_data["header_error"]:
+        print(
+            f"      WARN: No se pudo extraer header del PDF: {comp_data['header_error']}"
+        )
 
-            if not comp_data["clasificaciones"]:
-                print("      (Sin clasificaciones, saltando)")
-                time.sleep(1)
+    # 3. Insertar competición en dim_competition
+    comp_result = upsert_competition(comp_data)
+    competition_id = comp_result["id"]
+    comp_end_date = comp_result["end_date"]
+    comp_start_date = comp_result["start_date"]
+    # competition_date para fact_results: end_date si existe, sino start_date
+    comp_date_for_results = comp_end_date or comp_start_date
+
+    slug = extract_slug_from_url(link)
+    level = extract_level_from_slug(slug)
+    print(f"      -> ID: {competition_id}, Level: {level}")
+    if comp_start_date:
+        print(
+            f"      -> Fechas: {comp_start_date.date()} - {comp_end_date.date() if comp_end_date else '?'}"
+        )
+
+    inserted = 0
+    touched_athletes: set[str] = set()
+    if not comp_data["clasificaciones"]:
+        print("      (Sin clasificaciones, saltando)")
+        return competition_id, inserted, touched_athletes
+
+    # 4. Resultados de cada PDF de clasificación
+    for pdf_url, df, error in comp_data["parsed"]:
+        print(f"\n      Parseando: {pdf_url.split('/')[-1]}")
+        if error:
+            print(f"      ERROR parseando PDF: {error}")
+            continue
+
+        if df.empty:
+            print("      (Sin resultados en este PDF)")
+            continue
+
+        print(f"      -> {len(df)} resultados encontrados")
+
+        # 5. Procesar cada resultado
+        results_batch = []
+        for _, row in df.iterrows():
+            sex = parse_sex(row.get("genero_disciplina", ""))
+
+            # UPSERT atleta
+            try:
+                athlete_id = upsert_athlete(row["nombre"], sex)
+            except Exception as e:
+                print(f"      WARN: No se pudo insertar atleta '{row['nombre']}': {e}")
                 continue
 
-            # 4. Parsear cada PDF de clasificación
-            for pdf_url in comp_data["clasificaciones"]:
-                print(f"\n      Parseando: {pdf_url.split('/')[-1]}")
+            # Calcular mejores levantamientos
+            best_sq = safe_max(row.get("sq1"), row.get("sq2"), row.get("sq3"))
+            best_bp = safe_max(row.get("bp1"), row.get("bp2"), row.get("bp3"))
+            best_dl = safe_max(row.get("dl1"), row.get("dl2"), row.get("dl3"))
+
+            # Calcular edad aproximada (año de la competición o de la temporada)
+            age = None
+            if row.get("anio_nacimiento"):
+                year = (
+                    comp_date_for_results.year
+                    if comp_date_for_results
+                    else comp_data["season"]
+                )
+                age = year - row["anio_nacimiento"]
+
+            result_record = {
+                "athlete_id": athlete_id,
+                "competition_id": competition_id,
+                "competition_date": comp_date_for_results.isoformat()
+                if comp_date_for_results
+                else None,
+                "bodyweight": row.get("peso_corporal"),
+                "club": row.get("club"),
+                "division": sex,
+                "age": age,
+                "age_class": extract_age_class(row.get("genero_disciplina", "")),
+                "weight_class": row.get("categoria_peso", ""),
+                "equipment": parse_equipment(row.get("genero_disciplina", "")),
+                "event_type": parse_event_type(row.get("genero_disciplina", "")),
+                "tested": True,
+                "squat_1": row.get("sq1"),
+                "squat_2": row.get("sq2"),
+                "squat_3": row.get("sq3"),
+                "squat_rank": row.get("sq_rank"),
+                "best_squat": best_sq,
+                "bench_1": row.get("bp1"),
+                "bench_2": row.get("bp2"),
+                "bench_3": row.get("bp3"),
+                "bench_rank": row.get("bp_rank"),
+                "best_bench": best_bp,
+                "deadlift_1": row.get("dl1"),
+                "deadlift_2": row.get("dl2"),
+                "deadlift_3": row.get("dl3"),
+                "deadlift_rank": row.get("dl_rank"),
+                "best_deadlift": best_dl,
+                "total": row.get("total"),
+                "place": str(int(row["posicion"])) if row.get("posicion") else None,
+                "team_points": row.get("puntos"),
+                "goodlift": row.get("ipf_gl"),
+            }
+
+            results_batch.append(result_record)
+
+        # 6. Insertar resultados en batch (resiliente)
+        if results_batch:
+            n = insert_results_batch(results_batch)
+            inserted += n
+            touched_athletes.update(r["athlete_id"] for r in results_batch)
+            print(f"      -> {n}/{len(results_batch)} resultados insertados")
+
+    return competition_id, inserted, touched_athletes
+
+
+def parse_seasons(value: str) -> list[int]:
+    return sorted({int(v) for v in re.split(r"[,\s]+", value.strip()) if v})
+
+
+def run_ingestion(
+    seasons: list[int] | None = None,
+    workers: int = AEP_WORKERS,
+    force: bool = AEP_FORCE,
+    pdf_workers: int = AEP_PDF_WORKERS,
+):
+    pdf_cache = PdfCache(AEP_PDF_CACHE_DIR)
+    # Compartido por los hilos: el parseo de PDFs no compite por el GIL
+    pdf_pool = ProcessPoolExecutor(pdf_workers) if pdf_workers > 1 else None
+    try:
+        page_cache = PageCache(AEP_PAGE_CACHE_DIR)
+        # Un solo limitador (y cachés) para todas las temporadas: mismo host
+        scraper = PowerliftingSpainScraper(
+            rate_limiter=HostRateLimiter(
+                rate=AEP_RATE_PER_SECOND, capacity=AEP_BURST
+            ),
+            pdf_cache=pdf_cache,
+            page_cache=page_cache,
+            pdf_executor=pdf_pool,
+            pdf_workers=pdf_workers,
+        )
+        state = CrawlState(supabase)
+
+        print("=" * 70)
+        print("INGESTA AEP -> SUPABASE")
+        print("=" * 70)
+
+        # 1. Temporadas y enlaces de competiciones (índices en paralelo)
+        if not seasons:
+            seasons = scraper.discover_seasons() or [scraper.season]
+        print(f"\n[1/4] Scrapeando enlaces de competiciones: temporadas {seasons}")
+        scrapers = {season: scraper.for_season(season) for season in seasons}
+        index_workers = max(1, min(workers, len(seasons)))
+        with ThreadPoolExecutor(max_workers=index_workers) as pool:
+            season_links = dict(
+                zip(
+                    seasons,
+                    pool.map(
+                        lambda s: scrapers[s].get_all_competition_links(), seasons
+                    ),
+                )
+            )
+        comp_links = [
+            (season, link)
+            for season in seasons
+            for link in sorted(season_links[season])
+        ]
+        for season in seasons:
+            print(f"      {season}: {len(season_links[season])} competiciones")
+
+        known = state.load(seasons)
+        state.mark_discovered(comp_links, known)
+
+        total_results = 0
+        failed_comps = []
+        unchanged = 0
+        touched_athletes: set[str] = set()
+
+        # 2. Descarga + parseo en paralelo (workers); la carga en Supabase se hace
+        # aquí, competición a competición, según van terminando
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {}
+            for season, link in comp_links:
+                previous = known.get(link, {})
+                loaded = previous.get("status") == "loaded" and not force
+                fingerprint = previous.get("fingerprint") if loaded else None
+                future = pool.submit(
+                    fetch_competition, scrapers[season], link, fingerprint
+                )
+                futures[future] = (season, link)
+
+            for idx, future in enumerate(as_completed(futures), 1):
+                season, link = futures[future]
+                print(f"\n[2/4] Competicion {idx}/{len(comp_links)} ({season}): {link}")
                 try:
-                    df = scraper.parse_clasificacion_pdf(pdf_url)
+                    comp_data = future.result()
                 except Exception as e:
-                    print(f"      ERROR parseando PDF: {e}")
+                    print(f"      ERROR GENERAL: {e}")
+                    failed_comps.append({"url": link, "error": str(e)})
+                    state.mark(link, season, "failed", error=str(e))
+                    traceback.print_exc()
                     continue
 
-                if df.empty:
-                    print("      (Sin resultados en este PDF)")
+                if comp_data["unchanged"]:
+                    print("      (Sin cambios desde la última carga, saltando)")
+                    unchanged += 1
                     continue
 
-                print(f"      -> {len(df)} resultados encontrados")
-
-                # 5. Procesar cada resultado
-                results_batch = []
-                for _, row in df.iterrows():
-                    sex = parse_sex(row.get("genero_disciplina", ""))
-
-                    # UPSERT atleta
-                    try:
-                        athlete_id = upsert_athlete(row["nombre"], sex)
-                    except Exception as e:
-                        print(
-                            f"      WARN: No se pudo insertar atleta '{row['nombre']}': {e}"
-                        )
-                        continue
-
-                    # Calcular mejores levantamientos
-                    best_sq = safe_max(row.get("sq1"), row.get("sq2"), row.get("sq3"))
-                    best_bp = safe_max(row.get("bp1"), row.get("bp2"), row.get("bp3"))
-                    best_dl = safe_max(row.get("dl1"), row.get("dl2"), row.get("dl3"))
-
-                    # Calcular edad aproximada
-                    age = None
-                    if row.get("anio_nacimiento"):
-                        age = 2023 - row["anio_nacimiento"]
-
-                    result_record = {
-                        "athlete_id": athlete_id,
-                        "competition_id": competition_id,
-                        "competition_date": comp_date_for_results.isoformat()
-                        if comp_date_for_results
-                        else None,
-                        "bodyweight": row.get("peso_corporal"),
-                        "club": row.get("club"),
-                        "division": sex,
-                        "age": age,
-                        "age_class": extract_age_class(
-                            row.get("genero_disciplina", "")
-                        ),
-                        "weight_class": row.get("categoria_peso", ""),
-                        "equipment": parse_equipment(row.get("genero_disciplina", "")),
-                        "event_type": parse_event_type(
-                            row.get("genero_disciplina", "")
+                pdf_errors = [error for _, _, error in comp_data["parsed"] if error]
+                state.mark(
+                    link,
+                    season,
+                    "fetched" if pdf_errors else "parsed",
+                    error="; ".join(pdf_errors) or None,
+                )
+                try:
+                    competition_id, inserted, athletes = load_competition(comp_data)
+                    total_results += inserted
+                    touched_athletes |= athletes
+                    # Con PDFs fallidos no se guarda la huella: se reintenta
+                    state.mark(
+                        link,
+                        season,
+                        "loaded",
+                        fingerprint=(
+                            None if pdf_errors else comp_data["fingerprint"]
                         ),
-                        "tested": True,
-                        "squat_1": row.get("sq1"),
-                        "squat_2": row.get("sq2"),
-                        "squat_3": row.get("sq3"),
-                        "squat_rank": row.get("sq_rank"),
-                        "best_squat": best_sq,
-                        "bench_1": row.get("bp1"),
-                        "bench_2": row.get("bp2"),
-                        "bench_3": row.get("bp3"),
-                        "bench_rank": row.get("bp_rank"),
-                        "best_bench": best_bp,
-                        "deadlift_1": row.get("dl1"),
-                        "deadlift_2": row.get("dl2"),
-                        "deadlift_3": row.get("dl3"),
-                        "deadlift_rank": row.get("dl_rank"),
-                        "best_deadlift": best_dl,
-                        "total": row.get("total"),
-                        "place": str(int(row["posicion"]))
-                        if row.get("posicion")
-                        else None,
-                        "team_points": row.get("puntos"),
-                        "goodlift": row.get("ipf_gl"),
-                    }
-
-                    results_batch.append(result_record)
-
-                # 6. Insertar resultados en batch (resiliente)
-                if results_batch:
-                    n = insert_results_batch(results_batch)
-                    total_results += n
-                    print(f"      -> {n}/{len(results_batch)} resultados insertados")
-
-            time.sleep(2)  # Pausa entre competiciones
-
-        except Exception as e:
-            print(f"      ERROR GENERAL: {e}")
-            failed_comps.append({"url": link, "error": str(e)})
-            traceback.print_exc()
+                        competition_id=competition_id,
+                        results=inserted,
+                        error="; ".join(pdf_errors) or None,
+                    )
+                except Exception as e:
+                    print(f"      ERROR GENERAL: {e}")
+                    failed_comps.append({"url": link, "error": str(e)})
+                    state.mark(link, season, "failed", error=str(e))
+                    traceback.print_exc()
+    finally:
+        # También si falla el descubrimiento o el crawl: no dejar procesos vivos
+        if pdf_pool is not None:
+            pdf_pool.shutdown(cancel_futures=True)
 
     # 7. Resumen final
     print("\n" + "=" * 70)
     print("RESUMEN DE INGESTA")
     print("=" * 70)
     print(f"  Competiciones procesadas: {len(comp_links)}")
+    print(f"  Sin cambios (saltadas):   {unchanged}")
     print(f"  Resultados insertados:    {total_results}")
     print(f"  Errores:                  {len(failed_comps)}")
+    print(f"  Páginas (caché):          {page_cache.stats}")
+    print(f"  PDFs (caché):             {pdf_cache.stats}")
     if failed_comps:
         print("\n  Competiciones fallidas:")
         for fc in failed_comps:
             print(f"    - {fc['url']}: {fc['error']}")
 
-    # 8. Log en etl_sync_logs
+    # 8. Refrescar los PRs materializados de los atletas tocados
+    if touched_athletes:
+        try:
+            n = refresh_best_lifts(touched_athletes)
+            print(f"\n  athlete_best_lifts actualizada para {n} atletas")
+        except Exception as e:
+            print(f"\n  WARN: No se pudo refrescar athlete_best_lifts: {e}")
+
+    # 9. Log en etl_sync_logs
     try:
         supabase.table("etl_sync_logs").insert(
             {
-                "scraper_name": "powerlifting_spain_2023",
+                "scraper_name": "powerlifting_spain",
                 "rows_processed": total_results,
                 "status": "success" if not failed_comps else "partial",
                 "error_message": str(failed_comps) if failed_comps else None,
@@ -574,4 +867,4 @@ def run_ingestion():
 
 
 if __name__ == "__main__":
-    run_ingestion()
+    run_ingestion(seasons=parse_seasons(AEP_SEASONS))
@@ -3,7 +3,7 @@ import os
 
 sys.path.append(os.path.join(os.path.dirname(__file__)))
 
-from src.use_cases import IngestOpenPowerlifting
+from src.use_cases import IngestOpenPowerlifting, IngestScope
 
 if __name__ == "__main__":
     # 1. PATH TO CSV
@@ -17,11 +17,43 @@ if __name__ == "__main__":
     print("Starting ETL process...")
 
     # 2. INITIALIZE THE LOADER
-    loader = IngestOpenPowerlifting(CSV_FILE_PATH)
+    # Only load what the app serves (same federations as the Postgres ETL).
+    # INGEST_FEDERATIONS="*" loads the whole worldwide dump.
+    scope = IngestScope.from_strings(
+        federations=os.getenv("INGEST_FEDERATIONS", "AEP,IPF,EPF"),
+        countries=os.getenv("INGEST_COUNTRIES", ""),
+        tested=os.getenv("INGEST_TESTED", ""),
+    )
+    print(f"Scope: {scope or 'full dump'}")
+
+    # If the Parquet copy exists (convert_opl_parquet.py), read from it instead
+    PARQUET_DIR = os.getenv("OPL_PARQUET_DIR")
+    if PARQUET_DIR and os.path.isdir(PARQUET_DIR):
+        print(f"Reading from Parquet: {PARQUET_DIR}")
+        loader = IngestOpenPowerlifting(PARQUET_DIR, scope=scope)
+    else:
+        loader = IngestOpenPowerlifting(CSV_FILE_PATH, scope=scope)
 
     # 3. EXECUTE
+    # Pipelined mode (reader -> transform processes -> Mongo writers).
+    # INGEST_MODE=sequential keeps the single-threaded loop.
+    # INGEST_MODE=delta applies only the changes since PREVIOUS_CSV_FILE_PATH.
+    PREVIOUS_CSV_FILE_PATH = os.getenv(
+        "INGEST_PREVIOUS_CSV", "E:/RackAI/data/openpowerlifting-2026-01-24.csv"
+    )
+    mode = os.getenv("INGEST_MODE", "pipelined")
+    chunk_size = int(os.getenv("INGEST_CHUNK_SIZE", 10000))
     try:
-        loader.run(chunk_size=10000)
+        if mode == "sequential":
+            loader.run(chunk_size=chunk_size)
+        elif mode == "delta":
+            loader.run_delta(PREVIOUS_CSV_FILE_PATH, chunk_size=chunk_size)
+        else:
+            loader.run_pipelined(
+                chunk_size=chunk_size,
+                workers=int(os.getenv("INGEST_WORKERS", 0)) or None,
+                writers=int(os.getenv("INGEST_WRITERS", 2)),
+            )
     except KeyboardInterrupt:
         print("\nProcess stopped by user.")
     except Exception as e:
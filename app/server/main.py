@@ -1,21 +1,191 @@
 import src.infrastructure.repositories.athlete_repository as athlete_repository
 import src.infrastructure.repositories.home_repository as home_repository
+from src.infrastructure.postgres_database import PostgresDB
+from src.infrastructure.cache import cache_stats, clear_caches, set_version_provider
+from src.infrastructure.image_variants import (
+    ImageTooLargeError,
+    build_profile_variants,
+)
+from src.infrastructure.etl_watermark import EtlWatermark
+from src.infrastructure.athlete_search import AthleteSearchIndex
 import uvicorn
-from fastapi import FastAPI, Query, File, UploadFile, Form
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Query, File, UploadFile, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from rapidfuzz import fuzz
+from starlette.concurrency import run_in_threadpool
+import asyncio
 import os
 
 # --- Conditional heavy imports (too large for Vercel serverless) ---
 IS_VERCEL = os.environ.get("VERCEL") == "1"
 
 if not IS_VERCEL:
-    import easyocr
-    import numpy as np
-    import cv2
+    from src.infrastructure.ocr_service import OcrService, OcrBusyError
+
+    # Un único modelo EasyOCR por proceso (se carga al arrancar la app)
+    ocr_service = OcrService(languages=["es"])
+
+# Índice en memoria del buscador de atletas (se refresca con el watermark del ETL)
+athlete_search = AthleteSearchIndex()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Engine (pool) + cliente Supabase compartidos por todas las peticiones
+    app.state.db = PostgresDB()
+    try:
+        app.state.db.ping()
+    except Exception as e:
+        print(f"⚠️ No se pudo abrir la conexión inicial con Postgres: {e}")
+
+    # Las cachés se invalidan cuando etl_sync_logs registra una carga nueva
+    watermark = EtlWatermark(
+        app.state.db.get_engine(),
+        check_interval=float(os.getenv("CACHE_WATERMARK_CHECK_SECONDS", 30)),
+    )
+    set_version_provider(watermark.current)
+
+    if not IS_VERCEL:
+        try:
+            await run_in_threadpool(athlete_search.ensure_fresh)
+        except Exception as e:
+            print(f"⚠️ No se pudo construir el índice de atletas: {e}")
+
+    if not IS_VERCEL and os.getenv("OCR_PRELOAD", "1") == "1":
+        await asyncio.get_running_loop().run_in_executor(None, ocr_service.load)
+    yield
+    set_version_provider(None)
+    app.state.db.close()
+    if not IS_VERCEL:
+        ocr_service.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def get_db(request: Request) -> PostgresDB:
+    # En serverless el lifespan puede no ejecutarse: PostgresDB() es singleton
+    return getattr(request.app.state, "db", None) or PostgresDB()
+
+
+def get_home_repository(
+    db: PostgresDB = Depends(get_db),
+) -> home_repository.HomeRepository:
+    return home_repository.HomeRepository(db)
+
+
+def get_athlete_repository(
+    db: PostgresDB = Depends(get_db),
+) -> athlete_repository.AthleteRepository:
+    return athlete_repository.AthleteRepository(db)
+
+
+API_BASE_PATH = "/api"
+API_VERSION = "/v1"
+API_PATH = API_BASE_PATH + API_VERSION
+
+
+# Límite de tamaño de la foto de perfil (los móviles rondan 3-8 MB)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 10 * 1024 * 1024))
+UPLOAD_CHUNK_BYTES = 256 * 1024
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+async def read_upload_capped(file: UploadFile, max_bytes: int) -> bytes:
+    """Lee la subida por bloques y corta en cuanto supera `max_bytes`."""
+    buffer = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        buffer.extend(chunk)
+        if len(buffer) > max_bytes:
+            raise UploadTooLargeError()
+    return bytes(buffer)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Corta la subida mientras se recibe, en cuanto el cuerpo supera
+    `max_bytes`. Starlette lee (y vuelca a disco) todo el multipart antes de
+    llamar al endpoint, y con Transfer-Encoding: chunked no hay
+    Content-Length que mirar, así que el límite se aplica contando los bytes
+    de `receive`.
+    """
+
+    def __init__(self, app, path: str, max_bytes: int):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    async def _reject(send):
+        response = JSONResponse(
+            status_code=413,
+            content={"status": "error", "message": "File too large"},
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": response.raw_headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": response.body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            return await self.app(scope, receive, send)
+
+        # Si el cliente declara el tamaño, rechazamos sin leer nada
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            return await self._reject(send)
+
+        received = 0
+        rejected = False
+        response_started = False
+
+        async def capped_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    rejected = True
+                    if not response_started:
+                        await self._reject(send)
+                    # El parser del multipart lo ve como una desconexión
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if rejected:
+                return  # ya hemos respondido con el 413
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, capped_receive, guarded_send)
+        except Exception:
+            if not rejected:
+                raise
+
+
+# Margen para las cabeceras del multipart y el resto de campos. Se registra
+# ANTES que CORS (add_middleware apila hacia fuera): así CORS queda por fuera
+# y el 413 también lleva sus cabeceras; si no, el navegador vería un error CORS
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path=f"{API_PATH}/upload-profile-picture",
+    max_bytes=UPLOAD_MAX_BYTES + 64 * 1024,
+)
 
-app = FastAPI()
 
 # Allow CORS for client development
 app.add_middleware(
@@ -54,67 +224,6 @@ app.add_middleware(
     UPLOAD PHOTO
 """
 
-API_BASE_PATH = "/api"
-API_VERSION = "/v1"
-API_PATH = API_BASE_PATH + API_VERSION
-
-
-def preprocess_image_smart(image_bytes):
-    # Convertir bytes a imagen OpenCV
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-    # A. Redimensionar si es gigante (Mejora velocidad y precisión)
-    # Las fotos de móvil modernas son enormes (3000px+). EasyOCR prefiere ~1000px.
-    height, width = img.shape[:2]
-    if width > 1200:
-        scale = 1200 / width
-        dim = (1200, int(height * scale))
-        img = cv2.resize(img, dim, interpolation=cv2.INTER_AREA)
-
-    # B. Solo Escala de Grises (Sin binarizar agresivamente)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-    # (Opcional) Un poco de desenfoque suave para quitar el ruido del granulado ISO
-    # gray = cv2.GaussianBlur(gray, (3, 3), 0)
-
-    # Devolver bytes
-    is_success, buffer = cv2.imencode(".jpg", gray)
-    return buffer.tobytes()
-
-
-# --- 3. LIMPIEZA DE TEXTO (Leet Speak) ---
-def clean_ocr_text(text):
-    text = text.upper()
-    # Mapa extendido de errores comunes
-    replacements = {
-        "0": "O",
-        "1": "I",
-        "2": "Z",
-        "3": "E",
-        "4": "A",
-        "5": "S",
-        "6": "G",
-        "8": "B",
-        "9": "S",
-        "@": "A",
-        "€": "E",
-        "$": "S",
-        "|": "I",
-        "(": " ",
-        ")": " ",
-        "[": "I",
-        "]": "I",
-        "{": "I",
-        "}": "I",  # <--- NUEVOS
-        "-": " ",
-        "_": " ",
-        "/": " ",
-    }
-    for char, replacement in replacements.items():
-        text = text.replace(char, replacement)
-    return text
-
 
 @app.post(f"{API_PATH}/verify-id")
 async def verify_identity(
@@ -125,76 +234,106 @@ async def verify_identity(
             status_code=501,
             content={"verified": False, "msg": "OCR verification is not available on Vercel (model too large for serverless)."}
         )
-    reader = easyocr.Reader(["es"], gpu=True)  # Pon True si tienes GPU NVIDIA
     print(f"🕵️‍♂️ Verificando a: {athlete_name}")
 
     try:
-        # A. Leer imagen original
-        image_bytes = await dni_image.read()
-
-        # B. Pre-procesado SUAVE (Gris + Resize)
-        processed_bytes = preprocess_image_smart(image_bytes)
-
-        # C. OCR: Leer texto
-        # detail=0 devuelve lista de strings. paragraph=False lee línea a línea.
-        result_list = reader.readtext(processed_bytes, detail=0)
-
-        # Unimos todo el texto encontrado
-        full_text_raw = " ".join(result_list)
-
-        # D. Limpieza de caracteres
-        full_text_clean = clean_ocr_text(full_text_raw)
+        image_bytes = await read_upload_capped(dni_image, UPLOAD_MAX_BYTES)
 
-        # Log para que veas qué está leyendo realmente ahora
-        print(f"📝 Texto Leído: {full_text_clean[:100]}...")
+        # Decodificación, pre-procesado, OCR y coincidencia en el pool del servicio
+        return await ocr_service.verify(image_bytes, athlete_name)
 
-        # E. Coincidencia (Divide y Vencerás)
-        # Limpiamos también el nombre que nos llega del formulario
-        target_name_clean = clean_ocr_text(athlete_name)
-        target_parts = target_name_clean.split()
-
-        matches = 0
-        details = []
-
-        for part in target_parts:
-            # Filtro: Ignorar palabras muy cortas (ej: "DE", "LA") si quieres
-            if len(part) < 2:
-                continue
-
-            # Buscamos la palabra en el texto completo
-            score = fuzz.partial_token_set_ratio(part, full_text_clean)
-            details.append(f"{part}: {int(score)}%")
-
-            # Umbral 80%
-            if score > 80:
-                matches += 1
-
-        # F. Veredicto
-        # Permitimos 1 fallo si el nombre es largo (3+ palabras)
-        required_matches = len(target_parts)
-        if len(target_parts) >= 3:
-            required_matches -= 1
+    except UploadTooLargeError:
+        return JSONResponse(
+            status_code=413,
+            content={"verified": False, "msg": "Imagen demasiado grande"},
+        )
+    except OcrBusyError:
+        return JSONResponse(
+            status_code=503,
+            content={"verified": False, "msg": "Servidor ocupado, inténtalo de nuevo"},
+        )
+    except asyncio.TimeoutError:
+        return JSONResponse(
+            status_code=504,
+            content={"verified": False, "msg": "La verificación ha tardado demasiado"},
+        )
+    except Exception as e:
+        print(f"❌ Error crítico: {e}")
+        return {"verified": False, "msg": "Error en servidor"}
 
-        is_verified = matches >= required_matches
 
-        return {
-            "verified": is_verified,
-            "score": matches * 100 / len(target_parts)
-            if target_parts
-            else 0,  # Aproximado
-            "msg": "Identidad confirmada" if is_verified else "Nombre no encontrado",
-            "details": details,
-            "raw_text": full_text_clean[:60],  # Para debug
-        }
+@app.post(f"{API_PATH}/verify-id/batch")
+async def verify_identity_batch(
+    dni_images: list[UploadFile] = File(...),
+    athlete_names: list[str] = Form(...),
+):
+    """
+    Verifica varios atletas a la vez (inscripciones de club).
+    Recibe N imágenes y N nombres en el mismo orden y devuelve un veredicto
+    por pareja con el mismo formato que /verify-id (sin `timings_ms`, que en
+    lote solo tienen sentido agregados en /verify-id/stats).
+    Cada imagen tiene el mismo límite de tamaño que la subida de fotos.
+    """
+    if IS_VERCEL:
+        return JSONResponse(
+            status_code=501,
+            content={"verified": False, "msg": "OCR verification is not available on Vercel (model too large for serverless)."}
+        )
+    if len(dni_images) != len(athlete_names):
+        return JSONResponse(
+            status_code=422,
+            content={"msg": "Debe haber el mismo número de imágenes y de nombres"},
+        )
+    if len(dni_images) > ocr_service.max_batch:
+        return JSONResponse(
+            status_code=413,
+            content={"msg": f"Máximo {ocr_service.max_batch} verificaciones por lote"},
+        )
+    print(f"🕵️‍♂️ Verificando lote de {len(dni_images)} atletas")
 
+    try:
+        items = []
+        for position, (image, name) in enumerate(zip(dni_images, athlete_names)):
+            try:
+                items.append((await read_upload_capped(image, UPLOAD_MAX_BYTES), name))
+            except UploadTooLargeError:
+                return JSONResponse(
+                    status_code=413,
+                    content={
+                        "msg": f"La imagen {position} supera el tamaño máximo",
+                        "index": position,
+                    },
+                )
+        return {"results": await ocr_service.verify_batch(items)}
+
+    except OcrBusyError:
+        return JSONResponse(
+            status_code=503,
+            content={"verified": False, "msg": "Servidor ocupado, inténtalo de nuevo"},
+        )
+    except asyncio.TimeoutError:
+        return JSONResponse(
+            status_code=504,
+            content={"verified": False, "msg": "La verificación ha tardado demasiado"},
+        )
     except Exception as e:
-        print(f"❌ Error crítico: {e}")
+        print(f"❌ Error crítico en lote: {e}")
         return {"verified": False, "msg": "Error en servidor"}
 
 
+@app.get(f"{API_PATH}/verify-id/stats")
+def verify_identity_stats():
+    """Tiempo de carga del modelo y latencia media por etapa del OCR."""
+    if IS_VERCEL:
+        return {"model_loaded": False}
+    return ocr_service.stats()
+
+
 @app.post(f"{API_PATH}/upload-profile-picture")
 async def upload_profile_picture(
-    athlete_id: str = Form(...), file: UploadFile = File(...)
+    athlete_id: str = Form(...),
+    file: UploadFile = File(...),
+    repo: home_repository.HomeRepository = Depends(get_home_repository),
 ):
     try:
         print(
@@ -204,40 +343,95 @@ async def upload_profile_picture(
         if not file:
             return {"status": "error", "message": "No file uploaded"}
 
-        file_bytes = await file.read()
-        repo = home_repository.HomeRepository()
+        file_bytes = await read_upload_capped(file, UPLOAD_MAX_BYTES)
 
-        # Obtener extensión del archivo original
-        file_name = file.filename
-        content_type = file.content_type
+        # Decodificar una vez y generar avatar/card/full (CPU, fuera del loop)
+        variants = await run_in_threadpool(build_profile_variants, file_bytes)
+        del file_bytes
 
-        public_url = repo.upload_profile_picture(
-            athlete_id, file_bytes, file_name, content_type
+        urls = await run_in_threadpool(
+            repo.upload_profile_picture, athlete_id, variants
         )
 
+        # Los leaderboards cacheados incluyen image_url
+        clear_caches()
+
         return {
             "status": "success",
-            "image_url": public_url,
+            "image_url": urls["image_url"],
+            "variants": urls["variants"],
             "message": "Profile picture uploaded successfully",
         }
+    except UploadTooLargeError:
+        return JSONResponse(
+            status_code=413,
+            content={"status": "error", "message": "File too large"},
+        )
+    except ImageTooLargeError as e:
+        return JSONResponse(
+            status_code=413, content={"status": "error", "message": str(e)}
+        )
+    except ValueError as e:
+        return JSONResponse(
+            status_code=415, content={"status": "error", "message": str(e)}
+        )
     except Exception as e:
         print(f"❌ Error in upload endpoint: {e}")
         return {"status": "error", "message": str(e)}
 
 
-@app.get(f"{API_PATH}/athletes")
-def get_all_athletes():
-    """Devuelve listado de todos los atletas para el buscador."""
-    repo = home_repository.HomeRepository()
+@app.get(f"{API_PATH}/athletes", deprecated=True)
+def get_all_athletes(
+    repo: home_repository.HomeRepository = Depends(get_home_repository),
+):
+    """
+    Devuelve listado de todos los atletas para el buscador.
+    Obsoleto: carga la tabla entera; usar /athletes/page o /athletes/search.
+    """
     return repo.get_all_athletes()
 
+
+@app.get(f"{API_PATH}/athletes/page")
+def get_all_athletes_page(
+    limit: int = Query(500, ge=1, le=1000),
+    cursor: str | None = Query(default=None),
+    repo: home_repository.HomeRepository = Depends(get_home_repository),
+):
+    """
+    Listado paginado (keyset) de atletas (id y nombre) para el buscador.
+    Devuelve `items` y `next_cursor` (null en la última página).
+    """
+    try:
+        return repo.get_athletes_page(limit=limit, cursor=cursor)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+
+
+@app.get(f"{API_PATH}/athletes/search")
+def search_athletes(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+):
+    """
+    Buscador de atletas en servidor: autocompletado por prefijo (nombre o
+    apellido, sin acentos) y, si no hay coincidencias, búsqueda difusa.
+    Devuelve los `limit` mejores con su `score` (0-100).
+    """
+    return {"query": q, "items": athlete_search.search(q, limit=limit)}
+
+
+@app.get(f"{API_PATH}/athletes/search/stats")
+def search_athletes_stats():
+    return athlete_search.stats()
+
+
 @app.get(f"{API_PATH}/clubs")
 def get_all_clubs(
     q: str | None = Query(default=None),
     limit: int = Query(10, ge=1, le=50),
+    repo: home_repository.HomeRepository = Depends(get_home_repository),
 ):
     """Devuelve listado de clubes para el buscador (si están disponibles)."""
-    repo = home_repository.HomeRepository()
     return repo.get_all_clubs(limit=limit, q=q)
 
 
@@ -247,69 +441,82 @@ def get_all_clubs(
 
 
 @app.get(f"{API_PATH}/analytics/athletes-per-period")
-def athletes_per_period():
+def athletes_per_period(
+    repo: home_repository.HomeRepository = Depends(get_home_repository),
+):
     """Returns the KPI card data for athletes per period."""
-    repo = home_repository.HomeRepository()
     return repo.get_unique_athletes_per_period()
 
 
 @app.get(f"{API_PATH}/analytics/athletes-per-year")
-def athletes_per_year():
+def athletes_per_year(
+    repo: home_repository.HomeRepository = Depends(get_home_repository),
+):
     """Returns summar cards for Home."""
-    repo = home_repository.HomeRepository()
     return repo.get_unique_athletes_per_year()
 
 
 @app.get(f"{API_PATH}/analytics/athletes-stats")
-def athletes_stats():
+def athletes_stats(
+    repo: home_repository.HomeRepository = Depends(get_home_repository),
+):
     """Returns YTD and monthly athlete stats for Home."""
-    repo = home_repository.HomeRepository()
     return repo.get_athletes_ytd_stats()
 
 
 @app.get(f"{API_PATH}/analytics/competitions-per-year")
-def competitions_per_year():
+def competitions_per_year(
+    repo: home_repository.HomeRepository = Depends(get_home_repository),
+):
     """Returns summar cards for Home."""
-    repo = home_repository.HomeRepository()
     return repo.get_competitions_per_year()
 
 
 @app.get(f"{API_PATH}/analytics/average-for-event")
-def average_for_event():
+def average_for_event(
+    repo: home_repository.HomeRepository = Depends(get_home_repository),
+):
     """Returns average number of athletes per event."""
-    repo = home_repository.HomeRepository()
     return repo.get_average_for_event()
 
 
 @app.get(f"{API_PATH}/analytics/historical-leaderboard")
 def historical_leaderboard(
-    sex: str = Query("M"),
-    limit: int = Query(10),
+    sex: str = Query("M", pattern="^(M|F)$"),
+    limit: int = Query(10, ge=1, le=100),
+    repo: home_repository.HomeRepository = Depends(get_home_repository),
 ):
     """
     Devuelve el Ranking Histórico Absoluto (All-Time) de España.
     Muestra el mejor levantamiento de cada atleta.
     """
-    repo = home_repository.HomeRepository()
     return repo.get_historical_leaderboard(sex, limit=limit)
 
 
 @app.get(f"{API_PATH}/analytics/monthly-top5-general")
-def monthly_top5_general():
+def monthly_top5_general(
+    repo: home_repository.HomeRepository = Depends(get_home_repository),
+):
     """
     Devuelve el Top 5 mensual de cada disciplina (Squat, Bench, Deadlift, Total, GL)
     para hombres y mujeres en España.
     """
-    repo = home_repository.HomeRepository()
     return repo.get_monthly_top_5_general()
 
 
+@app.get(f"{API_PATH}/analytics/cache-stats")
+def analytics_cache_stats():
+    """Devuelve los contadores hit/miss de las cachés de la Home."""
+    return cache_stats()
+
+
 @app.get(f"{API_PATH}/analytics/upcoming-competitions")
-def upcoming_competitions():
+def upcoming_competitions(
+    repo: home_repository.HomeRepository = Depends(get_home_repository),
+):
     """
     Devuelve una lista de las próximas competiciones ordenadas por fecha.
     """
-    repo = home_repository.HomeRepository()
     return repo.get_upcoming_competitions()
 
 
@@ -319,12 +526,45 @@ def upcoming_competitions():
 
 
 @app.get(f"{API_PATH}/athletes_profiles")
-def get_athletes_profiles():
+def get_athletes_profiles(
+    repo: athlete_repository.AthleteRepository = Depends(get_athlete_repository),
+):
     """Devuelve listado de todos los atletas para el buscador."""
-    repo = athlete_repository.AthleteRepository()
     return repo.get_athletes_with_prs()
 
 
+@app.get(f"{API_PATH}/athletes_profiles/page")
+def get_athletes_profiles_page(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(default=None),
+    sex: str | None = Query(default=None),
+    country: str | None = Query(default=None),
+    weight_class: str | None = Query(default=None),
+    federation: str | None = Query(default=None),
+    q: str | None = Query(default=None, description="Prefijo del nombre"),
+    include_total: bool = Query(False),
+    repo: athlete_repository.AthleteRepository = Depends(get_athlete_repository),
+):
+    """
+    Listado paginado (keyset) de atletas con sus PRs y filtros en servidor.
+    Devuelve `items`, `next_cursor` (null en la última página) y `total`
+    (solo si include_total=true).
+    """
+    try:
+        return repo.get_athletes_page(
+            limit=limit,
+            cursor=cursor,
+            sex=sex,
+            country=country,
+            weight_class=weight_class,
+            federation=federation,
+            name_prefix=q,
+            include_total=include_total,
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True)  # DEV
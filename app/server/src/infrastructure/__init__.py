@@ -1,5 +1,7 @@
 import os
 
+from .postgres_database import PostgresDB
+
 # Only import MongoDB/scrapers when NOT on Vercel
 # (pymongo is not available in Vercel's serverless environment)
 if os.environ.get("VERCEL") != "1":
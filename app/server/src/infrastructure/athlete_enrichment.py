@@ -0,0 +1,97 @@
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.engine import Engine
+
+
+@dataclass(frozen=True)
+class EnrichmentRule:
+    """
+    Relleno retroactivo de dim_athlete. `sql` es un UPDATE que se limita a
+    los atletas de la tabla temporal `affected_athletes (athlete_id uuid)`.
+    """
+
+    name: str
+    sql: str
+
+
+# Atletas sin país que han competido en la AEP -> 'Spain'
+AEP_COUNTRY_RULE = EnrichmentRule(
+    name="aep_country",
+    sql="""
+        UPDATE dim_athlete da
+        SET country = 'Spain'
+        FROM affected_athletes aa
+        WHERE da.id = aa.athlete_id
+          AND (da.country IS NULL OR da.country = '' OR da.country ILIKE 'nan')
+          AND EXISTS (
+              SELECT 1
+              FROM fact_results fr
+              JOIN dim_competition dc ON fr.competition_id = dc.id
+              WHERE fr.athlete_id = da.id
+                AND dc.federation = 'AEP'
+          )
+    """,
+)
+
+DEFAULT_RULES = [AEP_COUNTRY_RULE]
+
+
+class AthleteEnricher:
+    """
+    Ejecuta las reglas de enriquecimiento solo sobre los atletas afectados
+    por una carga, en lugar de un UPDATE sobre todo fact_results.
+
+    Los ids se vuelcan a una tabla temporal (`affected_athletes`) y cada
+    regla hace JOIN con ella, todo en una transacción. Nuevas reglas (sexo,
+    año de nacimiento, club...) solo tienen que añadirse a `rules`.
+    """
+
+    CREATE_AFFECTED = text("""
+        CREATE TEMP TABLE affected_athletes (athlete_id UUID PRIMARY KEY)
+        ON COMMIT DROP
+    """)
+    INSERT_AFFECTED = text("""
+        INSERT INTO affected_athletes (athlete_id)
+        SELECT DISTINCT unnest(:ids)
+    """).bindparams(bindparam("ids", type_=ARRAY(UUID(as_uuid=False))))
+    INSERT_ALL = text("INSERT INTO affected_athletes SELECT id FROM dim_athlete")
+
+    def __init__(self, engine: Engine, rules: Optional[List[EnrichmentRule]] = None):
+        self.engine = engine
+        self.rules = DEFAULT_RULES if rules is None else rules
+
+    def run(self, athlete_ids: Optional[Iterable[str]] = None) -> dict:
+        """
+        Aplica las reglas a `athlete_ids` (o a todos los atletas si es None).
+        Devuelve {regla: filas actualizadas}.
+        """
+        if athlete_ids is not None:
+            athlete_ids = [str(i) for i in athlete_ids]
+            if not athlete_ids:
+                return {}
+
+        start = time.perf_counter()
+        updated = {}
+        with self.engine.connect() as conn:
+            conn.execute(self.CREATE_AFFECTED)
+            if athlete_ids is None:
+                conn.execute(self.INSERT_ALL)
+            else:
+                conn.execute(self.INSERT_AFFECTED, {"ids": athlete_ids})
+            # Estadísticas para que el planner elija bien el JOIN
+            conn.execute(text("ANALYZE affected_athletes"))
+            for rule in self.rules:
+                updated[rule.name] = conn.execute(text(rule.sql)).rowcount
+            conn.commit()
+
+        if any(updated.values()):
+            print(
+                f"[Enrichment] {updated} "
+                f"({len(athlete_ids) if athlete_ids is not None else 'todos los'} "
+                f"atletas en {time.perf_counter() - start:.2f}s)"
+            )
+        return updated
@@ -0,0 +1,264 @@
+import bisect
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Optional
+
+from rapidfuzz import fuzz, process
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from src.infrastructure.cache import current_version
+from src.infrastructure.postgres_database import PostgresDB
+
+
+def fold_name(name: Optional[str]) -> str:
+    """
+    Normaliza un nombre para búsqueda: minúsculas, sin acentos y con todo lo
+    que no sea alfanumérico colapsado a un espacio.
+    Ex: "Jesús  Olivares-Ruiz" -> "jesus olivares ruiz"
+    """
+    if not name:
+        return ""
+    # Igual que _generate_slug pero plegando antes los acentos (á -> a, ñ -> n)
+    decomposed = unicodedata.normalize("NFKD", str(name))
+    ascii_name = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", ascii_name.lower()).strip()
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    """Estado inmutable del índice: las búsquedas nunca ven uno a medias."""
+
+    # athlete_id -> (name, sex, country, folded_name)
+    entries: dict
+    # Claves ordenadas para autocompletado: nombre completo y cada sufijo que
+    # empieza en una palabra ("jesus olivares", "olivares") + su athlete_id
+    keys: list
+    key_ids: list
+    # athlete_id -> folded_name, para el fallback difuso
+    choices: dict
+    version: object
+    built_at: float
+
+
+class AthleteSearchIndex:
+    """
+    Índice en memoria de dim_athlete para el buscador de atletas.
+
+    - Autocompletado por prefijo con bisect sobre una lista ordenada de
+      claves (por nombre y por apellido): O(log n) por búsqueda.
+    - Si ningún prefijo coincide, fallback difuso con rapidfuzz sobre los
+      nombres normalizados (tolera erratas y el orden de las palabras).
+
+    Se reconstruye de forma incremental cuando cambia el watermark de
+    etl_sync_logs (ver EtlWatermark): solo se re-normalizan y re-insertan
+    los atletas nuevos, modificados o borrados.
+    """
+
+    QUERY = text("SELECT id::text AS id, name, sex, country FROM dim_athlete")
+
+    # Con más cambios que esto es más barato reordenar todo que insertar uno a uno
+    MAX_INCREMENTAL_CHANGES = 2000
+    # Sin proveedor de versión (p.ej. serverless sin lifespan) se refresca por edad
+    MAX_AGE_WITHOUT_VERSION = 60 * 60
+
+    def __init__(self, engine: Optional[Engine] = None):
+        self._engine = engine
+        self._snapshot: Optional[_Snapshot] = None
+        self._build_lock = threading.Lock()
+        self.last_build = {}
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            self._engine = PostgresDB().get_engine()
+        return self._engine
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _keys_for(athlete_id: str, folded: str) -> list:
+        if not folded:
+            return []
+        keys = [(folded, athlete_id)]
+        for match in re.finditer(r" (?=[a-z0-9])", folded):
+            keys.append((folded[match.end() :], athlete_id))
+        return keys
+
+    def _is_stale(self, snapshot: Optional[_Snapshot], version) -> bool:
+        if snapshot is None:
+            return True
+        if version is None:
+            return time.time() - snapshot.built_at > self.MAX_AGE_WITHOUT_VERSION
+        return version != snapshot.version
+
+    def ensure_fresh(self) -> _Snapshot:
+        """
+        Devuelve el snapshot vigente, reconstruyéndolo si hay una carga nueva.
+        Mientras un hilo reconstruye, el resto sigue usando el snapshot anterior.
+        """
+        version = current_version()
+        snapshot = self._snapshot
+        if not self._is_stale(snapshot, version):
+            return snapshot
+
+        if snapshot is not None and not self._build_lock.acquire(blocking=False):
+            return snapshot
+        if snapshot is None:
+            # Primera carga: los demás esperan en lugar de ver un índice vacío
+            self._build_lock.acquire()
+        try:
+            snapshot = self._snapshot
+            if self._is_stale(snapshot, version):
+                self._snapshot = self._rebuild(snapshot, version)
+            return self._snapshot
+        finally:
+            self._build_lock.release()
+
+    def _rebuild(self, previous: Optional[_Snapshot], version) -> _Snapshot:
+        start = time.perf_counter()
+        with self.engine.connect() as conn:
+            rows = conn.execute(self.QUERY).fetchall()
+
+        old_entries = previous.entries if previous else {}
+        entries = {}
+        added, removed = [], []
+        for athlete_id, name, sex, country in rows:
+            old = old_entries.get(athlete_id)
+            if old is not None and old[0] == name:
+                # Nombre sin cambios: reutilizamos el plegado ya calculado
+                entries[athlete_id] = (name, sex, country, old[3])
+                continue
+            entries[athlete_id] = (name, sex, country, fold_name(name))
+            if old is not None:
+                removed.append(athlete_id)
+            added.append(athlete_id)
+        removed.extend(i for i in old_entries if i not in entries)
+
+        changes = len(added) + len(removed)
+        if previous is None or changes > self.MAX_INCREMENTAL_CHANGES:
+            pairs = []
+            for athlete_id, entry in entries.items():
+                pairs.extend(self._keys_for(athlete_id, entry[3]))
+            pairs.sort()
+            keys = [k for k, _ in pairs]
+            key_ids = [i for _, i in pairs]
+            mode = "full"
+        else:
+            keys, key_ids = list(previous.keys), list(previous.key_ids)
+            for athlete_id in removed:
+                for key in self._keys_for(athlete_id, old_entries[athlete_id][3]):
+                    pos = bisect.bisect_left(keys, key[0])
+                    while pos < len(keys) and keys[pos] == key[0]:
+                        if key_ids[pos] == athlete_id:
+                            del keys[pos], key_ids[pos]
+                            break
+                        pos += 1
+            for athlete_id in added:
+                for key, key_id in self._keys_for(athlete_id, entries[athlete_id][3]):
+                    pos = bisect.bisect_left(keys, key)
+                    keys.insert(pos, key)
+                    key_ids.insert(pos, key_id)
+            mode = "incremental"
+
+        self.last_build = {
+            "mode": mode,
+            "athletes": len(entries),
+            "added": len(added),
+            "removed": len(removed),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        print(
+            f"🔎 Índice de atletas ({mode}): {len(entries)} atletas, "
+            f"+{len(added)} / -{len(removed)} en {self.last_build['seconds']}s"
+        )
+        choices = {i: entry[3] for i, entry in entries.items() if entry[3]}
+        return _Snapshot(entries, keys, key_ids, choices, version, time.time())
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+
+    def _prefix_matches(self, snapshot: _Snapshot, query: str, limit: int) -> list:
+        keys, key_ids = snapshot.keys, snapshot.key_ids
+        matches = {}
+        full_name_matches = 0
+        pos = bisect.bisect_left(keys, query)
+        while pos < len(keys) and keys[pos].startswith(query):
+            athlete_id = key_ids[pos]
+            folded = snapshot.entries[athlete_id][3]
+            # Prefijo del nombre completo > prefijo de un apellido
+            score = 100.0 if folded.startswith(query) else 95.0
+            if matches.get(athlete_id, 0) < score:
+                matches[athlete_id] = score
+                if score == 100.0:
+                    full_name_matches += 1
+            pos += 1
+            # Las claves van en orden alfabético, no por puntuación: solo se
+            # puede parar cuando ya hay suficientes de 100 (con margen para
+            # ordenarlas por longitud); un 95 nunca las desplaza
+            if full_name_matches >= limit * 5:
+                break
+        ranked = sorted(
+            matches.items(),
+            key=lambda m: (-m[1], len(snapshot.entries[m[0]][3]), m[0]),
+        )
+        return ranked[:limit]
+
+    def search(self, query: str, limit: int = 10, min_score: float = 70) -> list:
+        """
+        Devuelve hasta `limit` atletas para `query` con su puntuación (0-100):
+        coincidencias por prefijo y, si no hay ninguna, coincidencias difusas.
+        """
+        folded = fold_name(query)
+        if not folded:
+            return []
+        snapshot = self.ensure_fresh()
+
+        results = [
+            (athlete_id, score, "prefix")
+            for athlete_id, score in self._prefix_matches(snapshot, folded, limit)
+        ]
+
+        # El difuso recorre todos los nombres: solo cuando el prefijo no da nada
+        if not results and len(folded) >= 3:
+            fuzzy = process.extract(
+                folded,
+                snapshot.choices,
+                scorer=fuzz.token_sort_ratio,
+                limit=limit,
+                score_cutoff=min_score,
+            )
+            results = [
+                (athlete_id, round(score, 1), "fuzzy")
+                for _, score, athlete_id in fuzzy
+            ]
+
+        items = []
+        for athlete_id, score, match in results:
+            name, sex, country, _ = snapshot.entries[athlete_id]
+            items.append(
+                {
+                    "athlete_id": athlete_id,
+                    "name": name,
+                    "sex": sex,
+                    "country": country,
+                    "score": score,
+                    "match": match,
+                }
+            )
+        return items
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "athletes": len(snapshot.entries) if snapshot else 0,
+            "keys": len(snapshot.keys) if snapshot else 0,
+            "version": snapshot.version if snapshot else None,
+            "last_build": self.last_build,
+        }
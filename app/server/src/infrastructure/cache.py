@@ -0,0 +1,247 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+class ResultCache:
+    """
+    In-process cache for the results of a single repository method.
+
+    - Fresh (age < ttl): returned directly.
+    - Stale (ttl <= age < ttl + stale_ttl): returned directly while ONE
+      background thread recomputes it (stale-while-revalidate).
+    - Missing/expired: computed synchronously. Concurrent misses on the same
+      key wait for a single query instead of launching one each (single-flight).
+
+    When a data version is available (see `set_version_provider`), entries
+    are tagged with it: a new version invalidates them immediately, and while
+    the version doesn't change they stay fresh for `max_age` instead of `ttl`.
+
+    Exceptions are never stored, and values rejected by `cache_if` (e.g.
+    empty results) are returned but not stored either.
+
+    At most `max_entries` keys are kept; the least recently used one is
+    evicted first, so arbitrary query parameters can't grow it without bound.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        stale_ttl: float = 0,
+        max_age: Optional[float] = None,
+        cache_if: Optional[Callable[[Any], bool]] = None,
+        max_entries: int = 256,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_age = max_age if max_age is not None else ttl
+        self.cache_if = cache_if
+        self.max_entries = max_entries
+
+        # key -> (value, stored_at, version), del menos al más usado
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.invalidations = 0
+        self.errors = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        version = current_version()
+        fresh_for = self.ttl if version is None else self.max_age
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at, entry_version = entry
+                age = time.monotonic() - stored_at
+
+                if version is not None and entry_version != version:
+                    # Ha llegado un ETL nuevo: el valor guardado ya no sirve
+                    self.invalidations += 1
+                elif age < fresh_for:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return value
+                elif age < fresh_for + self.stale_ttl:
+                    self.stale_hits += 1
+                    self._entries.move_to_end(key)
+                    if key not in self._inflight:
+                        self._inflight[key] = threading.Event()
+                        threading.Thread(
+                            target=self._refresh,
+                            args=(key, compute, version),
+                            daemon=True,
+                        ).start()
+                    return value
+
+            self.misses += 1
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = threading.Event()
+                self._inflight[key] = event
+
+        if not leader:
+            # Otra petición ya está calculando esta clave: esperamos su resultado
+            event.wait()
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                return entry[0]
+            # El líder falló: calculamos nosotros (y propagamos el error si lo hay)
+            return compute()
+
+        try:
+            value = compute()
+            self._store(key, value, version)
+            return value
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            self._release(key)
+
+    def _refresh(self, key: str, compute: Callable[[], Any], version):
+        try:
+            self._store(key, compute(), version)
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            # Mantenemos el valor antiguo; se reintentará en la siguiente petición
+            with self._lock:
+                self.errors += 1
+            print(f"⚠️ Error refrescando caché '{self.name}': {e}")
+        finally:
+            self._release(key)
+
+    def _store(self, key: str, value: Any, version):
+        if self.cache_if is not None and not self.cache_if(value):
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic(), version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _release(self, key: str):
+        with self._lock:
+            event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "max_age": self.max_age,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "invalidations": self.invalidations,
+                "errors": self.errors,
+                "evictions": self.evictions,
+            }
+
+
+# Registro global de cachés (para estadísticas e invalidación)
+_caches: Dict[str, ResultCache] = {}
+
+# Función que devuelve la versión actual de los datos (p.ej. watermark del ETL)
+_version_provider: Optional[Callable[[], Any]] = None
+
+
+def set_version_provider(provider: Optional[Callable[[], Any]]):
+    """
+    Registra la función que identifica la versión de los datos. Las entradas
+    guardadas con otra versión se consideran inválidas.
+    """
+    global _version_provider
+    _version_provider = provider
+
+
+def current_version():
+    if _version_provider is None:
+        return None
+    try:
+        return _version_provider()
+    except Exception as e:
+        print(f"⚠️ No se pudo obtener la versión de los datos: {e}")
+        return None
+
+
+def _make_key(args: tuple, kwargs: dict) -> str:
+    return repr((args, sorted(kwargs.items())))
+
+
+def cached(
+    ttl: float,
+    stale_ttl: float = 0,
+    max_age: Optional[float] = 12 * 60 * 60,
+    name: str | None = None,
+    cache_if: Optional[Callable[[Any], bool]] = None,
+    max_entries: int = 256,
+):
+    """
+    Decorador para métodos de repositorio. La clave es método + argumentos
+    (sin `self`), así que la caché se comparte entre instancias del repositorio.
+
+    :param ttl: segundos durante los que el resultado se sirve como fresco
+    :param stale_ttl: segundos extra en los que se sirve el valor antiguo
+                      mientras se recalcula en segundo plano
+    :param max_age: frescura cuando hay versión de datos (watermark del ETL);
+                    solo limita resultados que dependen de la fecha actual
+    :param cache_if: si devuelve False para un resultado, se devuelve sin
+                     guardarlo (p.ej. None cuando la consulta no trae filas)
+    :param max_entries: número máximo de claves guardadas (LRU)
+    """
+
+    def decorator(func):
+        cache = ResultCache(
+            name or func.__qualname__,
+            ttl,
+            stale_ttl,
+            max_age,
+            cache_if,
+            max_entries,
+        )
+        _caches[cache.name] = cache
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            key = _make_key(args, kwargs)
+            return cache.get_or_compute(key, lambda: func(self, *args, **kwargs))
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def cache_stats() -> dict:
+    """Devuelve los contadores de todas las cachés registradas."""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+def clear_caches():
+    for cache in _caches.values():
+        cache.clear()
@@ -0,0 +1,73 @@
+import threading
+import time
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+class EtlWatermark:
+    """
+    Watermark of the last ETL run that actually landed data in Postgres
+    (mongo_to_postgresql.run_pipeline / ingest_aep_2023.run_ingestion both
+    log to etl_sync_logs).
+
+    Used as the data version of the API caches: results stay valid until a
+    new run appears. The lookup is a single row from a partial index and is
+    performed at most once every `check_interval` seconds per process.
+    """
+
+    QUERY = text("""
+        SELECT created_at
+        FROM etl_sync_logs
+        WHERE status IN ('success', 'partial')
+          AND rows_processed > 0
+        ORDER BY created_at DESC
+        LIMIT 1
+    """)
+
+    INDEX_DDL = text("""
+        CREATE INDEX IF NOT EXISTS idx_etl_sync_logs_data_landed
+        ON etl_sync_logs (created_at DESC)
+        WHERE status IN ('success', 'partial') AND rows_processed > 0
+    """)
+
+    def __init__(self, engine: Engine, check_interval: float = 30):
+        self.engine = engine
+        self.check_interval = check_interval
+
+        self._value = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def current(self) -> str | None:
+        """
+        Devuelve el watermark vigente (ISO string) o None si no hay ninguno.
+        Si la consulta falla se mantiene el último valor conocido.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (
+                self._checked_at is not None
+                and now - self._checked_at < self.check_interval
+            ):
+                return self._value
+            # Marcamos antes de consultar: el resto de hilos siguen usando el
+            # valor anterior en lugar de repetir la query
+            self._checked_at = now
+
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(self.QUERY).scalar()
+            value = result.isoformat() if result else None
+        except Exception as e:
+            print(f"⚠️ No se pudo leer etl_sync_logs: {e}")
+            return self._value
+
+        with self._lock:
+            self._value = value
+        return value
+
+    def create_indexes(self):
+        """Índice parcial que convierte la consulta del watermark en un lookup."""
+        with self.engine.connect() as conn:
+            conn.execute(self.INDEX_DDL)
+            conn.commit()
@@ -0,0 +1,79 @@
+import io
+from dataclasses import dataclass
+from PIL import Image, ImageOps, features
+
+# Tamaño máximo (lado mayor, px) de cada variante de la foto de perfil
+VARIANT_SIZES = {
+    "avatar": 128,  # miniaturas (solo vía `variants`)
+    "card": 320,  # dim_athlete.image_url: tarjetas, tablas y leaderboards
+    "full": 1080,  # perfil
+}
+
+# Evita "decompression bombs" (p.ej. un PNG de 20k x 20k px). Se comprueba a
+# mano: Image.MAX_IMAGE_PIXELS es global al proceso y Pillow solo lanza error
+# por encima del doble (entre 1x y 2x solo avisa y decodifica)
+MAX_IMAGE_PIXELS = 40_000_000
+
+
+class ImageTooLargeError(ValueError):
+    """La imagen declara más píxeles de los permitidos."""
+
+
+@dataclass
+class ImageVariant:
+    name: str
+    data: bytes
+    content_type: str
+    extension: str
+    width: int
+    height: int
+
+
+def build_profile_variants(
+    image_bytes: bytes, with_avif: bool = True
+) -> list[ImageVariant]:
+    """
+    Decodifica la imagen UNA vez y genera las variantes WebP (y AVIF si el
+    Pillow instalado lo soporta) de la foto de perfil.
+    Lanza ImageTooLargeError si supera MAX_IMAGE_PIXELS y ValueError si los
+    bytes no son una imagen válida.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as original:
+            # Image.open solo lee la cabecera: comprobamos antes de decodificar
+            if original.width * original.height > MAX_IMAGE_PIXELS:
+                raise ImageTooLargeError(
+                    f"Imagen demasiado grande: {original.width}x{original.height} px"
+                )
+            # Respetar la orientación EXIF de las fotos de móvil
+            img = ImageOps.exif_transpose(original)
+            img = img.convert("RGB")
+    except (Image.DecompressionBombError, OSError) as e:
+        raise ValueError(f"Imagen no válida: {e}") from e
+
+    formats = [("WEBP", "image/webp", ".webp", {"quality": 80, "method": 4})]
+    if with_avif and features.check("avif"):
+        formats.append(("AVIF", "image/avif", ".avif", {"quality": 60}))
+
+    variants = []
+    # De mayor a menor: cada variante se reduce a partir de la anterior
+    current = img
+    for name, size in sorted(VARIANT_SIZES.items(), key=lambda v: -v[1]):
+        current = current.copy()
+        current.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        for fmt, content_type, extension, options in formats:
+            buffer = io.BytesIO()
+            current.save(buffer, format=fmt, **options)
+            variants.append(
+                ImageVariant(
+                    name=name,
+                    data=buffer.getvalue(),
+                    content_type=content_type,
+                    extension=extension,
+                    width=current.width,
+                    height=current.height,
+                )
+            )
+
+    return variants
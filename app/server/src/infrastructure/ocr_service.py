@@ -0,0 +1,480 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import easyocr
+import numpy as np
+from rapidfuzz import fuzz
+
+
+class OcrBusyError(Exception):
+    """La cola de verificaciones está llena (backpressure)."""
+
+
+# ==========================================
+# 1. DECODIFICACIÓN Y PRE-PROCESADO
+# ==========================================
+def decode_image(image_bytes: bytes) -> np.ndarray:
+    # Convertir bytes a imagen OpenCV
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("La imagen no se pudo decodificar")
+    return img
+
+
+def preprocess_image_smart(img) -> np.ndarray:
+    """
+    Redimensiona a ~1200px de ancho y pasa a escala de grises.
+    Acepta bytes o una imagen ya decodificada y devuelve el array listo para
+    EasyOCR (sin re-codificar a JPEG).
+    """
+    if isinstance(img, (bytes, bytearray)):
+        img = decode_image(img)
+
+    # A. Redimensionar si es gigante (Mejora velocidad y precisión)
+    # Las fotos de móvil modernas son enormes (3000px+). EasyOCR prefiere ~1000px.
+    height, width = img.shape[:2]
+    if width > 1200:
+        scale = 1200 / width
+        dim = (1200, int(height * scale))
+        img = cv2.resize(img, dim, interpolation=cv2.INTER_AREA)
+
+    # B. Solo Escala de Grises (Sin binarizar agresivamente)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    # (Opcional) Un poco de desenfoque suave para quitar el ruido del granulado ISO
+    # gray = cv2.GaussianBlur(gray, (3, 3), 0)
+
+    return gray
+
+
+def _find_text_boxes(gray: np.ndarray) -> list[tuple[int, int, int, int]]:
+    """
+    Localiza líneas de texto oscuro sobre fondo claro (black-hat + contornos).
+    Devuelve cajas (x, y, w, h) en coordenadas de `gray`.
+    """
+    # Black-hat: resalta trazos oscuros más pequeños que el kernel (letras)
+    # e ignora bordes grandes como el contorno de la propia tarjeta
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 7))
+    blackhat = cv2.morphologyEx(gray, cv2.MORPH_BLACKHAT, kernel)
+    _, binary = cv2.threshold(blackhat, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+
+    # Unimos letras de una misma línea en un solo bloque horizontal
+    line_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 3))
+    connected = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, line_kernel)
+
+    contours, _ = cv2.findContours(
+        connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+    )
+
+    height, width = gray.shape[:2]
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        # Filtro: líneas de texto = más anchas que altas, ni ruido ni bloques enormes
+        if h < 4 or w < 2 * h or h > height * 0.25 or w > width * 0.98:
+            continue
+        fill = cv2.countNonZero(binary[y : y + h, x : x + w]) / float(w * h)
+        if fill < 0.15:
+            continue
+        boxes.append((x, y, w, h))
+    return boxes
+
+
+def preprocess_image_roi(
+    img,
+    detect_width: int = 800,
+    target_text_height: int = 32,
+    max_width: int = 1200,
+) -> np.ndarray:
+    """
+    Pre-procesado rápido: localiza la zona de texto del DNI (black-hat +
+    contornos, solo OpenCV) sobre una copia reducida, recorta la imagen
+    original a esa zona y la escala para que la altura media de línea ronde
+    `target_text_height` px. Si no encuentra texto, cae a preprocess_image_smart.
+    """
+    if isinstance(img, (bytes, bytearray)):
+        img = decode_image(img)
+
+    gray_full = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    height, width = gray_full.shape[:2]
+
+    # A. Detección sobre una versión pequeña (barata)
+    scale = min(1.0, detect_width / width)
+    small = gray_full
+    if scale < 1.0:
+        small = cv2.resize(
+            gray_full,
+            (int(width * scale), int(height * scale)),
+            interpolation=cv2.INTER_AREA,
+        )
+    boxes = _find_text_boxes(small)
+    if not boxes:
+        return preprocess_image_smart(img)
+
+    # B. Región que engloba todas las líneas (+ margen), en coordenadas originales
+    x0 = min(b[0] for b in boxes)
+    y0 = min(b[1] for b in boxes)
+    x1 = max(b[0] + b[2] for b in boxes)
+    y1 = max(b[1] + b[3] for b in boxes)
+    margin = int(0.02 * max(small.shape[:2]))
+    x0, y0 = max(0, x0 - margin), max(0, y0 - margin)
+    x1, y1 = min(small.shape[1], x1 + margin), min(small.shape[0], y1 + margin)
+
+    inv = 1.0 / scale
+    crop = gray_full[int(y0 * inv) : int(y1 * inv), int(x0 * inv) : int(x1 * inv)]
+
+    # C. Escala propia de la región según la altura típica de sus líneas
+    median_line = float(np.median([b[3] for b in boxes])) * inv
+    resize = target_text_height / median_line if median_line > 0 else 1.0
+    crop_h, crop_w = crop.shape[:2]
+    resize = min(resize, max_width / crop_w)
+    if abs(resize - 1.0) > 0.05:
+        interpolation = cv2.INTER_AREA if resize < 1.0 else cv2.INTER_CUBIC
+        crop = cv2.resize(
+            crop,
+            (max(1, int(crop_w * resize)), max(1, int(crop_h * resize))),
+            interpolation=interpolation,
+        )
+    return crop
+
+
+PREPROCESSORS = {
+    "smart": preprocess_image_smart,
+    "roi": preprocess_image_roi,
+}
+
+
+# ==========================================
+# 2. LIMPIEZA DE TEXTO (Leet Speak)
+# ==========================================
+def clean_ocr_text(text):
+    text = text.upper()
+    # Mapa extendido de errores comunes
+    replacements = {
+        "0": "O",
+        "1": "I",
+        "2": "Z",
+        "3": "E",
+        "4": "A",
+        "5": "S",
+        "6": "G",
+        "8": "B",
+        "9": "S",
+        "@": "A",
+        "€": "E",
+        "$": "S",
+        "|": "I",
+        "(": " ",
+        ")": " ",
+        "[": "I",
+        "]": "I",
+        "{": "I",
+        "}": "I",  # <--- NUEVOS
+        "-": " ",
+        "_": " ",
+        "/": " ",
+    }
+    for char, replacement in replacements.items():
+        text = text.replace(char, replacement)
+    return text
+
+
+# ==========================================
+# 3. COINCIDENCIA DEL NOMBRE (Divide y Vencerás)
+# ==========================================
+def match_name(full_text_clean: str, athlete_name: str) -> dict:
+    # Limpiamos también el nombre que nos llega del formulario
+    target_name_clean = clean_ocr_text(athlete_name)
+    target_parts = target_name_clean.split()
+
+    matches = 0
+    details = []
+
+    for part in target_parts:
+        # Filtro: Ignorar palabras muy cortas (ej: "DE", "LA") si quieres
+        if len(part) < 2:
+            continue
+
+        # Buscamos la palabra en el texto completo
+        score = fuzz.partial_token_set_ratio(part, full_text_clean)
+        details.append(f"{part}: {int(score)}%")
+
+        # Umbral 80%
+        if score > 80:
+            matches += 1
+
+    # Veredicto: permitimos 1 fallo si el nombre es largo (3+ palabras)
+    required_matches = len(target_parts)
+    if len(target_parts) >= 3:
+        required_matches -= 1
+
+    is_verified = matches >= required_matches
+
+    return {
+        "verified": is_verified,
+        "score": matches * 100 / len(target_parts)
+        if target_parts
+        else 0,  # Aproximado
+        "msg": "Identidad confirmada" if is_verified else "Nombre no encontrado",
+        "details": details,
+        "raw_text": full_text_clean[:60],  # Para debug
+    }
+
+
+def failed_verdict(msg: str) -> dict:
+    """Veredicto negativo con los mismos campos que match_name."""
+    return {"verified": False, "score": 0, "msg": msg, "details": [], "raw_text": ""}
+
+
+def group_by_size(images: list, max_pad_ratio: float = 1.5) -> list[list[int]]:
+    """
+    Agrupa los índices de las imágenes de forma que, al rellenarlas al tamaño
+    común del grupo, ninguna crezca más de `max_pad_ratio` veces en área: una
+    imagen grande (o sin recorte ROI) no multiplica el coste de todo el lote.
+    """
+    order = sorted(range(len(images)), key=lambda i: images[i].shape[:2])
+    groups: list[list[int]] = []
+    max_h = max_w = min_area = 0
+    for i in order:
+        h, w = images[i].shape[:2]
+        if groups and max(max_h, h) * max(max_w, w) <= max_pad_ratio * min(
+            min_area, h * w
+        ):
+            groups[-1].append(i)
+            max_h, max_w = max(max_h, h), max(max_w, w)
+            min_area = min(min_area, h * w)
+        else:
+            groups.append([i])
+            max_h, max_w, min_area = h, w, h * w
+    return groups
+
+
+def pad_to_common_size(images: list, fill: int = 255) -> list:
+    """
+    Rellena (sin deformar) las imágenes en gris hasta el mismo alto/ancho,
+    requisito de la inferencia por lotes de EasyOCR.
+    """
+    max_h = max(img.shape[0] for img in images)
+    max_w = max(img.shape[1] for img in images)
+    return [
+        cv2.copyMakeBorder(
+            img,
+            0,
+            max_h - img.shape[0],
+            0,
+            max_w - img.shape[1],
+            cv2.BORDER_CONSTANT,
+            value=fill,
+        )
+        for img in images
+    ]
+
+
+# ==========================================
+# 4. SERVICIO OCR (modelo único + pool de workers)
+# ==========================================
+class OcrService:
+    """
+    Carga el modelo de EasyOCR una sola vez por proceso (CPU) y ejecuta las
+    verificaciones en un pool de hilos acotado, fuera del event loop.
+
+    - Backpressure: si hay más de `workers + max_queue` peticiones en curso
+      se lanza OcrBusyError en lugar de encolar sin límite.
+    - Timeout: la petición deja de esperar pasado `timeout` segundos.
+    """
+
+    STAGES = ("decode", "preprocess", "ocr", "match")
+
+    def __init__(
+        self,
+        languages=("es",),
+        workers: int | None = None,
+        max_queue: int | None = None,
+        timeout: float | None = None,
+        preprocess: str | None = None,
+    ):
+        self.languages = list(languages)
+        # "smart" (imagen completa) o "roi" (recorte de la zona de texto)
+        self.preprocess_mode = preprocess or os.getenv("OCR_PREPROCESS", "smart")
+        self.preprocess = PREPROCESSORS[self.preprocess_mode]
+        self.workers = workers or int(os.getenv("OCR_WORKERS", 2))
+        self.max_queue = (
+            max_queue if max_queue is not None else int(os.getenv("OCR_MAX_QUEUE", 8))
+        )
+        self.timeout = timeout or float(os.getenv("OCR_TIMEOUT_SECONDS", 30))
+        self.batch_size = int(os.getenv("OCR_BATCH_SIZE", 8))
+        self.max_batch = int(os.getenv("OCR_MAX_BATCH", 32))
+        self.max_pad_ratio = float(os.getenv("OCR_MAX_PAD_RATIO", 1.5))
+
+        self.reader = None
+        self.model_load_seconds = None
+        self._load_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="ocr"
+        )
+
+        self._pending = 0
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._stage_totals = {stage: 0.0 for stage in self.STAGES}
+
+    def load(self):
+        """Carga el modelo (detección + reconocimiento) si aún no está cargado."""
+        with self._load_lock:
+            if self.reader is not None:
+                return
+
+            import torch
+
+            # Repartimos los hilos de torch entre los workers para no saturar la CPU
+            torch.set_num_threads(max(1, (os.cpu_count() or 1) // self.workers))
+
+            start = time.perf_counter()
+            self.reader = easyocr.Reader(self.languages, gpu=False)
+            self.model_load_seconds = time.perf_counter() - start
+            print(f"🧠 Modelo EasyOCR cargado en {self.model_load_seconds:.2f}s")
+
+    def _verify_sync(self, image_bytes: bytes, athlete_name: str) -> dict:
+        self.load()
+        timings = {}
+
+        start = time.perf_counter()
+        img = decode_image(image_bytes)
+        timings["decode"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        processed = self.preprocess(img)
+        timings["preprocess"] = time.perf_counter() - start
+
+        # detail=0 devuelve lista de strings. paragraph=False lee línea a línea.
+        start = time.perf_counter()
+        result_list = self.reader.readtext(processed, detail=0)
+        timings["ocr"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        full_text_clean = clean_ocr_text(" ".join(result_list))
+        verdict = match_name(full_text_clean, athlete_name)
+        timings["match"] = time.perf_counter() - start
+
+        print(f"📝 Texto Leído: {full_text_clean[:100]}...")
+        self._record(timings)
+        verdict["timings_ms"] = {k: round(v * 1000, 1) for k, v in timings.items()}
+        return verdict
+
+    def _verify_batch_sync(self, items: list[tuple[bytes, str]]) -> list[dict]:
+        """
+        Verifica N pares (imagen, nombre) con inferencia por lotes (detección
+        y reconocimiento agrupados), una pasada por grupo de tamaño similar.
+        """
+        self.load()
+        timings = {stage: 0.0 for stage in self.STAGES}
+        results: list[dict | None] = [None] * len(items)
+        images, positions = [], []
+
+        for i, (image_bytes, _) in enumerate(items):
+            try:
+                start = time.perf_counter()
+                img = decode_image(image_bytes)
+                timings["decode"] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                images.append(self.preprocess(img))
+                timings["preprocess"] += time.perf_counter() - start
+                positions.append(i)
+            except Exception as e:
+                print(f"❌ Imagen {i} no válida: {e}")
+                results[i] = failed_verdict("Imagen no válida")
+
+        for group in group_by_size(images, self.max_pad_ratio):
+            start = time.perf_counter()
+            texts = self.reader.readtext_batched(
+                pad_to_common_size([images[j] for j in group]),
+                detail=0,
+                batch_size=self.batch_size,
+            )
+            timings["ocr"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            for j, result_list in zip(group, texts):
+                i = positions[j]
+                full_text_clean = clean_ocr_text(" ".join(result_list))
+                results[i] = match_name(full_text_clean, items[i][1])
+            timings["match"] += time.perf_counter() - start
+
+        self._record(timings, count=len(items))
+        return results
+
+    def _record(self, timings: dict, count: int = 1):
+        with self._stats_lock:
+            self._requests += count
+            for stage, seconds in timings.items():
+                self._stage_totals[stage] += seconds
+
+    def _release_slot(self, _future=None):
+        with self._stats_lock:
+            self._pending -= 1
+
+    async def _submit(self, func, *args, timeout: float | None = None):
+        with self._stats_lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise OcrBusyError("Demasiadas verificaciones en curso")
+            self._pending += 1
+
+        try:
+            job = self._executor.submit(func, *args)
+        except Exception:
+            self._release_slot()
+            raise
+        # El hueco se libera cuando el hilo termina de verdad (o se cancela
+        # antes de empezar), no cuando la petición deja de esperar: tras un
+        # timeout, readtext sigue ocupando el worker
+        job.add_done_callback(self._release_slot)
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(job), timeout=timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+
+    async def verify(self, image_bytes: bytes, athlete_name: str) -> dict:
+        return await self._submit(self._verify_sync, image_bytes, athlete_name)
+
+    async def verify_batch(self, items: list[tuple[bytes, str]]) -> list[dict]:
+        # Un lote ocupa un único hueco de la cola, con timeout proporcional
+        timeout = self.timeout * max(1, len(items) / self.batch_size)
+        return await self._submit(self._verify_batch_sync, items, timeout=timeout)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            n = self._requests
+            return {
+                "model_loaded": self.reader is not None,
+                "model_load_seconds": self.model_load_seconds,
+                "preprocess": self.preprocess_mode,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "max_batch": self.max_batch,
+                "max_pad_ratio": self.max_pad_ratio,
+                "pending": self._pending,
+                "requests": n,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "avg_stage_ms": {
+                    stage: round(total * 1000 / n, 1) if n else None
+                    for stage, total in self._stage_totals.items()
+                },
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,202 @@
+import os
+import time
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Columnas numéricas del dump de OPL (el resto se guarda como texto)
+OPL_NUMERIC_EXTRA = {"Age", "Dots", "Wilks", "Glossbrenner", "Goodlift"}
+PARTITIONING = ds.partitioning(
+    pa.schema([("Federation", pa.string()), ("Year", pa.int16())]), flavor="hive"
+)
+
+
+def is_numeric_column(column: str) -> bool:
+    # Squat1Kg ... TotalKg, BodyweightKg son numéricas; WeightClassKg no ("120+")
+    return (
+        column.endswith("Kg") and column != "WeightClassKg"
+    ) or column in OPL_NUMERIC_EXTRA
+
+
+def normalize_opl_types(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Esquema único de los chunks de OPL, vengan del CSV o de Parquet:
+    numéricas como float64 y el resto como texto (object, vacíos NaN; las
+    particiones de Parquet llegan como category).
+    """
+    for column in df.columns:
+        if is_numeric_column(column):
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+        elif column != "Year":
+            values = df[column].astype(object)
+            df[column] = values.where(values.notna(), np.nan)
+    return df
+
+
+def read_opl_csv(
+    csv_path: str, chunk_size: int, skiprows=None, nrows: Optional[int] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Lee el CSV de OPL en chunks con tipos fijos: texto como str (vacíos NaN)
+    y numéricas como float64. Sin `dtype`, pandas adivina el tipo en cada
+    chunk y un WeightClassKg "63" acaba como 63.0 si el chunk tiene vacíos.
+    Es el esquema de la copia en Parquet, así que ambos orígenes generan los
+    mismos documentos (y las mismas natural_key / content_hash).
+    """
+    columns = list(pd.read_csv(csv_path, nrows=0).columns)
+    with pd.read_csv(
+        csv_path,
+        chunksize=chunk_size,
+        skiprows=skiprows,
+        nrows=nrows,
+        dtype={c: str for c in columns if not is_numeric_column(c)},
+        low_memory=False,
+    ) as reader:
+        for chunk in reader:
+            yield normalize_opl_types(chunk)
+
+
+def opl_schema(columns: List[str]) -> pa.Schema:
+    fields = [
+        pa.field(c, pa.float64() if is_numeric_column(c) else pa.string())
+        for c in columns
+    ]
+    fields.append(pa.field("Year", pa.int16()))
+    return pa.schema(fields)
+
+
+class OplParquetStore:
+    """
+    Copia tipada y particionada (Federation / Year, estilo hive) del CSV de
+    OpenPowerlifting.
+
+    El CSV se convierte una vez (`convert`) y después ingesta y backfills leen
+    solo las columnas y particiones que necesitan, con los filtros empujados
+    al escaneo de Parquet (poda de particiones + estadísticas de row groups):
+
+        store.read(
+            columns=["Name", "TotalKg"],
+            filters=[("Federation", "in", ["AEP", "IPF", "EPF"]),
+                     ("Country", "==", "Spain")],
+        )
+
+    `filters` usa la forma DNF de pyarrow/pandas (lista de tuplas = AND,
+    lista de listas = OR).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    # ------------------------------------------------------------------
+    # Conversión CSV -> Parquet
+    # ------------------------------------------------------------------
+
+    def convert(self, csv_path: str, chunk_size: int = 500_000) -> int:
+        """
+        Convierte el CSV en streaming (memoria acotada por `chunk_size`) y
+        reemplaza las particiones existentes. Devuelve el número de filas.
+        """
+        start = time.perf_counter()
+        schema = opl_schema(list(pd.read_csv(csv_path, nrows=0).columns))
+        rows = 0
+
+        def batches():
+            nonlocal rows
+            for chunk in read_opl_csv(csv_path, chunk_size):
+                chunk["Year"] = (
+                    pd.to_numeric(chunk["Date"].str[:4], errors="coerce")
+                    .fillna(0)
+                    .astype("int16")
+                )
+                rows += len(chunk)
+                print(f"   [parquet] {rows} rows converted...")
+                yield pa.RecordBatch.from_pandas(
+                    chunk, schema=schema, preserve_index=False
+                )
+
+        ds.write_dataset(
+            batches(),
+            self.root,
+            schema=schema,
+            format="parquet",
+            partitioning=PARTITIONING,
+            existing_data_behavior="delete_matching",
+            max_rows_per_group=128 * 1024,
+        )
+        print(
+            f"✅ {rows} rows written to {self.root} "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        return rows
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def dataset(self) -> ds.Dataset:
+        return ds.dataset(self.root, format="parquet", partitioning=PARTITIONING)
+
+    def _scan_args(
+        self, dataset: ds.Dataset, columns: Optional[List[str]], filters
+    ) -> dict:
+        if columns is not None:
+            # Las columnas que no existan en este dump simplemente no se leen
+            columns = [c for c in columns if c in dataset.schema.names]
+        expression = pq.filters_to_expression(filters) if filters else None
+        return {"columns": columns, "filter": expression}
+
+    @staticmethod
+    def _to_pandas(table: pa.Table) -> pd.DataFrame:
+        # Mismos tipos que read_opl_csv: vacíos de texto como NaN (no None)
+        return normalize_opl_types(table.to_pandas())
+
+    def read(self, columns: Optional[List[str]] = None, filters=None) -> pd.DataFrame:
+        """Lee (en memoria) solo las columnas y filas pedidas."""
+        dataset = self.dataset()
+        table = dataset.to_table(**self._scan_args(dataset, columns, filters))
+        return self._to_pandas(table)
+
+    def iter_chunks(
+        self,
+        chunk_size: int = 10000,
+        columns: Optional[List[str]] = None,
+        filters=None,
+        skip_rows: int = 0,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Itera en DataFrames de exactamente `chunk_size` filas (salvo el
+        último), en orden determinista, para poder reanudar con `skip_rows`.
+        """
+        dataset = self.dataset()
+        scanner = dataset.scanner(
+            batch_size=chunk_size, **self._scan_args(dataset, columns, filters)
+        )
+        pending = []
+        pending_rows = 0
+        for batch in scanner.to_batches():
+            if skip_rows:
+                if batch.num_rows <= skip_rows:
+                    skip_rows -= batch.num_rows
+                    continue
+                batch = batch.slice(skip_rows)
+                skip_rows = 0
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            while pending_rows >= chunk_size:
+                table = pa.Table.from_batches(pending)
+                yield self._to_pandas(table.slice(0, chunk_size))
+                rest = table.slice(chunk_size)
+                pending = rest.to_batches()
+                pending_rows = rest.num_rows
+        if pending_rows:
+            yield self._to_pandas(pa.Table.from_batches(pending))
+
+    def size_bytes(self) -> int:
+        total = 0
+        for folder, _, files in os.walk(self.root):
+            total += sum(os.path.getsize(os.path.join(folder, f)) for f in files)
+        return total
@@ -5,6 +5,8 @@ import os
 if os.environ.get("VERCEL") != "1":
     from .result_repository import ResultRepository
     from .athlete_repository import AthleteRepository
+    from .athlete_best_lifts_repository import AthleteBestLiftsRepository
+    from .aep_crawl_state_repository import AepCrawlStateRepository
     from .competition_repository import CompetitionRepository
     from .records_repository import RecordRepository
     from .federation_repository import FederationRepository
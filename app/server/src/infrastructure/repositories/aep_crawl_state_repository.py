@@ -0,0 +1,48 @@
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from src.infrastructure.postgres_database import PostgresDB
+
+
+class AepCrawlStateRepository:
+    """
+    Tabla `aep_crawl_state`: una fila por competición de powerliftingspain.es
+    con el punto del pipeline al que llegó (discovered -> fetched -> parsed ->
+    loaded, o failed) y la huella de su contenido (página + PDFs).
+
+    ingest_aep_2023 la lee y escribe vía Supabase para procesar en cada
+    ejecución solo las competiciones nuevas o que han cambiado.
+    """
+
+    DDL = [
+        """
+        CREATE TABLE IF NOT EXISTS aep_crawl_state (
+            url TEXT PRIMARY KEY,
+            season SMALLINT NOT NULL,
+            status TEXT NOT NULL CHECK (
+                status IN ('discovered', 'fetched', 'parsed', 'loaded', 'failed')
+            ),
+            -- Huella de la última carga completa (NULL = reprocesar)
+            fingerprint TEXT,
+            competition_id UUID,
+            results INTEGER,
+            error TEXT,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_aep_crawl_state_season
+        ON aep_crawl_state (season, status)
+        """,
+    ]
+
+    def __init__(self, engine: Optional[Engine] = None):
+        self.engine = engine or PostgresDB().get_engine()
+
+    def create_table(self):
+        """Crea la tabla y su índice (idempotente)."""
+        with self.engine.connect() as conn:
+            for statement in self.DDL:
+                conn.execute(text(statement))
+            conn.commit()
+        print("✅ Tabla aep_crawl_state lista en Postgres")
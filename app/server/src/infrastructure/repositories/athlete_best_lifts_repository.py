@@ -0,0 +1,151 @@
+from typing import Iterable, Optional
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.engine import Engine
+from src.infrastructure.postgres_database import PostgresDB
+
+
+class AthleteBestLiftsRepository:
+    """
+    Tabla materializada `athlete_best_lifts`: una fila por atleta con su mejor
+    resultado Raw/SBD/tested (por total) y el contexto de ese día.
+
+    Sustituye al ROW_NUMBER() sobre todo fact_results que se ejecutaba en
+    cada petición de la página de Atletas. Los ETL la refrescan solo para
+    los atletas que han tocado llamando a `refresh_athlete_best_lifts(uuid[])`
+    (función SQL, invocable también vía RPC de Supabase).
+    """
+
+    DDL = [
+        """
+        CREATE TABLE IF NOT EXISTS athlete_best_lifts (
+            athlete_id UUID PRIMARY KEY REFERENCES dim_athlete(id) ON DELETE CASCADE,
+            -- Atletas del listado: españoles o con participación en la AEP
+            in_scope BOOLEAN NOT NULL DEFAULT FALSE,
+            sq DOUBLE PRECISION,
+            bp DOUBLE PRECISION,
+            dl DOUBLE PRECISION,
+            total DOUBLE PRECISION,
+            gl DOUBLE PRECISION,
+            weight_class TEXT,
+            bodyweight DOUBLE PRECISION,
+            competition_id UUID,
+            competition_date DATE,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_athlete_best_lifts_scope
+        ON athlete_best_lifts (athlete_id) WHERE in_scope
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_athlete_best_lifts_weight_class
+        ON athlete_best_lifts (weight_class) WHERE in_scope
+        """,
+        """
+        CREATE OR REPLACE FUNCTION refresh_athlete_best_lifts(
+            p_athlete_ids UUID[] DEFAULT NULL
+        )
+        RETURNS INTEGER
+        LANGUAGE sql
+        AS $$
+            WITH targets AS (
+                SELECT da.id, da.country
+                FROM dim_athlete da
+                WHERE p_athlete_ids IS NULL OR da.id = ANY(p_athlete_ids)
+            ),
+            upserted AS (
+                INSERT INTO athlete_best_lifts AS abl (
+                    athlete_id, in_scope, sq, bp, dl, total, gl,
+                    weight_class, bodyweight, competition_id, competition_date,
+                    updated_at
+                )
+                SELECT
+                    t.id,
+                    (
+                        t.country IN ('Spain', 'España', 'ESP')
+                        OR EXISTS (
+                            SELECT 1
+                            FROM fact_results fr2
+                            JOIN dim_competition dc ON fr2.competition_id = dc.id
+                            WHERE fr2.athlete_id = t.id
+                              AND dc.federation = 'AEP'
+                        )
+                    ),
+                    pr.squat,
+                    pr.bench,
+                    pr.deadlift,
+                    pr.total,
+                    pr.goodlift,
+                    pr.weight_class,
+                    pr.bodyweight,
+                    pr.competition_id,
+                    pr.competition_date::date,
+                    now()
+                FROM targets t
+                LEFT JOIN LATERAL (
+                    SELECT
+                        fr.squat, fr.bench, fr.deadlift, fr.total, fr.goodlift,
+                        fr.weight_class, fr.bodyweight,
+                        fr.competition_id, fr.competition_date
+                    FROM fact_results fr
+                    WHERE fr.athlete_id = t.id
+                      AND fr.equipment = 'Raw'
+                      AND fr.event_type = 'SBD'
+                      AND fr.tested = TRUE
+                    ORDER BY fr.total DESC NULLS LAST, fr.competition_date DESC NULLS LAST
+                    LIMIT 1
+                ) pr ON TRUE
+                ON CONFLICT (athlete_id) DO UPDATE SET
+                    in_scope = EXCLUDED.in_scope,
+                    sq = EXCLUDED.sq,
+                    bp = EXCLUDED.bp,
+                    dl = EXCLUDED.dl,
+                    total = EXCLUDED.total,
+                    gl = EXCLUDED.gl,
+                    weight_class = EXCLUDED.weight_class,
+                    bodyweight = EXCLUDED.bodyweight,
+                    competition_id = EXCLUDED.competition_id,
+                    competition_date = EXCLUDED.competition_date,
+                    updated_at = EXCLUDED.updated_at
+                RETURNING 1
+            )
+            SELECT COUNT(*)::INTEGER FROM upserted;
+        $$
+        """,
+    ]
+
+    REFRESH = text("SELECT refresh_athlete_best_lifts(:ids)").bindparams(
+        bindparam("ids", type_=ARRAY(UUID(as_uuid=False)))
+    )
+
+    def __init__(self, engine: Optional[Engine] = None):
+        self.engine = engine or PostgresDB().get_engine()
+
+    def create_table(self):
+        """Crea la tabla, sus índices y la función de refresco (idempotente)."""
+        with self.engine.connect() as conn:
+            for statement in self.DDL:
+                conn.execute(text(statement))
+            conn.commit()
+        print("✅ Tabla athlete_best_lifts lista en Postgres")
+
+    def refresh(
+        self, athlete_ids: Optional[Iterable[str]] = None, batch_size: int = 5000
+    ) -> int:
+        """
+        Recalcula los PRs de los atletas indicados (o de todos si es None).
+        Devuelve el número de filas actualizadas.
+        """
+        refreshed = 0
+        with self.engine.connect() as conn:
+            if athlete_ids is None:
+                refreshed = conn.execute(self.REFRESH, {"ids": None}).scalar()
+            else:
+                ids = [str(i) for i in dict.fromkeys(athlete_ids)]
+                for i in range(0, len(ids), batch_size):
+                    refreshed += conn.execute(
+                        self.REFRESH, {"ids": ids[i : i + batch_size]}
+                    ).scalar()
+            conn.commit()
+        return refreshed
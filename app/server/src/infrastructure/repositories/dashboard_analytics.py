@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 from src.infrastructure.database import MongoDB
+from src.infrastructure.cache import cached
 from typing import Dict, List
 
 
@@ -9,40 +10,26 @@ class DashboardAnalytics:
         self.results_col = self.db["results"]
         self.competitions_col = self.db["competitions"]
 
-        self._cache_data = None
-        self._cache_time = None
-        self._cache_ttl = timedelta(minutes=60)  # Los datos se refrescan cada hora
-
     """ 
         ================================
         1. HOME DASHBOARDS
         ================================
     """
 
+    @cached(ttl=60 * 60)  # Los datos se refrescan cada hora
     def get_growth_graphs(self) -> Dict[str, List[Dict]]:
         """
         Devuelve SOLO las dos series temporales: Atletas y Competiciones.
         Tarda 0.001s si está en caché.
         """
-        # 1. Si hay caché válida, devolverla y salir
-        if self._cache_data and self._cache_time:
-            if datetime.now() - self._cache_time < self._cache_ttl:
-                return self._cache_data
-
-        # 2. Si no, calcular (Tardará unos 2-3 segundos la primera vez)
+        # Sin caché válida tardará unos 2-3 segundos
         print("📊 Calculando gráficas históricas...")
 
-        data = {
+        return {
             "athletes": self._get_athlete_history(),
             "competitions": self._get_competition_history(),
         }
 
-        # 3. Guardar en caché
-        self._cache_data = data
-        self._cache_time = datetime.now()
-
-        return data
-
     def _get_athlete_history(self) -> List[Dict]:
         """Cuenta atletas únicos por año (Usando índice de results)."""
         pipeline = [
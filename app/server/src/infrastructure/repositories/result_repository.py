@@ -1,13 +1,19 @@
-from typing import List
-from pymongo import ASCENDING, DESCENDING
+from datetime import datetime, timezone
+from typing import List, Optional
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+from pymongo.errors import BulkWriteError
 from src.infrastructure.database import MongoDB
 from src.domain.entities import CompetitionResult
 
 
 class ResultRepository:
+    # Marca en ingest_checkpoints: documentos antiguos ya con natural_key
+    RESULT_KEYS_MIGRATION = "migration:result_keys"
+
     def __init__(self):
         self.db = MongoDB().get_database()
         self.collection = self.db["results"]
+        self.checkpoints = self.db["ingest_checkpoints"]
 
     def save_batch(self, results: List[CompetitionResult]):
         """Guarda una lista masiva de resultados."""
@@ -16,9 +22,183 @@ class ResultRepository:
         data_list = [r.to_dict() for r in results]
         self.collection.insert_many(data_list)
 
+    def save_documents(self, documents: List[dict], ordered: bool = True) -> int:
+        """
+        Guarda documentos ya construidos (ingesta columnar, sin entidades).
+        Con ordered=False Mongo no se detiene en el primer error del lote.
+        Devuelve el número de documentos insertados.
+        """
+        if not documents:
+            return 0
+        try:
+            result = self.collection.insert_many(documents, ordered=ordered)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            if ordered:
+                raise
+            errors = e.details.get("writeErrors", [])
+            print(f"⚠️ {len(errors)} documentos rechazados en el lote")
+            return e.details.get("nInserted", 0)
+
+    def upsert_documents(self, documents: List[dict]) -> dict:
+        """
+        Upsert idempotente por `natural_key` (ver add_result_keys).
+        Los documentos cuyo `content_hash` ya está en Mongo no se reescriben.
+        Devuelve {"inserted", "updated", "unchanged", "duplicates"}.
+        """
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0}
+        if not documents:
+            return counts
+
+        # Dentro de un lote, la última aparición de una clave gana
+        by_key = {doc["natural_key"]: doc for doc in documents}
+        counts["duplicates"] = len(documents) - len(by_key)
+        if counts["duplicates"]:
+            print(
+                f"⚠️ {counts['duplicates']} filas con natural_key repetida en el "
+                "lote (se conserva la última)"
+            )
+
+        existing = {
+            doc["natural_key"]: doc.get("content_hash")
+            for doc in self.collection.find(
+                {"natural_key": {"$in": list(by_key)}},
+                {"_id": 0, "natural_key": 1, "content_hash": 1},
+            )
+        }
+        operations = []
+        for key, doc in by_key.items():
+            if existing.get(key) == doc["content_hash"]:
+                counts["unchanged"] += 1
+            else:
+                operations.append(ReplaceOne({"natural_key": key}, doc, upsert=True))
+        if not operations:
+            return counts
+
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            # Dos writers pueden insertar la misma clave a la vez: el perdedor
+            # choca con el índice único y basta con reintentar (ya existe)
+            details = e.details
+            retry = []
+            for error in details.get("writeErrors", []):
+                if error.get("code") != 11000:
+                    raise
+                retry.append(operations[error["index"]])
+            if retry:
+                # Contamos lo que hizo el reintento: si el otro writer ya dejó
+                # el mismo contenido, la fila no cambia
+                retried = self.collection.bulk_write(retry, ordered=False)
+                changed = retried.modified_count + retried.upserted_count
+                details["nModified"] = (
+                    details.get("nModified", 0) + retried.modified_count
+                )
+                details["nUpserted"] = (
+                    details.get("nUpserted", 0) + retried.upserted_count
+                )
+                counts["unchanged"] += len(retry) - changed
+
+        counts["inserted"] += details.get("nUpserted", 0)
+        counts["updated"] += details.get("nModified", 0)
+        return counts
+
+    def result_keys_migrated(self) -> bool:
+        marker = self.checkpoints.find_one({"_id": self.RESULT_KEYS_MIGRATION})
+        return bool(marker) and marker.get("status") == "completed"
+
+    def mark_result_keys_migrated(self):
+        self.checkpoints.update_one(
+            {"_id": self.RESULT_KEYS_MIGRATION},
+            {
+                "$set": {
+                    "status": "completed",
+                    "updated_at": datetime.now(timezone.utc),
+                }
+            },
+            upsert=True,
+        )
+
+    def iter_documents_without_keys(self, batch_size: int = 10000):
+        """Lotes de documentos cargados antes de existir `natural_key`."""
+        batch = []
+        cursor = self.collection.find(
+            {"natural_key": {"$exists": False}}, batch_size=batch_size
+        )
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def replace_legacy_documents(self, documents: List[dict]) -> dict:
+        """
+        Reescribe por `_id` documentos antiguos ya normalizados y con claves.
+        Si su natural_key ya existe (otro documento la tiene) es un duplicado
+        y se borra. Devuelve {"keyed", "duplicates"}.
+        """
+        if not documents:
+            return {"keyed": 0, "duplicates": 0}
+        operations = [ReplaceOne({"_id": doc["_id"]}, doc) for doc in documents]
+        duplicates = []
+        try:
+            keyed = self.collection.bulk_write(operations, ordered=False).modified_count
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") != 11000:
+                    raise
+                duplicates.append(documents[error["index"]]["_id"])
+            keyed = e.details.get("nModified", 0)
+        if duplicates:
+            self.collection.delete_many({"_id": {"$in": duplicates}})
+        return {"keyed": keyed, "duplicates": len(duplicates)}
+
+    def delete_by_natural_keys(self, keys: List[str]) -> int:
+        """Borra los resultados que han desaparecido del dump de OPL."""
+        if not keys:
+            return 0
+        result = self.collection.delete_many({"natural_key": {"$in": list(keys)}})
+        return result.deleted_count
+
+    def get_checkpoint(self, source: str) -> Optional[dict]:
+        """Último chunk contiguo cargado de un fichero de OPL."""
+        return self.checkpoints.find_one({"_id": source})
+
+    def save_checkpoint(
+        self, source: str, chunk_size: int, last_chunk: int, status: str = "running"
+    ):
+        self.checkpoints.update_one(
+            {"_id": source},
+            {
+                "$set": {
+                    "chunk_size": chunk_size,
+                    "last_chunk": last_chunk,
+                    "status": status,
+                    "updated_at": datetime.now(timezone.utc),
+                }
+            },
+            upsert=True,
+        )
+
+    def create_natural_key_index(self):
+        """Índice único de la clave natural (upserts y detección de cambios)."""
+        # Parcial: los documentos cargados antes de existir la clave no la tienen
+        self.collection.create_index(
+            [("natural_key", ASCENDING)],
+            name="uniq_natural_key",
+            unique=True,
+            partialFilterExpression={"natural_key": {"$exists": True}},
+        )
+
     def create_indexes(self):
         """Optimiza la base de datos creando índices."""
 
+        # --- IDEMPOTENCIA DE LA INGESTA ---
+        self.create_natural_key_index()
+
         # --- BÚSQUEDAS BÁSICAS ---
         self.collection.create_index([("athlete.id", ASCENDING)])
         self.collection.create_index([("competition.id", ASCENDING)])
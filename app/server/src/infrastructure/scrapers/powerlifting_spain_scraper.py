@@ -1,23 +1,372 @@
 from scrapling.fetchers import StealthyFetcher
+from scrapling.parser import Selector
 import pdfplumber
 import requests
 import pandas as pd
+import hashlib
+import json
+import os
 import re
 import io
+import tempfile
+import threading
 import time
+from concurrent.futures import Executor, wait
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """
+    Limitador token bucket thread-safe: `rate` peticiones/segundo de media
+    con ráfagas de hasta `capacity`. Sustituye a los time.sleep fijos: solo
+    se espera cuando de verdad se va demasiado rápido.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Un TokenBucket por host, compartido por todos los hilos del scraper."""
+
+    def __init__(self, rate: float = 1.0, capacity: float = 2):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str):
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.capacity)
+        bucket.acquire()
+
+
+class DiskHttpCache:
+    """
+    Caché HTTP en disco, direccionada por contenido: cada respuesta se guarda
+    como <sha256><SUFFIX> y un índice (index.json) asocia URL -> sha256 +
+    ETag / Last-Modified (+ campos propios de cada subclase).
+
+    - Dentro de una ejecución cada URL se pide como mucho una vez.
+    - Entre ejecuciones, las entradas con menos de `max_age` segundos se
+      sirven sin red; el resto se revalidan con una petición condicional
+      (If-None-Match / If-Modified-Since): un 304 no transfiere el cuerpo.
+    """
+
+    SUFFIX = ".bin"
+
+    def __init__(self, root: str, max_age: float = 0):
+        self.root = root
+        self.max_age = max_age
+        self._index_path = os.path.join(root, "index.json")
+        self._index = {}
+        if os.path.exists(self._index_path):
+            with open(self._index_path, encoding="utf-8") as f:
+                self._index = json.load(f)
+        self._fresh = set()  # URLs ya validadas en esta ejecución
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self.stats = {}
+        os.makedirs(root, exist_ok=True)
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, f"{sha256}{self.SUFFIX}")
+
+    def _url_lock(self, url: str) -> threading.Lock:
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def _entry(self, url: str) -> dict | None:
+        entry = self._index.get(url)
+        if entry is None or not os.path.exists(self._path(entry["sha256"])):
+            return None
+        return entry
+
+    def _read(self, entry: dict) -> bytes:
+        with open(self._path(entry["sha256"]), "rb") as f:
+            return f.read()
+
+    def is_fresh(self, url: str, entry: dict) -> bool:
+        return url in self._fresh or time.time() - entry["checked_at"] < self.max_age
+
+    @staticmethod
+    def conditional_headers(entry: dict | None) -> dict:
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _store(self, url: str, content: bytes, headers, **extra) -> None:
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self._path(sha256)
+        if not os.path.exists(path):
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        with self._lock:
+            self._index[url] = {
+                "sha256": sha256,
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "checked_at": time.time(),
+                **extra,
+            }
+            self._fresh.add(url)
+            self._save_index()
+
+    def touch(self, url: str, headers=None) -> None:
+        """La copia guardada sigue vigente (304 o mismo contenido)."""
+        with self._lock:
+            entry = self._index[url]
+            entry["checked_at"] = time.time()
+            if headers is not None:
+                entry["etag"] = headers.get("ETag") or entry.get("etag")
+                entry["last_modified"] = headers.get("Last-Modified") or entry.get(
+                    "last_modified"
+                )
+            self._fresh.add(url)
+            self._save_index()
+
+    def _save_index(self):
+        tmp = f"{self._index_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path)
+
+
+class PdfCache(DiskHttpCache):
+    """PDFs de clasificaciones: la cabecera y el parser comparten la copia."""
+
+    SUFFIX = ".pdf"
+
+    def __init__(self, root: str, max_age: float = 24 * 3600):
+        super().__init__(root, max_age)
+
+    def fetch(self, url: str, get) -> bytes:
+        """
+        Devuelve el PDF de `url`. `get(url, headers)` hace la petición real
+        (con el limitador de peticiones) y solo se llama si hace falta red.
+        """
+        with self._url_lock(url):
+            entry = self._entry(url)
+            if entry is not None and self.is_fresh(url, entry):
+                self.count("hits")
+                return self._read(entry)
+
+            response = get(url, self.conditional_headers(entry))
+            if response.status_code == 304 and entry is not None:
+                self.count("not_modified")
+                self.touch(url)
+                return self._read(entry)
+
+            response.raise_for_status()
+            self.count("downloaded")
+            self._store(url, response.content, response.headers)
+            return response.content
+
+
+class PageCache(DiskHttpCache):
+    """
+    Páginas HTML (índice de temporada y detalle de cada competición).
+    Además de ETag / Last-Modified guarda la huella del contenido relevante
+    de la última respuesta simple (`fingerprint`) y el HTML con el que se
+    parseó (renderizado con el navegador o no, `rendered`).
+    """
+
+    SUFFIX = ".html"
+
+    def lookup(self, url: str) -> tuple[dict | None, str | None]:
+        entry = self._entry(url)
+        if entry is None:
+            return None, None
+        return entry, self._read(entry).decode("utf-8")
+
+    def store(
+        self, url: str, html: str, headers, fingerprint: str | None, rendered: bool
+    ):
+        self._store(
+            url,
+            html.encode("utf-8"),
+            headers,
+            fingerprint=fingerprint,
+            rendered=rendered,
+        )
 
 
 class PowerliftingSpainScraper:
-    def __init__(self):
-        self.base_url = "https://powerliftingspain.es/campeonatos-ano-2023/"
+    # Una petición simple con este User-Agent suele bastar (WordPress sin JS)
+    USER_AGENT = (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    )
+    # Selectores que indican que el HTML ya trae lo que parseamos
+    INDEX_READY = ".elementor-image-box-wrapper a"
+    DETAIL_READY = "h1.entry-title, .elementor-heading-title"
+    SEASONS_READY = 'a[href*="campeonatos-ano-"]'
+
+    SITE_URL = "https://powerliftingspain.es/"
+    SEASON_URL = SITE_URL + "campeonatos-ano-{season}/"
+    SEASON_LINK = re.compile(r"/campeonatos-ano-(\d{4})/?$")
+
+    def __init__(
+        self,
+        season: int = 2023,
+        rate_limiter: HostRateLimiter | None = None,
+        pdf_cache: PdfCache | None = None,
+        page_cache: PageCache | None = None,
+        pdf_executor: Executor | None = None,
+        pdf_workers: int | None = None,
+    ):
+        self.season = season
+        self.base_url = self.SEASON_URL.format(season=season)
+        # Todas las peticiones (HTML y PDFs) pasan por el limitador por host
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.pdf_cache = pdf_cache
+        self.page_cache = page_cache
+        # Pool de procesos para parsear los PDFs por tramos de páginas
+        # (None = en el propio hilo); una tarea por proceso del pool
+        self.pdf_executor = pdf_executor
+        self.pdf_workers = pdf_workers or os.cpu_count() or 1
+
+    def _fetch_page(self, url: str):
+        self.rate_limiter.wait(url)
+        return StealthyFetcher.fetch(url, headless=True, network_idle=True)
+
+    def _get(self, url: str, headers: dict | None = None) -> requests.Response:
+        self.rate_limiter.wait(url)
+        headers = {"User-Agent": self.USER_AGENT, **(headers or {})}
+        return requests.get(url, headers=headers, timeout=30)
 
-    def get_all_competition_links(self):
-        page = StealthyFetcher.fetch(
-            self.base_url,
-            headless=True,
-            network_idle=True,
+    @staticmethod
+    def _fingerprint(page) -> str:
+        """
+        Huella del contenido que usamos (títulos y enlaces), inmune a nonces,
+        scripts y demás ruido que cambia en cada respuesta de WordPress.
+        """
+        parts = page.css("h1::text, h2::text, h3::text").getall()
+        parts += page.css(".elementor-image-box-title ::text").getall()
+        parts += page.css("a::attr(href)").getall()
+        normalized = "\n".join(p.strip() for p in parts if p and p.strip())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def _load_page(self, url: str, ready: str):
+        """
+        Devuelve la página de `url` (objeto con `.css`), evitando el navegador
+        siempre que se pueda:
+
+        1. Entrada reciente en la caché -> HTML guardado, sin red.
+        2. Petición condicional: 304, o misma huella que la última vez ->
+           HTML guardado (aunque fuera renderizado).
+        3. Contenido nuevo cuyo HTML ya contiene `ready` -> se usa tal cual.
+        4. Si no (bloqueo, contenido generado por JS...) -> StealthyFetcher.
+        """
+        cache = self.page_cache
+        if cache is None:
+            return self._fetch_page(url)
+
+        entry, cached_html = cache.lookup(url)
+        if entry is not None and cache.is_fresh(url, entry):
+            cache.count("hits")
+            return Selector(cached_html, url=url)
+
+        response, fingerprint = None, None
+        try:
+            response = self._get(url, cache.conditional_headers(entry))
+        except requests.RequestException as e:
+            print(f"  ⚠️ Petición simple fallida ({e}), usando el navegador")
+
+        if response is not None:
+            if response.status_code == 304 and entry is not None:
+                cache.count("not_modified")
+                cache.touch(url, response.headers)
+                return Selector(cached_html, url=url)
+            if response.ok:
+                page = Selector(response.text, url=url)
+                fingerprint = self._fingerprint(page)
+                if entry is not None and entry.get("fingerprint") == fingerprint:
+                    cache.count("unchanged")
+                    cache.touch(url, response.headers)
+                    return Selector(cached_html, url=url)
+                if page.css(ready):
+                    cache.count("plain")
+                    cache.store(url, response.text, response.headers, fingerprint, False)
+                    return page
+
+        # Escalar al navegador: la petición simple no basta o el contenido cambió
+        cache.count("browser")
+        page = self._fetch_page(url)
+        headers = response.headers if response is not None and response.ok else {}
+        cache.store(url, str(page.html_content), headers, fingerprint, True)
+        return page
+
+    def download_pdf(self, url: str) -> bytes:
+        if self.pdf_cache is not None:
+            return self.pdf_cache.fetch(url, self._get)
+        response = self._get(url)
+        response.raise_for_status()
+        return response.content
+
+    @staticmethod
+    def read_pdf_header(pdf_bytes: bytes, max_lines: int = 5) -> str:
+        """Cabecera de la primera página (sede y fechas de la competición)."""
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+            first_page_text = pdf.pages[0].extract_text() or ""
+        # El header suele estar en las primeras 5 líneas
+        return " ".join(first_page_text.split("\n")[:max_lines])
+
+    def for_season(self, season: int) -> "PowerliftingSpainScraper":
+        """Scraper de otra temporada que comparte limitador y cachés."""
+        return PowerliftingSpainScraper(
+            season,
+            rate_limiter=self.rate_limiter,
+            pdf_cache=self.pdf_cache,
+            page_cache=self.page_cache,
+            pdf_executor=self.pdf_executor,
+            pdf_workers=self.pdf_workers,
         )
 
+    def discover_seasons(self) -> list[int]:
+        """Temporadas con página índice (campeonatos-ano-YYYY) enlazada en la web."""
+        page = self._load_page(self.SITE_URL, self.SEASONS_READY)
+        seasons = set()
+        for href in page.css("a::attr(href)").getall():
+            match = self.SEASON_LINK.search(href.strip())
+            if match:
+                seasons.add(int(match.group(1)))
+        return sorted(seasons)
+
+    def get_all_competition_links(self):
+        page = self._load_page(self.base_url, self.INDEX_READY)
+
         # Extraer los enlaces de las cajas de imagen de Elementor
         links = page.css(".elementor-image-box-wrapper a::attr(href)").getall()
 
@@ -25,7 +374,7 @@ class PowerliftingSpainScraper:
         return list(set(links))
 
     def scrape_competition_detail(self, url):
-        page = StealthyFetcher.fetch(url, headless=True, network_idle=True)
+        page = self._load_page(url, self.DETAIL_READY)
 
         # --- Título ---
         titulo = (
@@ -95,7 +444,6 @@ class PowerliftingSpainScraper:
                             "pdf_url": clf_url,
                         }
                     )
-                time.sleep(1)  # Pausa entre peticiones
             except Exception as e:
                 print(f"  ❌ Error: {e}")
 
@@ -122,135 +470,238 @@ class PowerliftingSpainScraper:
         Returns:
             DataFrame con los resultados normalizados.
         """
-        print(f"  📥 Descargando PDF: {pdf_url}")
-        response = requests.get(pdf_url, timeout=30)
-        response.raise_for_status()
-        pdf_bytes = io.BytesIO(response.content)
-
-        rows = []
-        current_category = ""
-        current_gender = ""
-
-        # Valor numérico (acepta coma o punto como decimal)
-        NUM = r"[\d]+[.,]?\d*"
-        # Valor que puede ser número o X (intento nulo)
-        ATTEMPT = r"(?:[\d]+[.,]?\d*|X)"
-
-        # Regex principal: POS NOMBRE AÑO CLUB PESO COEF ORD SQ1 SQ2 SQ3 RANK BP1 BP2 BP3 RANK DL1 DL2 DL3 RANK TOTAL IPFGL [PT]
-        result_line_pattern = re.compile(
-            r"^(\d{1,3})\s+"  # 1: Posición
-            r"(.+?)\s+"  # 2: Nombre
-            r"(\d{4})\s+"  # 3: Año nacimiento
-            r"([A-Za-z]{2,8})\s+"  # 4: Club (2-8 letras)
-            r"(" + NUM + r")\s+"  # 5: Peso corporal
-            r"(" + NUM + r")\s+"  # 6: Coeficiente
-            r"(\d+)\s+"  # 7: Orden
-            r"(" + ATTEMPT + r")\s+"  # 8: SQ1
-            r"(" + ATTEMPT + r")\s+"  # 9: SQ2
-            r"(" + ATTEMPT + r")\s+"  # 10: SQ3
-            r"(\d+)\s+"  # 11: SQ Rank
-            r"(" + ATTEMPT + r")\s+"  # 12: BP1
-            r"(" + ATTEMPT + r")\s+"  # 13: BP2
-            r"(" + ATTEMPT + r")\s+"  # 14: BP3
-            r"(\d+)\s+"  # 15: BP Rank
-            r"(" + ATTEMPT + r")\s+"  # 16: DL1
-            r"(" + ATTEMPT + r")\s+"  # 17: DL2
-            r"(" + ATTEMPT + r")\s+"  # 18: DL3
-            r"(\d+)\s+"  # 19: DL Rank
-            r"(" + NUM + r")\s+"  # 20: Total
-            r"(" + NUM + r")"  # 21: IPFGL
-            r"(?:\s+(\d+))?"  # 22: Pt (opcional)
-        )
+        print(f"  📥 PDF: {pdf_url}")
+        return self.parse_clasificacion_bytes(self.download_pdf(pdf_url), pdf_url)
 
-        # Categorías de peso: -53kg, -66kg, +120kg, etc.
-        weight_class_pattern = re.compile(r"^[-+]?\d+\s*kg$", re.IGNORECASE)
+    def parse_clasificacion_bytes(
+        self, pdf_bytes: bytes, pdf_url: str = ""
+    ) -> pd.DataFrame:
+        """
+        Parsea un PDF de clasificaciones ya descargado.
+
+        Con `pdf_executor`, las páginas se reparten en el pool de procesos
+        (extract_text y las regex son CPU puro), ver _parse_pages_in_pool.
+        Cada página devuelve sus líneas ya clasificadas y el género/categoría
+        se arrastran después en orden, así que el DataFrame es idéntico al del
+        parseo secuencial.
+        """
+        if self.pdf_executor is None:
+            events = parse_pdf_pages(pdf_bytes)
+        else:
+            events = self._parse_pages_in_pool(pdf_bytes)
+        return pd.DataFrame(resolve_categories(events, pdf_url))
+
+    def _parse_pages_in_pool(self, pdf_bytes: bytes) -> list[tuple[str, object]]:
+        """
+        Escribe el PDF UNA vez en un fichero temporal y lanza una tarea por
+        proceso, que parsea una de cada `pdf_workers` páginas: a los procesos
+        solo viaja la ruta (no los bytes en cada tarea) y aquí no hace falta
+        abrir el PDF para contar páginas.
+        """
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        futures = []
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(pdf_bytes)
+            futures = [
+                self.pdf_executor.submit(
+                    parse_pdf_file_pages, path, offset, self.pdf_workers
+                )
+                for offset in range(self.pdf_workers)
+            ]
+            pages = [page for future in futures for page in future.result()]
+        finally:
+            # Que ningún proceso siga leyendo el fichero al borrarlo
+            wait(futures)
+            os.unlink(path)
+
+        pages.sort(key=lambda page: page[0])
+        return [event for _, events in pages for event in events]
+
+
+# ========================================================================
+# Parseo de clasificaciones (funciones de módulo: se ejecutan en el pool)
+# ========================================================================
+
+# Valor numérico (acepta coma o punto como decimal)
+NUM = r"[\d]+[.,]?\d*"
+# Valor que puede ser número o X (intento nulo)
+ATTEMPT = r"(?:[\d]+[.,]?\d*|X)"
+
+# Regex principal: POS NOMBRE AÑO CLUB PESO COEF ORD SQ1 SQ2 SQ3 RANK BP1 BP2 BP3 RANK DL1 DL2 DL3 RANK TOTAL IPFGL [PT]
+RESULT_LINE_PATTERN = re.compile(
+    r"^(\d{1,3})\s+"  # 1: Posición
+    r"(.+?)\s+"  # 2: Nombre
+    r"(\d{4})\s+"  # 3: Año nacimiento
+    r"([A-Za-z]{2,8})\s+"  # 4: Club (2-8 letras)
+    r"(" + NUM + r")\s+"  # 5: Peso corporal
+    r"(" + NUM + r")\s+"  # 6: Coeficiente
+    r"(\d+)\s+"  # 7: Orden
+    r"(" + ATTEMPT + r")\s+"  # 8: SQ1
+    r"(" + ATTEMPT + r")\s+"  # 9: SQ2
+    r"(" + ATTEMPT + r")\s+"  # 10: SQ3
+    r"(\d+)\s+"  # 11: SQ Rank
+    r"(" + ATTEMPT + r")\s+"  # 12: BP1
+    r"(" + ATTEMPT + r")\s+"  # 13: BP2
+    r"(" + ATTEMPT + r")\s+"  # 14: BP3
+    r"(\d+)\s+"  # 15: BP Rank
+    r"(" + ATTEMPT + r")\s+"  # 16: DL1
+    r"(" + ATTEMPT + r")\s+"  # 17: DL2
+    r"(" + ATTEMPT + r")\s+"  # 18: DL3
+    r"(\d+)\s+"  # 19: DL Rank
+    r"(" + NUM + r")\s+"  # 20: Total
+    r"(" + NUM + r")"  # 21: IPFGL
+    r"(?:\s+(\d+))?"  # 22: Pt (opcional)
+)
+
+# Categorías de peso: -53kg, -66kg, +120kg, etc.
+WEIGHT_CLASS_PATTERN = re.compile(r"^[-+]?\d+\s*kg$", re.IGNORECASE)
+
+# Categorías de género/disciplina
+GENDER_PATTERN = re.compile(
+    r"^(HOMBRES|MUJERES|MEN|WOMEN)\s+(.*)",
+    re.IGNORECASE,
+)
+DISCIPLINE_PATTERN = re.compile(
+    r"^(HOMBRES|MUJERES|MEN|WOMEN|SUB[ -]?\d+|JUNIOR|SENIOR|MASTER|OPEN|"
+    r"EQUIPADO|RAW|CLASSIC|ABSOLUT[OA]|PRESS\s+BANCA|"
+    r"MASCULINO|FEMENINO)",
+    re.IGNORECASE,
+)
+
+# Encabezados, paginación, etc. y líneas de DSQ (empiezan con —)
+SKIPPED_PREFIXES = (
+    "LEVANTADOR",
+    "Página",
+    "ASOCIACIÓN",
+    "EUROPEAN",
+    "Rev.",
+    "Campeonato",
+    "AEP-",
+    "CLASIFICACIÓN",
+    "—",
+    "–",
+)
+
+
+def classify_line(line: str) -> tuple[str, object] | None:
+    """
+    ("gender", texto), ("category", texto), ("row", dict sin género/categoría)
+    o None si la línea no aporta nada.
+    """
+    line = line.strip()
+    if not line or line.startswith(SKIPPED_PREFIXES):
+        return None
+
+    # Detectar categoría de género+disciplina
+    if GENDER_PATTERN.match(line):
+        return ("gender", line)
+
+    # Detectar categoría de peso
+    if WEIGHT_CLASS_PATTERN.match(line):
+        return ("category", line)
+
+    # Detectar otras líneas de categoría/disciplina
+    if DISCIPLINE_PATTERN.match(line) and not re.match(r"^\d", line):
+        return ("gender", line)
+
+    # Detectar línea de resultado
+    match = RESULT_LINE_PATTERN.match(line)
+    if not match:
+        return None
+    g = match.groups()
+    safe_float = PowerliftingSpainScraper._safe_float
+    return (
+        "row",
+        {
+            "posicion": int(g[0]),
+            "nombre": g[1].strip(),
+            "anio_nacimiento": int(g[2]),
+            "club": g[3],
+            "peso_corporal": safe_float(g[4]),
+            "coeficiente": safe_float(g[5]),
+            "orden": int(g[6]),
+            "sq1": safe_float(g[7]),
+            "sq2": safe_float(g[8]),
+            "sq3": safe_float(g[9]),
+            "sq_rank": int(g[10]),
+            "bp1": safe_float(g[11]),
+            "bp2": safe_float(g[12]),
+            "bp3": safe_float(g[13]),
+            "bp_rank": int(g[14]),
+            "dl1": safe_float(g[15]),
+            "dl2": safe_float(g[16]),
+            "dl3": safe_float(g[17]),
+            "dl_rank": int(g[18]),
+            "total": safe_float(g[19]),
+            "ipf_gl": safe_float(g[20]),
+            "puntos": int(g[21]) if g[21] else None,
+        },
+    )
+
+
+def parse_pdf_pages(
+    pdf_bytes: bytes, start: int = 0, end: int | None = None
+) -> list[tuple[str, object]]:
+    """
+    Extrae y clasifica las líneas de las páginas [start, end) en orden.
+    No depende de las páginas anteriores: el género/categoría vigentes al
+    inicio del tramo los resuelve `resolve_categories`.
+    """
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        return [
+            event for page in pdf.pages[start:end] for event in _page_events(page)
+        ]
+
+
+def parse_pdf_file_pages(
+    path: str, offset: int, step: int
+) -> list[tuple[int, list[tuple[str, object]]]]:
+    """
+    Tarea del pool: páginas offset, offset + step, ... del PDF en `path`, cada
+    una con su índice para reordenarlas después.
+    """
+    with pdfplumber.open(path) as pdf:
+        return [
+            (index, _page_events(pdf.pages[index]))
+            for index in range(offset, len(pdf.pages), step)
+        ]
 
-        # Categorías de género/disciplina
-        gender_pattern = re.compile(
-            r"^(HOMBRES|MUJERES|MEN|WOMEN)\s+(.*)",
-            re.IGNORECASE,
-        )
-        discipline_pattern = re.compile(
-            r"^(HOMBRES|MUJERES|MEN|WOMEN|SUB[ -]?\d+|JUNIOR|SENIOR|MASTER|OPEN|"
-            r"EQUIPADO|RAW|CLASSIC|ABSOLUT[OA]|PRESS\s+BANCA|"
-            r"MASCULINO|FEMENINO)",
-            re.IGNORECASE,
-        )
 
-        with pdfplumber.open(pdf_bytes) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if not text:
-                    continue
-
-                for line in text.split("\n"):
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    # Saltar líneas de encabezado, paginación, etc.
-                    if line.startswith("LEVANTADOR") or line.startswith("Página"):
-                        continue
-                    if line.startswith("ASOCIACIÓN") or line.startswith("EUROPEAN"):
-                        continue
-                    if line.startswith("Rev.") or line.startswith("Campeonato"):
-                        continue
-                    if line.startswith("AEP-") or line.startswith("CLASIFICACIÓN"):
-                        continue
-
-                    # Saltar líneas de DSQ (empiezan con —)
-                    if line.startswith("—") or line.startswith("–"):
-                        continue
-
-                    # Detectar categoría de género+disciplina
-                    gender_match = gender_pattern.match(line)
-                    if gender_match:
-                        current_gender = line.strip()
-                        continue
-
-                    # Detectar categoría de peso
-                    if weight_class_pattern.match(line):
-                        current_category = line.strip()
-                        continue
-
-                    # Detectar otras líneas de categoría/disciplina
-                    if discipline_pattern.match(line) and not re.match(r"^\d", line):
-                        current_gender = line.strip()
-                        continue
-
-                    # Detectar línea de resultado
-                    match = result_line_pattern.match(line)
-                    if match:
-                        g = match.groups()
-                        rows.append(
-                            {
-                                "posicion": int(g[0]),
-                                "nombre": g[1].strip(),
-                                "anio_nacimiento": int(g[2]),
-                                "club": g[3],
-                                "peso_corporal": self._safe_float(g[4]),
-                                "coeficiente": self._safe_float(g[5]),
-                                "orden": int(g[6]),
-                                "sq1": self._safe_float(g[7]),
-                                "sq2": self._safe_float(g[8]),
-                                "sq3": self._safe_float(g[9]),
-                                "sq_rank": int(g[10]),
-                                "bp1": self._safe_float(g[11]),
-                                "bp2": self._safe_float(g[12]),
-                                "bp3": self._safe_float(g[13]),
-                                "bp_rank": int(g[14]),
-                                "dl1": self._safe_float(g[15]),
-                                "dl2": self._safe_float(g[16]),
-                                "dl3": self._safe_float(g[17]),
-                                "dl_rank": int(g[18]),
-                                "total": self._safe_float(g[19]),
-                                "ipf_gl": self._safe_float(g[20]),
-                                "puntos": int(g[21]) if g[21] else None,
-                                "genero_disciplina": current_gender,
-                                "categoria_peso": current_category,
-                                "pdf_url": pdf_url,
-                            }
-                        )
-
-        df = pd.DataFrame(rows)
-        return df
+def _page_events(page) -> list[tuple[str, object]]:
+    """Líneas clasificadas de una página, en orden."""
+    text = page.extract_text()
+    if not text:
+        return []
+    events = []
+    for line in text.split("\n"):
+        event = classify_line(line)
+        if event is not None:
+            events.append(event)
+    return events
+
+
+def resolve_categories(events: list[tuple[str, object]], pdf_url: str) -> list[dict]:
+    """
+    Pasada secuencial (barata) sobre los eventos de todas las páginas en
+    orden: arrastra el último género/disciplina y categoría de peso vistos a
+    cada fila, también de una página a la siguiente.
+    """
+    rows = []
+    current_category = ""
+    current_gender = ""
+    for kind, value in events:
+        if kind == "gender":
+            current_gender = value
+        elif kind == "category":
+            current_category = value
+        else:
+            rows.append(
+                {
+                    **value,
+                    "genero_disciplina": current_gender,
+                    "categoria_peso": current_category,
+                    "pdf_url": pdf_url,
+                }
+            )
+    return rows
@@ -1,4 +1,4 @@
-from .ingest_openpowerlifting import IngestOpenPowerlifting
+from .ingest_openpowerlifting import IngestOpenPowerlifting, IngestScope
 
 from .build_athlete_profiles import BuildAthleteProfiles
 
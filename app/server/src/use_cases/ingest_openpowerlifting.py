@@ -1,16 +1,388 @@
 import pandas as pd
 import numpy as np
+import contextlib
+import hashlib
+import json
+import os
 import re
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import FrozenSet, Optional
 
 from src.domain.entities import CompetitionResult
 from src.infrastructure.repositories import ResultRepository
+from src.infrastructure.opl_parquet import OplParquetStore, read_opl_csv
+
+NUMERIC_COLUMNS = [
+    "Age", "BodyweightKg", "Best3SquatKg", "Best3BenchKg", "Best3DeadliftKg",
+    "TotalKg", "Dots", "Wilks", "Glossbrenner", "Goodlift",
+]
+REQUIRED_COLUMNS = [
+    "Name", "Sex", "Federation", "Date", "MeetName", "MeetCountry",
+    "Equipment", "Event",
+]
+# Todas las columnas que usa build_documents (lo único que se lee de Parquet)
+SOURCE_COLUMNS = REQUIRED_COLUMNS + NUMERIC_COLUMNS + [
+    "BirthYearClass", "Country", "MeetState", "MeetTown", "Division",
+    "AgeClass", "WeightClassKg", "Tested", "Place",
+]
+DEFAULT_DATE = datetime(1900, 1, 1)
+
+# Identidad de un resultado: mismo atleta, competición y categoría
+NATURAL_KEY_FIELDS = [
+    ("athlete", "id"),
+    ("competition", "id"),
+    ("category", "event"),
+    ("category", "equipment"),
+    ("category", "division"),
+    ("category", "weight_class"),
+]
+
+
+def _text_column(chunk: pd.DataFrame, column: str, default: str = "") -> pd.Series:
+    """str(value) de toda la columna ('nan' para vacíos), o `default` si no existe."""
+    if column not in chunk.columns:
+        return pd.Series(default, index=chunk.index, dtype=object)
+    return chunk[column].astype(str)
+
+
+def _float_column(chunk: pd.DataFrame, column: str) -> list:
+    """Equivalente columnar de _safe_float: float o None."""
+    if column not in chunk.columns:
+        return [None] * len(chunk)
+    # float64 siempre: una columna sin decimales en este chunk daría int (y
+    # Mongo guardaría int64 en lugar de double, cambiando el content_hash)
+    values = pd.to_numeric(chunk[column], errors="coerce").astype("float64")
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+def _slug_column(texts: pd.Series) -> pd.Series:
+    """Equivalente columnar de _generate_slug (sin el caso 'unknown')."""
+    return (
+        texts.str.lower().str.replace(r"[^a-z0-9]+", "-", regex=True).str.strip("-")
+    )
+
+
+def check_required_columns(chunk: pd.DataFrame):
+    """
+    Lanza KeyError si al chunk le falta alguna columna obligatoria (p.ej. OPL
+    renombra una). No se descarta en silencio: el chunk no se checkpointea y
+    la carga no se marca como completada.
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise KeyError(f"Faltan columnas obligatorias en el dump de OPL: {missing}")
+
+
+def build_documents(chunk: pd.DataFrame) -> list:
+    """
+    Transforma un chunk del CSV de OpenPowerlifting directamente en documentos
+    de Mongo (mismo resultado que _process_row(row).to_dict() fila a fila),
+    pero columna a columna: to_numeric / to_datetime / slugs vectorizados.
+    Es una función de módulo para poder ejecutarse en otros procesos.
+    """
+    # Igual que row['X'] en _process_row: sin estas columnas no hay documentos
+    check_required_columns(chunk)
+
+    name = _text_column(chunk, "Name")
+    date = _text_column(chunk, "Date")
+    meet_name = _text_column(chunk, "MeetName")
+    meet_country = _text_column(chunk, "MeetCountry")
+
+    athlete_slug = _slug_column(name).where(chunk["Name"].notna(), "unknown")
+    competition_slug = _slug_column(
+        meet_name + " " + date.str[:4] + " " + meet_country
+    )
+    dates = pd.to_datetime(chunk["Date"], format="%Y-%m-%d", errors="coerce")
+    dates = dates.fillna(pd.Timestamp(DEFAULT_DATE))
+    tested = _text_column(chunk, "Tested").str.lower() == "yes"
+
+    floats = {column: _float_column(chunk, column) for column in NUMERIC_COLUMNS}
+
+    columns = zip(
+        athlete_slug.tolist(),
+        name.tolist(),
+        _text_column(chunk, "Sex").tolist(),
+        _text_column(chunk, "BirthYearClass").tolist(),
+        floats["Age"],
+        _text_column(chunk, "Country").tolist(),
+        floats["BodyweightKg"],
+        competition_slug.tolist(),
+        meet_name.tolist(),
+        _text_column(chunk, "MeetState").tolist(),
+        dates.to_numpy(dtype="datetime64[us]").tolist(),
+        meet_country.tolist(),
+        _text_column(chunk, "MeetTown").tolist(),
+        _text_column(chunk, "Federation").tolist(),
+        _text_column(chunk, "Division").tolist(),
+        _text_column(chunk, "AgeClass").tolist(),
+        _text_column(chunk, "WeightClassKg").tolist(),
+        _text_column(chunk, "Equipment").tolist(),
+        _text_column(chunk, "Event").tolist(),
+        tested.tolist(),
+        floats["Best3SquatKg"],
+        floats["Best3BenchKg"],
+        floats["Best3DeadliftKg"],
+        floats["TotalKg"],
+        _text_column(chunk, "Place", default="DQ").tolist(),
+        floats["Dots"],
+        floats["Wilks"],
+        floats["Goodlift"],
+        floats["Glossbrenner"],
+    )
+
+    # Mismo orden de claves que CompetitionResult.to_dict()
+    return [
+        {
+            "athlete": {
+                "id": a_id,
+                "name": a_name,
+                "sex": sex,
+                "birth_year_class": birth_year_class,
+                "age": age,
+                "country": country,
+                "bodyweight": bodyweight,
+            },
+            "competition": {
+                "id": c_id,
+                "name": c_name,
+                "state": state,
+                "date": c_date,
+                "country": c_country,
+                "town": town,
+                "federation": federation,
+            },
+            "category": {
+                "division": division,
+                "age_class": age_class,
+                "weight_class": weight_class,
+                "equipment": equipment,
+                "event": event,
+                "tested": is_tested,
+            },
+            "results": {
+                "squat": squat,
+                "bench": bench,
+                "deadlift": deadlift,
+                "total": total,
+                "place": place,
+            },
+            "points": {
+                "dots": dots,
+                "wilks": wilks,
+                "goodlift": goodlift,
+                "glossbrenner": glossbrenner,
+            },
+        }
+        for (
+            a_id, a_name, sex, birth_year_class, age, country, bodyweight,
+            c_id, c_name, state, c_date, c_country, town, federation,
+            division, age_class, weight_class, equipment, event, is_tested,
+            squat, bench, deadlift, total, place,
+            dots, wilks, goodlift, glossbrenner,
+        ) in columns
+    ]
+
+
+def add_result_keys(documents: list) -> list:
+    """
+    Añade a cada documento:
+    - natural_key: hash determinista de (atleta, competición, evento,
+      equipamiento, división, categoría de peso). Es la clave del upsert.
+    - content_hash: hash del contenido, para saltar filas que no han cambiado
+      entre snapshots de OPL.
+    """
+    for doc in documents:
+        key = "|".join(str(doc[group][field]) for group, field in NATURAL_KEY_FIELDS)
+        doc["natural_key"] = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        content = json.dumps(
+            {k: v for k, v in doc.items() if k != "natural_key"},
+            sort_keys=True,
+            default=str,
+        )
+        doc["content_hash"] = hashlib.sha1(content.encode("utf-8")).hexdigest()
+    return documents
+
+
+# Campos numéricos de los documentos (float o None, ver _float_column)
+DOCUMENT_FLOAT_FIELDS = [
+    ("athlete", "age"),
+    ("athlete", "bodyweight"),
+    ("results", "squat"),
+    ("results", "bench"),
+    ("results", "deadlift"),
+    ("results", "total"),
+    ("points", "dots"),
+    ("points", "wilks"),
+    ("points", "goodlift"),
+    ("points", "glossbrenner"),
+]
+# Textos que pandas podía leer como número cuando adivinaba el tipo por chunk
+DOCUMENT_TEXT_FIELDS = [
+    ("athlete", "birth_year_class"),
+    ("competition", "state"),
+    ("competition", "town"),
+    ("category", "division"),
+    ("category", "age_class"),
+    ("category", "weight_class"),
+    ("results", "place"),
+]
+_FLOAT_TEXT = re.compile(r"^(-?\d+)\.0$")
+
+
+def normalize_legacy_document(doc: dict) -> dict:
+    """
+    Documento de Mongo cargado antes de natural_key, tal y como lo generaría
+    ahora build_documents sobre el CSV tipado: numéricos como float y textos
+    sin el ".0" que añadía pandas ("63.0" -> "63"). Sin _id ni claves.
+    """
+    doc = {
+        k: dict(v) if isinstance(v, dict) else v
+        for k, v in doc.items()
+        if k not in ("_id", "natural_key", "content_hash")
+    }
+    for group, field in DOCUMENT_FLOAT_FIELDS:
+        value = doc.get(group, {}).get(field)
+        if isinstance(value, int) and not isinstance(value, bool):
+            doc[group][field] = float(value)
+    for group, field in DOCUMENT_TEXT_FIELDS:
+        value = doc.get(group, {}).get(field)
+        if isinstance(value, str):
+            doc[group][field] = _FLOAT_TEXT.sub(r"\1", value)
+    return doc
+
+
+def transform_chunk_timed(chunk: pd.DataFrame) -> tuple:
+    """
+    Tarea de los procesos del pipeline: (documentos, segundos de CPU usados).
+    Si falta una columna obligatoria lanza KeyError (ver check_required_columns).
+    """
+    start = time.perf_counter()
+    documents = add_result_keys(build_documents(chunk))
+    return documents, time.perf_counter() - start
+
+
+@dataclass(frozen=True)
+class IngestScope:
+    """
+    Qué parte del dump de OPL se carga en Mongo. None = sin filtro.
+
+    - federations: p.ej. {"AEP", "IPF", "EPF"} (las que usa el ETL a Postgres)
+    - countries: país del atleta. Las filas sin país se conservan (el ETL
+      rellena 'Spain' en las de la AEP), salvo keep_missing_country=False.
+    - tested: True = solo "Tested == Yes", False = solo no testados.
+    """
+
+    federations: Optional[FrozenSet[str]] = None
+    countries: Optional[FrozenSet[str]] = None
+    tested: Optional[bool] = None
+    keep_missing_country: bool = True
+
+    @classmethod
+    def from_strings(
+        cls,
+        federations: str = "",
+        countries: str = "",
+        tested: str = "",
+    ) -> Optional["IngestScope"]:
+        """Construye el scope desde variables de entorno ("AEP,IPF", "yes"...)."""
+
+        def as_set(value: str):
+            items = frozenset(v.strip() for v in value.split(",") if v.strip())
+            return None if not items or "*" in items else items
+
+        tested_flag = {"yes": True, "true": True, "no": False, "false": False}.get(
+            tested.strip().lower()
+        )
+        scope = cls(as_set(federations), as_set(countries), tested_flag)
+        return None if scope.is_empty() else scope
+
+    def is_empty(self) -> bool:
+        return (
+            self.federations is None
+            and self.countries is None
+            and self.tested is None
+        )
+
+    def mask(self, chunk: pd.DataFrame, dropped: dict) -> pd.Series:
+        """Filas dentro del scope; acumula en `dropped` los descartes por motivo."""
+        keep = pd.Series(True, index=chunk.index)
+        if self.federations is not None:
+            in_scope = chunk["Federation"].isin(self.federations)
+            dropped["federation"] += int((keep & ~in_scope).sum())
+            keep &= in_scope
+        if self.tested is not None:
+            is_tested = chunk.get("Tested", pd.Series("", index=chunk.index))
+            is_tested = is_tested.astype(str).str.lower() == "yes"
+            in_scope = is_tested if self.tested else ~is_tested
+            dropped["tested"] += int((keep & ~in_scope).sum())
+            keep &= in_scope
+        if self.countries is not None:
+            country = chunk.get("Country", pd.Series(np.nan, index=chunk.index))
+            in_scope = country.isin(self.countries)
+            if self.keep_missing_country:
+                in_scope |= country.isna() | (country.astype(str).str.strip() == "")
+            dropped["country"] += int((keep & ~in_scope).sum())
+            keep &= in_scope
+        return keep
+
+    def checkpoint_key(self) -> str:
+        """Descripción estable (sin depender del orden de los sets)."""
+
+        def joined(values):
+            return "*" if values is None else ",".join(sorted(values))
+
+        return (
+            f"federations={joined(self.federations)};"
+            f"countries={joined(self.countries)};tested={self.tested};"
+            f"keep_missing_country={self.keep_missing_country}"
+        )
+
+    def parquet_filters(self) -> list:
+        """Parte del scope que se puede empujar al escaneo de Parquet."""
+        filters = []
+        if self.federations is not None:
+            filters.append(("Federation", "in", sorted(self.federations)))
+        if self.tested is True:
+            filters.append(("Tested", "==", "Yes"))
+        # El país no: los nulos se conservan y los filtros DNF no expresan IS NULL
+        return filters
+
 
 class IngestOpenPowerlifting:
-    def __init__(self, csv_path: str):
+    def __init__(
+        self,
+        csv_path: str,
+        parquet_filters=None,
+        scope: Optional[IngestScope] = None,
+    ):
+        """
+        csv_path: OPL CSV dump, or a Parquet directory written by
+        OplParquetStore.convert (only the needed columns are read, and
+        `parquet_filters` are pushed down to the scan).
+        scope: rows outside it are dropped at read time, before transforming
+        (see IngestScope). Kept/dropped counters are in `scope_stats`.
+        """
         self.csv_path = csv_path
-        self.repository = ResultRepository()
+        self.parquet_filters = parquet_filters
+        self.scope = scope
+        self.scope_stats = self._new_scope_stats()
+        self._repository = None
+
+    @staticmethod
+    def _new_scope_stats() -> dict:
+        return {"kept": 0, "dropped": {"federation": 0, "tested": 0, "country": 0}}
+
+    @property
+    def repository(self) -> ResultRepository:
+        # Conexión perezosa: las transformaciones (y el benchmark) no necesitan Mongo
+        if self._repository is None:
+            self._repository = ResultRepository()
+        return self._repository
         
     def _safe_float(self, value) -> Optional[float]:
         """
@@ -115,36 +487,503 @@ class IngestOpenPowerlifting:
             goodlift=self._safe_float(row.get('Goodlift'))
         )
 
-    def run(self, chunk_size=10000):
+    def _transform_chunk_rows(self, chunk: pd.DataFrame) -> list:
+        """Ruta original: iterrows + _process_row + to_dict() por fila."""
+        documents = []
+        for _, row in chunk.iterrows():
+            try:
+                documents.append(self._process_row(row).to_dict())
+            except Exception as e:
+                # If a row is severely broken, skip it but log warning
+                # print(f"⚠️ Error in row: {e}") # Uncomment for deep debugging
+                continue
+        return documents
+
+    def _transform_chunk(self, chunk: pd.DataFrame, mode: str = "columnar") -> list:
+        # En ambas rutas: la de filas descartaría cada fila sin avisar
+        check_required_columns(chunk)
+        if mode == "rows":
+            return self._transform_chunk_rows(chunk)
+        return build_documents(chunk)
+
+    def _checkpoint_source(self) -> str:
+        # Nombre + tamaño: un snapshot nuevo de OPL no reutiliza el checkpoint
+        # de otro fichero
+        if os.path.isdir(self.csv_path):
+            size = OplParquetStore(self.csv_path).size_bytes()
+            source = f"{os.path.basename(os.path.normpath(self.csv_path))}:{size}"
+            # Con filtros explícitos sobre Parquet los chunks dependen de ellos
+            if self.parquet_filters:
+                source = f"{source}:{self.parquet_filters!r}"
+        else:
+            size = os.path.getsize(self.csv_path)
+            source = f"{os.path.basename(self.csv_path)}:{size}"
+        # Los chunks cuentan filas dentro del scope (ver _apply_scope): con
+        # otro scope los offsets ya no valen
+        return f"{source}:{self.scope.checkpoint_key()}" if self.scope else source
+
+    def _parquet_filters(self):
+        """parquet_filters AND la parte empujable del scope."""
+        pushdown = self.scope.parquet_filters() if self.scope else []
+        if not self.parquet_filters:
+            return pushdown or None
+        if isinstance(self.parquet_filters[0], list):
+            # Forma OR (lista de listas): el scope se añade a cada rama
+            return [group + pushdown for group in self.parquet_filters]
+        return list(self.parquet_filters) + pushdown
+
+    def _apply_scope(
+        self, chunks, chunk_size: int, skip_rows: int = 0, stats: Optional[dict] = None
+    ):
+        """
+        Filtra cada chunk al scope y reagrupa las filas que quedan en chunks
+        de exactamente `chunk_size` (salvo el último). Así un chunk significa
+        lo mismo venga del CSV (filtrado aquí) o de Parquet (con parte del
+        scope empujada al escaneo), y los checkpoints cuentan filas dentro
+        del scope. Las `skip_rows` primeras (ya cargadas) se leen y descartan.
+        Los contadores del scope se acumulan en `stats` si se pasa.
+        """
+        stats = stats if stats is not None else self._new_scope_stats()
+        pending, pending_rows = [], 0
+        try:
+            for chunk in chunks:
+                if self.scope is not None:
+                    chunk = chunk[self.scope.mask(chunk, stats["dropped"])]
+                stats["kept"] += len(chunk)
+                if skip_rows:
+                    if len(chunk) <= skip_rows:
+                        skip_rows -= len(chunk)
+                        continue
+                    chunk = chunk.iloc[skip_rows:]
+                    skip_rows = 0
+                pending.append(chunk)
+                pending_rows += len(chunk)
+                while pending_rows >= chunk_size:
+                    rows = pd.concat(pending) if len(pending) > 1 else pending[0]
+                    yield rows.iloc[:chunk_size].reset_index(drop=True)
+                    pending = [rows.iloc[chunk_size:]]
+                    pending_rows -= chunk_size
+            if pending_rows:
+                yield pd.concat(pending).reset_index(drop=True)
+        finally:
+            chunks.close()
+
+    def _print_scope_stats(self):
+        if self.scope is None:
+            return
+        dropped = self.scope_stats["dropped"]
+        total_dropped = sum(dropped.values())
+        print(
+            f"   Scope: {self.scope_stats['kept']} rows kept, {total_dropped} dropped "
+            f"(federation: {dropped['federation']}, tested: {dropped['tested']}, "
+            f"country: {dropped['country']})"
+        )
+
+    def _resume_from(self, chunk_size: int, resume: bool) -> int:
+        """Número de chunks ya cargados en una ejecución anterior interrumpida."""
+        if not resume:
+            return 0
+        checkpoint = self.repository.get_checkpoint(self._checkpoint_source())
+        if (
+            not checkpoint
+            or checkpoint.get("status") == "completed"
+            or checkpoint.get("chunk_size") != chunk_size
+        ):
+            return 0
+        done = checkpoint["last_chunk"] + 1
+        print(
+            f"⏩ Resuming after chunk {checkpoint['last_chunk']} "
+            f"({done * chunk_size} rows already loaded)"
+        )
+        return done
+
+    def backfill_result_keys(self, batch_size: int = 10000) -> dict:
+        """
+        Migración única: da natural_key / content_hash a los documentos
+        cargados antes de que existieran (normalizados como los generaría
+        ahora build_documents). Sin ella la primera recarga no los reconoce
+        e inserta todo el dump otra vez. Los que resultan repetidos se borran.
+        """
+        repository = self.repository
+        totals = {"keyed": 0, "duplicates": 0}
+        if repository.result_keys_migrated():
+            return totals
+
+        print("🔑 Backfilling natural_key/content_hash of legacy results...")
+        for batch in repository.iter_documents_without_keys(batch_size):
+            documents = []
+            for doc in batch:
+                keyed = add_result_keys([normalize_legacy_document(doc)])[0]
+                keyed["_id"] = doc["_id"]
+                documents.append(keyed)
+            counts = repository.replace_legacy_documents(documents)
+            for key in totals:
+                totals[key] += counts[key]
+            print(f"   Legacy results keyed so far: {totals}")
+
+        repository.mark_result_keys_migrated()
+        if totals["keyed"] or totals["duplicates"]:
+            print(
+                f"✅ Backfill done: {totals['keyed']} keyed, "
+                f"{totals['duplicates']} duplicates removed"
+            )
+        return totals
+
+    def _read_chunks(
+        self,
+        chunk_size: int,
+        skip_chunks: int = 0,
+        path: Optional[str] = None,
+        scope_stats: Optional[dict] = None,
+    ):
+        """
+        Context manager que itera el origen (CSV o Parquet) en chunks de
+        `chunk_size` filas dentro del scope, saltando los `skip_chunks` primeros.
+        """
+        path = path or self.csv_path
+        if os.path.isdir(path):
+            chunks = OplParquetStore(path).iter_chunks(
+                chunk_size, columns=SOURCE_COLUMNS, filters=self._parquet_filters()
+            )
+        else:
+            # Tipos fijos (no adivinados por chunk): las claves no dependen de
+            # dónde caigan los cortes entre chunks
+            chunks = read_opl_csv(path, chunk_size)
+        return contextlib.closing(
+            self._apply_scope(chunks, chunk_size, skip_chunks * chunk_size, scope_stats)
+        )
+
+    def run(self, chunk_size=10000, mode="columnar", resume=True):
         """
         Executes the ETL process in batches.
+        mode: "columnar" (vectorized, default) or "rows" (original iterrows path).
+        Results are upserted by natural_key (unchanged rows are skipped) and
+        each finished chunk is checkpointed so an interrupted run resumes.
         """
         print(f"🚀 Starting bulk load from: {self.csv_path}")
-        print(f"📦 Batch size: {chunk_size} rows")
+        print(f"📦 Batch size: {chunk_size} rows ({mode})")
         
-        total_inserted = 0
-        batch_num = 0
+        totals = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0}
+        self.repository.create_natural_key_index()
+        self.backfill_result_keys()
+        source = self._checkpoint_source()
+        batch_num = self._resume_from(chunk_size, resume)
 
         # Read CSV in chunks to avoid memory overflow
-        with pd.read_csv(self.csv_path, chunksize=chunk_size, low_memory=False) as reader:
+        self.scope_stats = self._new_scope_stats()
+        with self._read_chunks(
+            chunk_size, batch_num, scope_stats=self.scope_stats
+        ) as reader:
             for chunk in reader:
-                batch_num += 1
-                clean_entities = []
-                
-                # Iterate over rows in the current chunk
-                for _, row in chunk.iterrows():
-                    try:
-                        entity = self._process_row(row)
-                        clean_entities.append(entity)
-                    except Exception as e:
-                        # If a row is severely broken, skip it but log warning
-                        # print(f"⚠️ Error in row: {e}") # Uncomment for deep debugging
-                        continue
+                documents = add_result_keys(self._transform_chunk(chunk, mode))
                 
                 # Save batch to MongoDB
-                if clean_entities:
-                    self.repository.save_batch(clean_entities)
-                    total_inserted += len(clean_entities)
-                    print(f"✅ Batch {batch_num} processed. Total accumulated: {total_inserted}")
+                counts = self.repository.upsert_documents(documents)
+                for key in totals:
+                    totals[key] += counts[key]
+                self.repository.save_checkpoint(source, chunk_size, batch_num)
+                batch_num += 1
+                print(f"✅ Batch {batch_num} processed. Accumulated: {totals}")
+
+        self.repository.save_checkpoint(
+            source, chunk_size, batch_num - 1, status="completed"
+        )
+        print("🏁 ETL Finished successfully!")
+        self._print_scope_stats()
+        return totals
+
+    def run_pipelined(
+        self,
+        chunk_size: int = 10000,
+        workers: Optional[int] = None,
+        writers: int = 2,
+        max_in_flight: Optional[int] = None,
+        resume: bool = True,
+    ) -> dict:
+        """
+        Pipelined ETL: the main thread reads CSV chunks, a pool of `workers`
+        processes transforms them (build_documents) and `writers` threads
+        issue unordered bulk upserts, so parsing, CPU work and Mongo I/O
+        overlap. At most `max_in_flight` chunks are pending per stage, which
+        bounds memory. Returns (and prints) rows/second per stage.
+
+        Writes are collected in read order, so once chunk N is collected every
+        chunk before it is in Mongo: that is the checkpoint used by `resume`.
+        """
+        workers = workers or os.cpu_count() or 1
+        max_in_flight = max_in_flight or workers * 2
+
+        print(f"🚀 Starting pipelined load from: {self.csv_path}")
+        print(
+            f"📦 Batch size: {chunk_size} rows | {workers} transform workers | "
+            f"{writers} writers | max {max_in_flight} batches in flight"
+        )
+
+        stats = {
+            "rows_read": 0,
+            "rows_transformed": 0,
+            "rows_written": 0,
+            "inserted": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "duplicates": 0,
+            "read_seconds": 0.0,
+            "transform_seconds": 0.0,
+            "write_seconds": 0.0,
+        }
+        transforms = deque()
+        writes = deque()
+        # Conectamos antes de arrancar los writers (todos comparten el cliente)
+        repository = self.repository
+        repository.create_natural_key_index()
+        self.backfill_result_keys()
+        source = self._checkpoint_source()
+        batch_num = self._resume_from(chunk_size, resume)
+
+        def write(documents: list) -> tuple:
+            start = time.perf_counter()
+            counts = repository.upsert_documents(documents)
+            return counts, time.perf_counter() - start
+
+        def collect_write():
+            chunk_index, future = writes.popleft()
+            counts, seconds = future.result()
+            for key in ("inserted", "updated", "unchanged", "duplicates"):
+                stats[key] += counts[key]
+                stats["rows_written"] += counts[key]
+            stats["write_seconds"] += seconds
+            repository.save_checkpoint(source, chunk_size, chunk_index)
+
+        def hand_to_writer():
+            chunk_index, future = transforms.popleft()
+            documents, seconds = future.result()
+            stats["rows_transformed"] += len(documents)
+            stats["transform_seconds"] += seconds
+            # Backpressure: si Mongo va por detrás, el lector espera aquí.
+            # Los chunks vacíos también pasan para que el checkpoint avance.
+            while len(writes) >= max_in_flight:
+                collect_write()
+            writes.append((chunk_index, writer_pool.submit(write, documents)))
+
+        wall_start = time.perf_counter()
+        transform_pool = ProcessPoolExecutor(max_workers=workers)
+        writer_pool = ThreadPoolExecutor(max_workers=writers)
+        try:
+            self.scope_stats = self._new_scope_stats()
+            with self._read_chunks(
+                chunk_size, batch_num, scope_stats=self.scope_stats
+            ) as reader:
+                while True:
+                    start = time.perf_counter()
+                    chunk = next(reader, None)
+                    stats["read_seconds"] += time.perf_counter() - start
+                    if chunk is None:
+                        break
+
+                    stats["rows_read"] += len(chunk)
+                    transforms.append(
+                        (batch_num, transform_pool.submit(transform_chunk_timed, chunk))
+                    )
+                    batch_num += 1
+
+                    # Pasamos al writer en orden de lectura lo que ya esté listo
+                    while transforms and (
+                        len(transforms) >= max_in_flight or transforms[0][1].done()
+                    ):
+                        hand_to_writer()
+
+                    if batch_num % 10 == 0:
+                        print(
+                            f"✅ Batch {batch_num} read. "
+                            f"Written so far: {stats['rows_written']}"
+                        )
 
-        print("🏁 ETL Finished successfully!")
\ No newline at end of file
+            while transforms:
+                hand_to_writer()
+            while writes:
+                collect_write()
+            repository.save_checkpoint(
+                source, chunk_size, batch_num - 1, status="completed"
+            )
+        finally:
+            transform_pool.shutdown(cancel_futures=True)
+            writer_pool.shutdown()
+
+        wall_seconds = time.perf_counter() - wall_start
+        stats["wall_seconds"] = wall_seconds
+
+        def rate(rows, seconds):
+            return rows / seconds if seconds else 0.0
+
+        # Throughput de cada etapa en su tiempo ocupado (repartido entre su pool)
+        stats["read_rows_per_second"] = rate(stats["rows_read"], stats["read_seconds"])
+        stats["transform_rows_per_second"] = rate(
+            stats["rows_transformed"], stats["transform_seconds"] / workers
+        )
+        stats["write_rows_per_second"] = rate(
+            stats["rows_written"], stats["write_seconds"] / writers
+        )
+        stats["end_to_end_rows_per_second"] = rate(stats["rows_written"], wall_seconds)
+
+        stats["scope"] = self.scope_stats
+
+        print("🏁 Pipelined ETL finished!")
+        self._print_scope_stats()
+        print(
+            f"   Inserted: {stats['inserted']} | Updated: {stats['updated']} | "
+            f"Unchanged: {stats['unchanged']} | "
+            f"Duplicate keys in batch: {stats['duplicates']}"
+        )
+        print(f"   Read:      {stats['read_rows_per_second']:,.0f} rows/s")
+        print(
+            f"   Transform: {stats['transform_rows_per_second']:,.0f} rows/s "
+            f"({workers} workers)"
+        )
+        print(
+            f"   Write:     {stats['write_rows_per_second']:,.0f} rows/s "
+            f"({writers} writers)"
+        )
+        print(
+            f"   End-to-end: {stats['rows_written']} rows in {wall_seconds:.1f}s "
+            f"-> {stats['end_to_end_rows_per_second']:,.0f} rows/s"
+        )
+        return stats
+
+    # ------------------------------------------------------------------
+    # Delta between two OPL snapshots
+    # ------------------------------------------------------------------
+
+    def _partition_keys(
+        self,
+        csv_path: str,
+        chunk_size: int,
+        buckets: int,
+        workdir: str,
+        label: str,
+        scope_stats: Optional[dict] = None,
+    ) -> int:
+        """
+        Streams a snapshot and spreads its (natural_key, content_hash) pairs
+        over `buckets` files on disk by key hash. Returns the number of rows.
+        """
+        files = [
+            open(os.path.join(workdir, f"{label}_{i:03d}.tsv"), "w", encoding="utf-8")
+            for i in range(buckets)
+        ]
+        rows = 0
+        try:
+            with self._read_chunks(
+                chunk_size, path=csv_path, scope_stats=scope_stats
+            ) as reader:
+                for chunk in reader:
+                    documents, _ = transform_chunk_timed(chunk)
+                    rows += len(documents)
+                    for doc in documents:
+                        key = doc["natural_key"]
+                        files[int(key[:8], 16) % buckets].write(
+                            f"{key}\t{doc['content_hash']}\n"
+                        )
+        finally:
+            for f in files:
+                f.close()
+        return rows
+
+    @staticmethod
+    def _load_bucket(path: str) -> dict:
+        # Si una clave se repite en el snapshot gana la última (igual que el upsert)
+        with open(path, encoding="utf-8") as f:
+            return dict(line.rstrip("\n").split("\t") for line in f)
+
+    def run_delta(
+        self,
+        previous_csv_path: str,
+        chunk_size: int = 10000,
+        buckets: int = 64,
+        apply: bool = True,
+        workdir: Optional[str] = None,
+    ) -> dict:
+        """
+        Applies to Mongo only what changed between `previous_csv_path` and
+        this loader's CSV (the new snapshot):
+
+        1. Both snapshots are streamed and their (natural_key, content_hash)
+           pairs hash-partitioned into bucket files on disk.
+        2. Buckets are compared one at a time, so memory is bounded by one
+           bucket (~rows / buckets keys) plus the delta itself.
+        3. The new snapshot is streamed again: only added/changed rows are
+           upserted, and removed keys are deleted from `results`.
+
+        With apply=False it only reports the delta.
+        """
+        print(f"🔀 Delta load: {previous_csv_path} -> {self.csv_path}")
+        start = time.perf_counter()
+        stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+
+        with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+            # 1. Particionado por hash de la clave natural
+            # Los contadores del scope son los del snapshot nuevo (una pasada)
+            self.scope_stats = self._new_scope_stats()
+            for label, path, scope_stats in (
+                ("old", previous_csv_path, None),
+                ("new", self.csv_path, self.scope_stats),
+            ):
+                rows = self._partition_keys(
+                    path, chunk_size, buckets, tmp, label, scope_stats
+                )
+                print(f"   [{label}] {rows} rows partitioned into {buckets} buckets")
+
+            # 2. Diff cubo a cubo
+            to_upsert = set()
+            to_delete = []
+            for i in range(buckets):
+                old = self._load_bucket(os.path.join(tmp, f"old_{i:03d}.tsv"))
+                new = self._load_bucket(os.path.join(tmp, f"new_{i:03d}.tsv"))
+                for key, content_hash in new.items():
+                    previous_hash = old.pop(key, None)
+                    if previous_hash is None:
+                        stats["added"] += 1
+                        to_upsert.add(key)
+                    elif previous_hash != content_hash:
+                        stats["changed"] += 1
+                        to_upsert.add(key)
+                    else:
+                        stats["unchanged"] += 1
+                # Lo que queda en `old` ya no está en el snapshot nuevo
+                to_delete.extend(old)
+            stats["removed"] = len(to_delete)
+
+        self._print_scope_stats()
+        print(
+            f"   Delta: +{stats['added']} ~{stats['changed']} -{stats['removed']} "
+            f"({stats['unchanged']} unchanged)"
+        )
+        if not apply:
+            return stats
+
+        # 3. Aplicar solo el delta
+        repository = self.repository
+        repository.create_natural_key_index()
+        self.backfill_result_keys()
+        written = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0}
+        if to_upsert:
+            with self._read_chunks(chunk_size) as reader:
+                for chunk in reader:
+                    documents, _ = transform_chunk_timed(chunk)
+                    delta = [d for d in documents if d["natural_key"] in to_upsert]
+                    counts = repository.upsert_documents(delta)
+                    for key in written:
+                        written[key] += counts[key]
+
+        deleted = 0
+        for i in range(0, len(to_delete), chunk_size):
+            deleted += repository.delete_by_natural_keys(to_delete[i : i + chunk_size])
+
+        stats.update({f"mongo_{k}": v for k, v in written.items()})
+        stats["mongo_deleted"] = deleted
+        stats["seconds"] = round(time.perf_counter() - start, 1)
+        print(
+            f"🏁 Delta applied in {stats['seconds']}s: "
+            f"{written['inserted']} inserted, {written['updated']} updated, "
+            f"{deleted} deleted"
+        )
+        return stats
@@ -0,0 +1,307 @@
+import json
+import os
+import time
+import traceback
+from datetime import datetime, timezone
+
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from src.infrastructure.athlete_enrichment import AthleteEnricher
+from src.infrastructure.repositories.athlete_best_lifts_repository import (
+    AthleteBestLiftsRepository,
+)
+from src.use_cases.mongo_to_postgresql import (
+    ATHLETE_COLUMNS,
+    COMPETITION_COLUMNS,
+    FACT_COLUMNS,
+    FACT_CONFLICT_COLUMNS,
+    FACT_LOOKUPS,
+    MONGO_URI,
+    POSTGRES_URI,
+    DataTransformer,
+    PostgresLoader,
+)
+
+# ==========================================
+# CONFIGURACIÓN
+# ==========================================
+REPLICATOR_NAME = "mongo_change_stream"  # scraper_name en etl_sync_logs
+
+# Los change streams necesitan un replica set (ver docker-compose.replica.yml)
+MONGO_REPLICATION_URI = os.getenv("MONGO_REPLICATION_URI", MONGO_URI)
+# Se vuelca a Postgres al llegar a N eventos o cuando el más antiguo espera X s
+REPLICATION_FLUSH_SIZE = int(os.getenv("REPLICATION_FLUSH_SIZE", 500))
+REPLICATION_MAX_LATENCY = float(os.getenv("REPLICATION_MAX_LATENCY_SECONDS", 5))
+# Sin eventos, el token de reanudación se guarda como mucho cada N segundos
+TOKEN_IDLE_SAVE_SECONDS = 60
+
+OPERATIONS = ["insert", "update", "replace", "delete"]
+
+# Columnas que un update en Mongo puede cambiar en las dimensiones
+ATHLETE_UPDATE_COLUMNS = ["name", "sex", "country"]
+COMPETITION_UPDATE_COLUMNS = ["name", "date", "federation", "country", "state", "town"]
+FACT_UPDATE_COLUMNS = [c for c in FACT_COLUMNS if c not in FACT_CONFLICT_COLUMNS]
+
+# Códigos de error de Mongo
+CHANGE_STREAM_NOT_SUPPORTED = 40573
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+class ResumeTokenStore:
+    """
+    Token de reanudación del change stream, persistido en Postgres en la
+    misma base que los datos replicados.
+    """
+
+    DDL = text("""
+        CREATE TABLE IF NOT EXISTS etl_replication_state (
+            stream_name TEXT PRIMARY KEY,
+            resume_token JSONB NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+
+    def __init__(self, engine: Engine, stream_name: str):
+        self.engine = engine
+        self.stream_name = stream_name
+
+    def create_table(self):
+        with self.engine.connect() as conn:
+            conn.execute(self.DDL)
+            conn.commit()
+
+    def load(self) -> dict | None:
+        with self.engine.connect() as conn:
+            token = conn.execute(
+                text("""
+                    SELECT resume_token FROM etl_replication_state
+                    WHERE stream_name = :name
+                """),
+                {"name": self.stream_name},
+            ).scalar()
+        return token
+
+    def save(self, token: dict):
+        with self.engine.connect() as conn:
+            conn.execute(
+                text("""
+                    INSERT INTO etl_replication_state (stream_name, resume_token)
+                    VALUES (:name, CAST(:token AS jsonb))
+                    ON CONFLICT (stream_name) DO UPDATE SET
+                        resume_token = EXCLUDED.resume_token,
+                        updated_at = now()
+                """),
+                {"name": self.stream_name, "token": json.dumps(token)},
+            )
+            conn.commit()
+
+
+class ChangeStreamReplicator:
+    """
+    Replicación casi en tiempo real Mongo (`results`) -> Postgres.
+
+    Escucha el change stream de la colección y agrupa los eventos en
+    micro-lotes (`flush_size` eventos o `max_latency` segundos). En cada
+    volcado, por documento solo cuenta su último evento:
+
+    - insert / update / replace: se borran sus filas de fact_results (por
+      `mongo_id`) y se vuelven a cargar; atletas y competiciones se hacen
+      upsert por slug (COPY + ON CONFLICT DO UPDATE).
+    - delete: se borran sus filas de fact_results. Las dimensiones se
+      conservan (otras tablas las referencian).
+
+    Después se enriquece el país y se refrescan los PRs solo de los atletas
+    tocados, y se guarda el token de reanudación. Si el proceso cae entre la
+    carga y el guardado del token, los eventos se reprocesan: todas las
+    operaciones son idempotentes.
+
+    Las filas cargadas antes de existir `fact_results.mongo_id` no lo tienen,
+    así que sus deletes no se pueden propagar (se ignoran).
+    """
+
+    def __init__(
+        self,
+        mongo_uri: str = MONGO_REPLICATION_URI,
+        postgres_uri: str = POSTGRES_URI,
+        db_name: str = "RackAI",
+        flush_size: int = REPLICATION_FLUSH_SIZE,
+        max_latency: float = REPLICATION_MAX_LATENCY,
+    ):
+        self.loader = PostgresLoader(postgres_uri)
+        self.collection = MongoClient(mongo_uri)[db_name]["results"]
+        self.tokens = ResumeTokenStore(self.loader.engine, REPLICATOR_NAME)
+        self.best_lifts = AthleteBestLiftsRepository(self.loader.engine)
+        self.enricher = AthleteEnricher(self.loader.engine)
+        self.flush_size = flush_size
+        self.max_latency = max_latency
+        self.transformer = DataTransformer()
+        self.stats = {"events": 0, "flushes": 0, "upserted": 0, "deleted": 0}
+
+    def setup(self):
+        self.loader.create_indexes()
+        self.tokens.create_table()
+
+    @staticmethod
+    def _latest_by_document(events: list) -> dict:
+        """_id -> último documento completo (None si se ha borrado)."""
+        latest = {}
+        for change in events:
+            document_id = change["documentKey"]["_id"]
+            document = change.get("fullDocument")
+            # Con updateLookup, fullDocument es None si se borró después
+            if change["operationType"] == "delete" or document is None:
+                latest[document_id] = None
+            else:
+                latest[document_id] = document
+        return latest
+
+    def flush(self, events: list, resume_token: dict):
+        start = time.perf_counter()
+        latest = self._latest_by_document(events)
+
+        # 1. Fuera las filas anteriores de todos los documentos tocados
+        touched = self.loader.delete_facts_by_mongo_ids([str(i) for i in latest])
+
+        # 2. Recargar los documentos vivos
+        for document in latest.values():
+            if document is not None:
+                self.transformer.process_record(document)
+        athletes, comps, facts = self.transformer.drain()
+
+        self.loader.copy_merge(
+            "dim_athlete", ATHLETE_COLUMNS, athletes, ["slug"], ATHLETE_UPDATE_COLUMNS
+        )
+        self.loader.copy_merge(
+            "dim_competition",
+            COMPETITION_COLUMNS,
+            comps,
+            ["slug"],
+            COMPETITION_UPDATE_COLUMNS,
+        )
+        # Filas antiguas sin mongo_id: se actualizan por la clave natural
+        self.loader.copy_merge(
+            "fact_results",
+            FACT_COLUMNS,
+            facts,
+            FACT_CONFLICT_COLUMNS,
+            FACT_UPDATE_COLUMNS,
+            lookups=FACT_LOOKUPS,
+        )
+
+        # 3. Derivados, solo de los atletas tocados
+        touched |= self.loader.athlete_ids_for_slugs(
+            {fact["athlete_slug"] for fact in facts}
+            | {athlete["slug"] for athlete in athletes}
+        )
+        self.enricher.run(touched)
+        self.best_lifts.refresh(touched)
+
+        # 4. Confirmar la posición del stream y avisar a las cachés de la API
+        self.tokens.save(resume_token)
+        self.loader.log_execution(
+            REPLICATOR_NAME, datetime.now(timezone.utc), len(latest), "success"
+        )
+
+        deleted = sum(1 for document in latest.values() if document is None)
+        self.stats["events"] += len(events)
+        self.stats["flushes"] += 1
+        self.stats["upserted"] += len(latest) - deleted
+        self.stats["deleted"] += deleted
+        print(
+            f"[Replicator] {len(events)} eventos -> {len(latest) - deleted} upserts, "
+            f"{deleted} deletes, {len(touched)} atletas "
+            f"en {time.perf_counter() - start:.2f}s | total: {self.stats}"
+        )
+
+    def run(self):
+        self.setup()
+        token = self.tokens.load()
+        if token:
+            print("[Replicator] Reanudando el change stream desde el último token.")
+        else:
+            print(
+                "[Replicator] Sin token previo: se replica desde ahora "
+                "(ejecuta antes mongo_to_postgresql para el histórico)."
+            )
+
+        pipeline = [{"$match": {"operationType": {"$in": OPERATIONS}}}]
+        max_await_ms = int(min(self.max_latency, 1) * 1000)
+        buffer = []
+        first_event_at = None
+        saved_token, token_saved_at = token, time.monotonic()
+
+        with self.collection.watch(
+            pipeline,
+            full_document="updateLookup",
+            resume_after=token,
+            max_await_time_ms=max_await_ms,
+        ) as stream:
+            try:
+                while stream.alive:
+                    change = stream.try_next()
+                    now = time.monotonic()
+                    if change is not None:
+                        buffer.append(change)
+                        if first_event_at is None:
+                            first_event_at = now
+
+                    if buffer and (
+                        len(buffer) >= self.flush_size
+                        or now - first_event_at >= self.max_latency
+                    ):
+                        self.flush(buffer, stream.resume_token)
+                        buffer, first_event_at = [], None
+                        saved_token, token_saved_at = stream.resume_token, now
+                    elif (
+                        not buffer
+                        and stream.resume_token != saved_token
+                        and now - token_saved_at >= TOKEN_IDLE_SAVE_SECONDS
+                    ):
+                        # Sin eventos el token también avanza: guardarlo evita
+                        # que caiga fuera del oplog en colecciones poco activas
+                        self.tokens.save(stream.resume_token)
+                        saved_token, token_saved_at = stream.resume_token, now
+            except KeyboardInterrupt:
+                print("\n[Replicator] Parando: volcando los eventos pendientes...")
+
+            if buffer:
+                self.flush(buffer, stream.resume_token)
+            if not stream.alive:
+                # p.ej. evento 'invalidate' (colección borrada o renombrada)
+                print("⚠️ El change stream se ha cerrado.")
+
+
+def run_replicator():
+    replicator = ChangeStreamReplicator()
+    try:
+        replicator.run()
+    except OperationFailure as e:
+        if e.code == CHANGE_STREAM_NOT_SUPPORTED:
+            print(
+                "❌ Los change streams requieren un replica set. En local: "
+                "docker compose -f docker-compose.replica.yml up -d"
+            )
+        elif e.code == CHANGE_STREAM_HISTORY_LOST:
+            # El token ya no está en el oplog: hay que resincronizar
+            print(
+                "❌ El token de reanudación ha caducado. Ejecuta mongo_to_postgresql "
+                "y borra la fila de etl_replication_state para empezar de nuevo."
+            )
+        raise
+    except Exception as e:
+        print(f"❌ FALLO CRÍTICO EN LA REPLICACIÓN: {e}")
+        replicator.loader.log_execution(
+            REPLICATOR_NAME,
+            datetime.now(timezone.utc),
+            0,
+            "failed",
+            traceback.format_exc(),
+        )
+        raise
+
+
+if __name__ == "__main__":
+    run_replicator()
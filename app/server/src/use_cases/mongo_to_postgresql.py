@@ -1,3 +1,6 @@
+import csv
+import io
+import math
 import os
 import uuid
 import traceback
@@ -9,7 +12,11 @@ import numpy as np
 from pymongo import MongoClient
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
-from sqlalchemy.dialects.postgresql import insert
+from src.infrastructure.athlete_enrichment import AthleteEnricher
+from src.infrastructure.etl_watermark import EtlWatermark
+from src.infrastructure.repositories.athlete_best_lifts_repository import (
+    AthleteBestLiftsRepository,
+)
 
 # ==========================================
 # CONFIGURACIÓN INICIAL
@@ -25,6 +32,41 @@ POSTGRES_URI = f"postgresql://postgres.uvyjzlcziqusafdjqadb:{os.getenv('POSTGRES
 VALID_FEDERATIONS = {"AEP", "IPF", "EPF"}
 SCRAPER_NAME = "mongo_to_postgres_sync" # Identificador para nuestros logs
 
+# Documentos de Mongo por lote: la memoria del sync depende de esto, no del total
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", 20000))
+
+# Columnas que se cargan en cada tabla (mismo orden que el COPY)
+ATHLETE_COLUMNS = ["id", "slug", "name", "sex", "country", "image_url"]
+COMPETITION_COLUMNS = [
+    "id", "slug", "name", "date", "federation", "country", "state", "town",
+]
+FACT_COLUMNS = [
+    "athlete_id", "competition_id", "competition_date", "age", "bodyweight",
+    "division", "age_class", "weight_class", "equipment", "event_type", "tested",
+    "squat", "bench", "deadlift", "total", "place",
+    "dots", "wilks", "goodlift", "glossbrenner", "mongo_id",
+]
+FACT_CONFLICT_COLUMNS = ["athlete_id", "competition_id", "event_type", "equipment"]
+# Los ids de las dimensiones se resuelven por slug al fusionar (ver copy_merge):
+# así también casan las filas antiguas con ids uuid4 aleatorios
+FACT_LOOKUPS = {
+    "athlete_id": ("dim_athlete", "athlete_slug"),
+    "competition_id": ("dim_competition", "competition_slug"),
+}
+
+# Ids deterministas: uuid5(namespace, slug). Mismo slug -> mismo id en
+# cualquier ejecución, sin leer antes las dimensiones de Postgres.
+ATHLETE_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "rackai:dim_athlete")
+COMPETITION_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "rackai:dim_competition")
+
+
+def athlete_uuid(slug: str) -> str:
+    return str(uuid.uuid5(ATHLETE_NAMESPACE, slug))
+
+
+def competition_uuid(slug: str) -> str:
+    return str(uuid.uuid5(COMPETITION_NAMESPACE, slug))
+
 # ==========================================
 # CAPA 1: EXTRACCIÓN (Extract)
 # ==========================================
@@ -33,7 +75,22 @@ class MongoExtractor:
         self.client = MongoClient(uri)
         self.db = self.client[db_name]
 
-    def fetch_new_results(self, last_watermark: datetime | None):
+    # Solo los campos que usa DataTransformer.process_record
+    PROJECTION = {
+        "athlete.id": 1,
+        "athlete.name": 1,
+        "athlete.sex": 1,
+        "athlete.country": 1,
+        "athlete.age": 1,
+        "competition": 1,
+        "category": 1,
+        "results": 1,
+        "points": 1,
+    }
+
+    def fetch_new_results(
+        self, last_watermark: datetime | None, batch_size: int = SYNC_BATCH_SIZE
+    ):
         """
         Extrae SOLO los documentos insertados en Mongo después de la marca de agua.
         Usa el ObjectId para inferir el momento exacto de creación.
@@ -48,7 +105,20 @@ class MongoExtractor:
         else:
             print("[Extractor] No hay logs previos. Extrayendo TODO el histórico de MongoDB...")
 
-        return self.db.results.find(query)
+        return self.db.results.find(query, self.PROJECTION).batch_size(
+            min(batch_size, 10000)
+        )
+
+    def iter_batches(self, last_watermark: datetime | None, batch_size: int):
+        """Recorre el cursor en lotes de `batch_size` documentos."""
+        batch = []
+        for document in self.fetch_new_results(last_watermark, batch_size):
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
 
 
 # ==========================================
@@ -56,12 +126,17 @@ class MongoExtractor:
 # (Se mantiene idéntica, con la limpieza de país incluida)
 # ==========================================
 class DataTransformer:
-    def __init__(self, existing_athletes: dict, existing_comps: dict):
+    """
+    Documentos de Mongo -> filas de dim_athlete, dim_competition y fact_results.
+
+    Cada lote emite todas las dimensiones que aparecen en él (la carga las
+    fusiona por slug); los resultados referencian las dimensiones por slug.
+    """
+
+    def __init__(self):
         self.athletes_dict = {}
         self.competitions_dict = {}
         self.facts_list = []
-        self.athlete_slug_to_uuid = existing_athletes
-        self.comp_slug_to_uuid = existing_comps
 
     def _parse_date(self, date_obj) -> datetime | None:
         if isinstance(date_obj, datetime):
@@ -73,18 +148,6 @@ class DataTransformer:
                 return None
         return None
 
-    def _get_or_create_athlete_uuid(self, slug: str) -> str:
-        if slug not in self.athlete_slug_to_uuid:
-            self.athlete_slug_to_uuid[slug] = str(uuid.uuid4())
-            return self.athlete_slug_to_uuid[slug], True
-        return self.athlete_slug_to_uuid[slug], False
-
-    def _get_or_create_comp_uuid(self, slug: str) -> str:
-        if slug not in self.comp_slug_to_uuid:
-            self.comp_slug_to_uuid[slug] = str(uuid.uuid4())
-            return self.comp_slug_to_uuid[slug], True
-        return self.comp_slug_to_uuid[slug], False
-
     def process_record(self, record: dict):
         competition = record.get("competition", {})
         federation = competition.get("federation")
@@ -105,9 +168,6 @@ class DataTransformer:
 
         comp_date = self._parse_date(competition.get("date"))
 
-        athlete_uuid, is_new_athlete = self._get_or_create_athlete_uuid(athlete_slug)
-        comp_uuid, is_new_comp = self._get_or_create_comp_uuid(comp_slug)
-
         athlete_country = athlete.get("country")
 
         if (
@@ -118,28 +178,28 @@ class DataTransformer:
         ) and federation == "AEP":
             athlete_country = "Spain"
 
-        if is_new_athlete and athlete_uuid not in self.athletes_dict:
-            self.athletes_dict[athlete_uuid] = {
-                "id": athlete_uuid,
+        if athlete_slug not in self.athletes_dict:
+            self.athletes_dict[athlete_slug] = {
+                "id": athlete_uuid(athlete_slug),
                 "slug": athlete_slug,
                 "name": athlete.get("name"),
                 "sex": athlete.get("sex"),
                 "country": athlete_country,
                 "image_url": "",
             }
-        elif athlete_uuid in self.athletes_dict:
-            current_country = self.athletes_dict[athlete_uuid].get("country")
+        else:
+            current_country = self.athletes_dict[athlete_slug].get("country")
             if (
                 not current_country
                 or pd.isna(current_country)
                 or str(current_country).strip() == ""
                 or str(current_country).strip().lower() == "nan"
             ) and athlete_country:
-                self.athletes_dict[athlete_uuid]["country"] = athlete_country
+                self.athletes_dict[athlete_slug]["country"] = athlete_country
 
-        if is_new_comp and comp_uuid not in self.competitions_dict:
-            self.competitions_dict[comp_uuid] = {
-                "id": comp_uuid,
+        if comp_slug not in self.competitions_dict:
+            self.competitions_dict[comp_slug] = {
+                "id": competition_uuid(comp_slug),
                 "slug": comp_slug,
                 "name": competition.get("name"),
                 "date": comp_date,
@@ -152,8 +212,8 @@ class DataTransformer:
         raw_place = results.get("place")
         self.facts_list.append(
             {
-                "athlete_id": athlete_uuid,
-                "competition_id": comp_uuid,
+                "athlete_slug": athlete_slug,
+                "competition_slug": comp_slug,
                 "competition_date": comp_date,
                 "age": athlete.get("age"),
                 "bodyweight": category.get("bodyweight"),
@@ -172,19 +232,25 @@ class DataTransformer:
                 "wilks": points.get("wilks", 0.0),
                 "goodlift": points.get("goodlift", 0.0),
                 "glossbrenner": points.get("glossbrenner", 0.0),
+                # Documento de origen: permite replicar updates y deletes
+                "mongo_id": str(record["_id"]) if record.get("_id") else None,
             }
         )
 
-    def get_dataframes(self):
-        df_athletes = pd.DataFrame(list(self.athletes_dict.values()))
-        df_comps = pd.DataFrame(list(self.competitions_dict.values()))
-        df_facts = pd.DataFrame(self.facts_list)
-
-        df_athletes = df_athletes.replace({np.nan: None})
-        df_comps = df_comps.replace({np.nan: None})
-        df_facts = df_facts.replace({np.nan: None})
-
-        return df_athletes, df_comps, df_facts
+    def drain(self):
+        """
+        Devuelve (atletas, competiciones, resultados) acumulados en el lote
+        actual y vacía el transformador.
+        """
+        batch = (
+            list(self.athletes_dict.values()),
+            list(self.competitions_dict.values()),
+            self.facts_list,
+        )
+        self.athletes_dict = {}
+        self.competitions_dict = {}
+        self.facts_list = []
+        return batch
 
 
 # ==========================================
@@ -223,66 +289,210 @@ class PostgresLoader:
             })
             conn.commit()
 
-    # --------------------------------------------------
-
-    def fetch_existing_mappings(self):
-        print("[Loader] Sincronizando estado actual de Supabase...")
+    MONGO_ID_DDL = [
+        "ALTER TABLE fact_results ADD COLUMN IF NOT EXISTS mongo_id TEXT",
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS uniq_fact_results_mongo_id
+        ON fact_results (mongo_id)
+        """,
+    ]
+
+    def create_indexes(self):
+        """Índice usado por la API para detectar nuevas cargas (invalidar cachés)."""
+        EtlWatermark(self.engine).create_indexes()
+        # Enlace fact_results -> documento de Mongo (replicación de updates/deletes)
         with self.engine.connect() as conn:
-            athletes = dict(conn.execute(text("SELECT slug, id FROM dim_athlete")).fetchall())
-            comps = dict(conn.execute(text("SELECT slug, id FROM dim_competition")).fetchall())
-        return athletes, comps
+            for statement in self.MONGO_ID_DDL:
+                conn.execute(text(statement))
+            conn.commit()
 
-    def upsert_dataframe(self, df: pd.DataFrame, table_name: str, unique_columns: list):
-        if df.empty:
-            return
+    def delete_facts_by_mongo_ids(self, mongo_ids) -> set:
+        """
+        Borra los resultados de los documentos de Mongo indicados.
+        Devuelve los athlete_id afectados (para refrescar sus PRs).
+        """
+        if not mongo_ids:
+            return set()
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text("""
+                    DELETE FROM fact_results
+                    WHERE mongo_id = ANY(:ids)
+                    RETURNING athlete_id::text
+                """),
+                {"ids": list(mongo_ids)},
+            ).fetchall()
+            conn.commit()
+        return {row[0] for row in rows}
 
-        def insert_on_conflict_nothing(table, conn, keys, data_iter):
-            data = [dict(zip(keys, row)) for row in data_iter]
-            stmt = insert(table.table).values(data)
-            do_nothing_stmt = stmt.on_conflict_do_nothing(index_elements=unique_columns)
-            result = conn.execute(do_nothing_stmt)
-            return result.rowcount
-
-        df.to_sql(
-            table_name,
-            self.engine,
-            if_exists="append",
-            index=False,
-            method=insert_on_conflict_nothing,
-            chunksize=2000,
-        )
+    def athlete_ids_for_slugs(self, slugs) -> set:
+        """Ids reales (uuid5 o antiguos uuid4) de los atletas indicados."""
+        if not slugs:
+            return set()
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT id::text FROM dim_athlete WHERE slug = ANY(:slugs)"),
+                {"slugs": list(slugs)},
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    @staticmethod
+    def _copy_value(value):
+        """Valor -> campo CSV para COPY (NULL = \\N)."""
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return "\\N"
+        if isinstance(value, bool):
+            return "t" if value else "f"
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return str(value)
+
+    def copy_merge(
+        self,
+        table_name: str,
+        columns: list,
+        rows: list,
+        conflict_columns: list | None,
+        update_columns: list | None = None,
+        lookups: dict | None = None,
+    ) -> int:
+        """
+        Carga `rows` (dicts) con COPY a una tabla temporal y las fusiona con
+        INSERT ... SELECT ... ON CONFLICT (DO NOTHING, o DO UPDATE de
+        `update_columns`). Sin `conflict_columns`, DO NOTHING ante cualquier
+        índice único. Devuelve las filas insertadas/actualizadas.
+
+        `lookups` resuelve ids por slug durante la fusión, p.ej.
+        {"athlete_id": ("dim_athlete", "athlete_slug")}: las filas traen
+        `athlete_slug` y el id se toma de dim_athlete (las filas cuyo slug no
+        exista se descartan).
+        """
+        if not rows:
+            return 0
+        lookups = lookups or {}
+
+        direct = [c for c in columns if c not in lookups]
+        slug_columns = [slug for _, slug in lookups.values()]
+        staged = direct + slug_columns
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        for row in rows:
+            writer.writerow([self._copy_value(row.get(c)) for c in staged])
+        buffer.seek(0)
+
+        staging = f"stg_{table_name}"
+        expressions = {c: f"s.{c}" for c in direct}
+        joins = []
+        for column, (dimension, slug) in lookups.items():
+            alias = f"lk_{column}"
+            expressions[column] = f"{alias}.id"
+            joins.append(f"JOIN {dimension} {alias} ON {alias}.slug = s.{slug}")
+        select = ", ".join(expressions[c] for c in columns)
+        source = " ".join([f"{staging} s", *joins])
+
+        conflict = ", ".join(conflict_columns or [])
+        if update_columns:
+            action = "DO UPDATE SET " + ", ".join(
+                f"{c} = EXCLUDED.{c}" for c in update_columns
+            )
+            # Un INSERT no puede actualizar dos veces la misma fila: gana la última
+            keys = ", ".join(expressions[c] for c in conflict_columns)
+            query = (
+                f"SELECT DISTINCT ON ({keys}) {select} FROM {source} "
+                f"ORDER BY {keys}, s.stg_seq DESC"
+            )
+        else:
+            action = "DO NOTHING"
+            query = f"SELECT {select} FROM {source}"
+        target = f"({conflict}) " if conflict else ""
+
+        extra_columns = [f"ADD COLUMN {slug} TEXT" for slug in slug_columns]
+        extra_columns.append("ADD COLUMN stg_seq BIGSERIAL")
+
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute(
+                f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                f"SELECT {', '.join(direct)} FROM {table_name} WITH NO DATA"
+            )
+            cursor.execute(f"ALTER TABLE {staging} {', '.join(extra_columns)}")
+            cursor.copy_expert(
+                f"COPY {staging} ({', '.join(staged)}) FROM STDIN "
+                f"WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+            cursor.execute(
+                f"INSERT INTO {table_name} ({', '.join(columns)}) {query} "
+                f"ON CONFLICT {target}{action}"
+            )
+            merged = cursor.rowcount
+            raw.commit()
+            return merged
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
 
 
 # ==========================================
 # ORQUESTADOR (Main)
 # ==========================================
-def run_pipeline():
+def run_pipeline(batch_size: int = SYNC_BATCH_SIZE):
     loader = PostgresLoader(POSTGRES_URI)
     
     # 0. Capturar el instante exacto de inicio (Será nuestra próxima marca de agua)
     current_execution_time = datetime.now(timezone.utc)
     
     try:
+        loader.create_indexes()
+
         # 1. Obtener la Marca de Agua (Última vez que se corrió exitosamente)
         last_watermark = loader.get_last_watermark(SCRAPER_NAME)
         
-        # 2. Leer estado actual
-        existing_athletes, existing_comps = loader.fetch_existing_mappings()
-        print(f"-> {len(existing_athletes)} atletas y {len(existing_comps)} competiciones ya en Postgres.")
-
-        # 3. Inicializar módulos
+        # 2-3. Inicializar módulos (los ids de dimensión son uuid5 del slug:
+        # no hace falta precargar los mapeos de Postgres)
         extractor = MongoExtractor(MONGO_URI, "RackAI")
-        transformer = DataTransformer(existing_athletes, existing_comps)
+        transformer = DataTransformer()
+        best_lifts = AthleteBestLiftsRepository(loader.engine)
+        enricher = AthleteEnricher(loader.engine)
 
-        # 4. Extraer (Filtrado por fecha) y Transformar
-        cursor = extractor.fetch_new_results(last_watermark)
-        
+        # 4-5. Extraer, transformar y cargar POR LOTES (memoria constante):
+        # COPY a una tabla temporal + INSERT ... ON CONFLICT DO NOTHING
         count = 0
-        for record in cursor:
-            transformer.process_record(record)
-            count += 1
-            if count % 5000 == 0:
-                print(f"[Transformer] {count} documentos procesados...")
+        merged = {"dim_athlete": 0, "dim_competition": 0, "fact_results": 0}
+        batches = extractor.iter_batches(last_watermark, batch_size)
+        for batch_num, records in enumerate(batches, start=1):
+            for record in records:
+                transformer.process_record(record)
+            count += len(records)
+
+            athletes, comps, facts = transformer.drain()
+            merged["dim_athlete"] += loader.copy_merge(
+                "dim_athlete", ATHLETE_COLUMNS, athletes, ["slug"]
+            )
+            merged["dim_competition"] += loader.copy_merge(
+                "dim_competition", COMPETITION_COLUMNS, comps, ["slug"]
+            )
+            merged["fact_results"] += loader.copy_merge(
+                "fact_results", FACT_COLUMNS, facts, None, lookups=FACT_LOOKUPS
+            )
+
+            # Refrescar la tabla materializada de PRs SOLO para los atletas tocados
+            touched = loader.athlete_ids_for_slugs(
+                {athlete["slug"] for athlete in athletes}
+            )
+            # Enriquecimiento retroactivo solo de los atletas del lote (antes de
+            # los PRs: el país decide si el atleta sale en el listado)
+            enricher.run(touched)
+            best_lifts.refresh(touched)
+
+            print(
+                f"[Sync] Lote {batch_num}: {count} documentos leídos | "
+                f"insertados: {merged}"
+            )
 
         if count == 0:
             print("✅ No hay registros nuevos en MongoDB desde la última sincronización.")
@@ -290,40 +500,7 @@ def run_pipeline():
             loader.log_execution(SCRAPER_NAME, current_execution_time, 0, 'success')
             return
 
-        df_athletes, df_comps, df_facts = transformer.get_dataframes()
-
-        print(f"-> Nuevos Atletas a insertar: {len(df_athletes)}")
-        print(f"-> Nuevas Competiciones a insertar: {len(df_comps)}")
-        print(f"-> Total Resultados evaluados: {len(df_facts)}")
-
-        # 5. Cargar (Upsert)
-        print("[Loader] Realizando Inserción Incremental...")
-        loader.upsert_dataframe(df_athletes, "dim_athlete", unique_columns=["slug"])
-        loader.upsert_dataframe(df_comps, "dim_competition", unique_columns=["slug"])
-
-        loader.upsert_dataframe(
-            df_facts,
-            "fact_results",
-            unique_columns=["athlete_id", "competition_id", "event_type", "equipment"],
-        )
-
-        # 6. Enriquecimiento Retroactivo (Post-Carga)
-        print("[Loader] Ejecutando enriquecimiento retroactivo para atletas de AEP...")
-        with loader.engine.connect() as conn:
-            conn.execute(
-                text("""
-                UPDATE dim_athlete da
-                SET country = 'Spain'
-                FROM fact_results fr
-                JOIN dim_competition dc ON fr.competition_id = dc.id
-                WHERE da.id = fr.athlete_id
-                  AND dc.federation = 'AEP'
-                  AND (da.country IS NULL OR da.country = '' OR da.country ILIKE 'nan')
-            """)
-            )
-            conn.commit()
-
-        # 7. REGISTRAR EL ÉXITO EN LA TABLA DE AUDITORÍA
+        # 6. REGISTRAR EL ÉXITO EN LA TABLA DE AUDITORÍA
         loader.log_execution(SCRAPER_NAME, current_execution_time, count, 'success')
         print("✅ CARGA INCREMENTAL Y LOG COMPLETADOS CON ÉXITO")
 
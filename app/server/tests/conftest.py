@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los tests importan `src.*` igual que los scripts de app/server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
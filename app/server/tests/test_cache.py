@@ -0,0 +1,29 @@
+from src.infrastructure.cache import ResultCache
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResultCache("test-lru", ttl=60, max_entries=3)
+    for i in range(3):
+        cache.get_or_compute(str(i), lambda i=i: i)
+
+    # "0" se vuelve a usar: la siguiente clave expulsa a "1"
+    assert cache.get_or_compute("0", lambda: "recalculado") == 0
+    cache.get_or_compute("3", lambda: 3)
+
+    assert list(cache._entries) == ["2", "0", "3"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_rejected_values_are_not_stored():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return []
+
+    cache = ResultCache("test-cache-if", ttl=60, cache_if=bool)
+    assert cache.get_or_compute("k", compute) == []
+    assert cache.get_or_compute("k", compute) == []
+
+    assert len(calls) == 2
+    assert cache.stats()["entries"] == 0